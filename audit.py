@@ -0,0 +1,135 @@
+# audit.py
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# True-Sync audit trace (why a plan expired, why a breakout was vetoed, ...)
+#   buf = TraceBuffer()
+#   run_smartstock_v296_engine("D05.SI", start, end, trace=buf)
+#   run_eod_analyzer("D05.SI", trace=buf)
+#   buf.to_frame(kind="veto", symbol="D05.SI")       # decoded, oldest first
+#   buf.save("audit.npz")                             # or .csv / .jsonl
+# Events live in a preallocated structured array used as a ring (the oldest are
+# overwritten once `capacity` is reached; `dropped` counts them). The kernel only
+# appends plain tuples to a list while tracing and the run writes them in one block,
+# so tracing off costs one `is not None` test per event site.
+# Fields that do not apply to an event kind are NaN / 0.
+# ----------------------------
+KINDS = ("plan_issued", "plan_aged", "plan_expired", "plan_cancelled", "breakout", "veto", "reversal",
+         "sell_signal", "fill_buy", "fill_sell", "wait")
+(PLAN_ISSUED, PLAN_AGED, PLAN_EXPIRED, PLAN_CANCELLED, BREAKOUT, VETO, REVERSAL,
+ SELL_SIGNAL, FILL_BUY, FILL_SELL, WAIT) = range(len(KINDS))
+
+ENTRY_TYPES = ("", "BREAKOUT", "REVERSAL")
+ENTRY_CODES = {None: 0, "BREAKOUT": 1, "REVERSAL": 2}
+BREAKOUT_ENTRY, REVERSAL_ENTRY = 1, 2
+
+# one event as the engine emits it (everything but the symbol)
+ROW_DTYPE = np.dtype([
+    ("date", "datetime64[ns]"),
+    ("kind", np.uint8),
+    ("entry", np.uint8),        # ENTRY_TYPES code: plan channel / position entry type
+    ("plan_age", np.int16),
+    ("w_bullish", np.bool_),
+    ("m_bullish", np.bool_),
+    ("close", np.float64),
+    ("ref", np.float64),        # level the decision compared against (Upper/Lower ref, MA50, 252D high)
+    ("vol_ratio", np.float64),
+    ("push", np.float64),       # close position in the bar's range
+    ("bx_s", np.float64),
+    ("price", np.float64),      # fill price
+    ("ret", np.float64),        # closed-trade return (fill_sell)
+])
+EVENT_DTYPE = np.dtype([("symbol", np.int32)] + [(n, ROW_DTYPE.fields[n][0]) for n in ROW_DTYPE.names])
+
+class TraceBuffer:
+    def __init__(self, capacity: int = 100_000):
+        self.events = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.n = 0
+        self.symbols = []
+        self._sym_ids = {}
+
+    @property
+    def dropped(self) -> int:
+        """Events overwritten since the buffer was created / cleared."""
+        return max(0, self.n - len(self.events))
+
+    def __len__(self) -> int:
+        return min(self.n, len(self.events))
+
+    def clear(self) -> None:
+        self.n = 0
+
+    def extend(self, symbol: str, rows: list) -> None:
+        """Append engine rows (tuples in ROW_DTYPE order) for `symbol`."""
+        if not rows:
+            return
+        block = np.array(rows, dtype=ROW_DTYPE)
+        sid = self._sym_ids.get(symbol)
+        if sid is None:
+            sid = self._sym_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        cap = len(self.events)
+        lo = self.n % cap
+        if lo + len(block) <= cap:
+            idx = slice(lo, lo + len(block))
+        else:
+            idx = (self.n + np.arange(len(block))) % cap
+            if len(block) > cap:
+                idx, block = idx[-cap:], block[-cap:]
+        self.events["symbol"][idx] = sid
+        for name in ROW_DTYPE.names:
+            self.events[name][idx] = block[name]
+        self.n += len(rows)
+
+    def view(self) -> np.ndarray:
+        """Retained events, oldest first (a copy once the ring has wrapped)."""
+        cap = len(self.events)
+        if self.n <= cap:
+            return self.events[:self.n]
+        head = self.n % cap
+        return np.concatenate((self.events[head:], self.events[:head]))
+
+    def query(self, kind: str | None = None, symbol: str | None = None, start=None, end=None) -> np.ndarray:
+        """Retained events filtered by kind name, symbol and [start, end] dates."""
+        ev = self.view()
+        mask = np.ones(len(ev), dtype=bool)
+        if kind is not None:
+            mask &= ev["kind"] == KINDS.index(kind)
+        if symbol is not None:
+            mask &= ev["symbol"] == self._sym_ids.get(symbol, -1)
+        if start is not None:
+            mask &= ev["date"] >= np.datetime64(pd.Timestamp(start), "ns")
+        if end is not None:
+            mask &= ev["date"] <= np.datetime64(pd.Timestamp(end), "ns")
+        return ev[mask]
+
+    def to_frame(self, **filters) -> pd.DataFrame:
+        """`query(**filters)` as a DataFrame with symbol / kind / entry names decoded."""
+        ev = self.query(**filters)
+        df = pd.DataFrame({name: ev[name] for name in EVENT_DTYPE.names})
+        df["symbol"] = np.asarray(self.symbols, dtype=object)[ev["symbol"]] if len(ev) else []
+        df["kind"] = np.asarray(KINDS, dtype=object)[ev["kind"]]
+        df["entry"] = np.asarray(ENTRY_TYPES, dtype=object)[ev["entry"]]
+        return df
+
+    def save(self, path: str) -> None:
+        """.npz keeps the typed events (see load); .csv / .jsonl write the decoded frame."""
+        if path.endswith(".npz"):
+            np.savez(path, events=self.view(), symbols=np.asarray(self.symbols, dtype=str))
+        elif path.endswith(".jsonl"):
+            self.to_frame().to_json(path, orient="records", lines=True, date_format="iso")
+        else:
+            self.to_frame().to_csv(path, index=False)
+
+    @classmethod
+    def load(cls, path: str, capacity: int | None = None) -> "TraceBuffer":
+        with np.load(path) as f:
+            events, symbols = f["events"], f["symbols"].tolist()
+        buf = cls(capacity or max(len(events), 1))
+        buf.symbols = symbols
+        buf._sym_ids = {s: i for i, s in enumerate(symbols)}
+        keep = events[-len(buf.events):]
+        buf.events[:len(keep)] = keep
+        buf.n = len(keep)
+        return buf
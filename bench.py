@@ -0,0 +1,231 @@
+# bench.py
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import engine
+import panel
+from calendars import calendar_map
+from synthetic import SyntheticStore, make_ohlcv
+
+# ----------------------------
+# Benchmark suite (offline, deterministic)
+# Every case runs on synthetic bars served through engine.use_store, so numbers are
+# comparable between machines and between V2.9.x releases. Output is JSON lines:
+# one record per (case, bars, symbols) plus environment metadata.
+#   python bench.py -o bench.jsonl
+#   python bench.py --compare old.jsonl bench.jsonl --threshold 1.25
+# ----------------------------
+DEFAULT_BARS = (1000, 5000, 20000)
+DEFAULT_SYMBOLS = (1, 100, 1000)
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+def _env() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "git": _git_rev(),
+    }
+
+def _time(fn, repeat: int) -> list[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+# ---- cases: build(bars, symbols) -> zero-arg callable timing one full pass over `symbols`
+def _case_indicator(fn):
+    def build(bars: int, symbols: int):
+        closes = [make_ohlcv(bars, seed=i)["Close"] for i in range(symbols)]
+        return lambda: [fn(c) for c in closes]
+    return build
+
+def _case_panel(fn):
+    def build(bars: int, symbols: int):
+        X = np.column_stack([make_ohlcv(bars, seed=i)["Close"].to_numpy() for i in range(symbols)])
+        return lambda: fn(X)
+    return build
+
+def _case_resample(bars: int, symbols: int):
+    frames = [make_ohlcv(bars, seed=i) for i in range(symbols)]
+    return lambda: [(engine._resample_ohlcv(d, "W"), engine._resample_ohlcv(d, "ME")) for d in frames]
+
+def _case_calendar_resample(bars: int, symbols: int):
+    frames = [make_ohlcv(bars, seed=i) for i in range(symbols)]
+    return lambda: [(calendar_map(d.index).resample(d, "W"), calendar_map(d.index).resample(d, "M")) for d in frames]
+
+def _pandas_true_sync_prep(df: pd.DataFrame) -> pd.DataFrame:
+    """The original resample + reindex(ffill) prep of the True-Sync backtest (baseline)."""
+    df = df.copy()
+    df_w = df["Close"].resample("W").last().to_frame()
+    df_w["MA50_w"] = df_w["Close"].rolling(50).mean()
+    df_w["bx_l"] = engine.get_rsi_ema(df_w["Close"], 20, 10)
+    df_w["w_bullish"] = (df_w["Close"] > df_w["MA50_w"]) & (df_w["bx_l"] > -5)
+    df_m = df["Close"].resample("ME").last().to_frame()
+    df_m["m_bullish"] = df_m["Close"] > df_m["Close"].rolling(20).mean()
+    df["w_bullish"] = df_w["w_bullish"].reindex(df.index, method="ffill")
+    df["m_bullish"] = df_m["m_bullish"].reindex(df.index, method="ffill")
+    df["Upper_ref"] = df["High"].rolling(252).max().shift(1)
+    df["Lower_ref"] = df["Low"].rolling(20).min().shift(1)
+    df["MA50"] = df["Close"].rolling(50).mean()
+    df["Vol_MA20"] = df["Volume"].rolling(20).mean()
+    df["bx_s"] = engine.get_rsi_ema(df["Close"], 5, 3)
+    return df
+
+def _case_prepare(sync: str | None):
+    """_prepare_true_sync on fresh graphs (sync=None: the pandas baseline above)."""
+    def build(bars: int, symbols: int):
+        frames = [make_ohlcv(bars, seed=i) for i in range(symbols)]
+        if sync is None:
+            return lambda: [_pandas_true_sync_prep(d) for d in frames]
+        return lambda: [engine._prepare_true_sync(d.copy(), sync=sync) for d in frames]
+    return build
+
+def _symbols(symbols: int) -> list[str]:
+    return [f"SYN{i:04d}" for i in range(symbols)]
+
+def _case_eod(bars: int, symbols: int):
+    engine.use_store(SyntheticStore(bars))
+    names = _symbols(symbols)
+    return lambda: [engine.run_eod_analyzer(s) for s in names]
+
+def _case_backtest(bars: int, symbols: int):
+    engine.use_store(SyntheticStore(bars))
+    names = _symbols(symbols)
+    return lambda: [engine.run_smartstock_v296_engine(s, None, None) for s in names]
+
+def _case_charts(bars: int, symbols: int):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from charts import draw_v296_charts
+
+    engine.use_store(SyntheticStore(bars))
+    results = [engine.run_eod_analyzer(s) for s in _symbols(symbols)]
+
+    def run():
+        for name, res in zip(_symbols(symbols), results):
+            plt.close(draw_v296_charts(res, name))
+    return run
+
+def _case_bootstrap(method: str):
+    def build(bars: int, symbols: int):
+        from robustness import equity_bootstrap
+
+        curves = [pd.DataFrame({"Equity": make_ohlcv(bars, seed=i)["Close"].to_numpy()}) for i in range(symbols)]
+        return lambda: [equity_bootstrap(eq, n_paths=10000, method=method, seed=0) for eq in curves]
+    return build
+
+CASES = {
+    "calculate_rsi_wilder": _case_indicator(lambda c: engine.calculate_rsi_wilder(c, 5)),
+    "get_rsi_ema": _case_indicator(lambda c: engine.get_rsi_ema(c, 5, 3)),
+    "panel.rsi_ema": _case_panel(lambda X: panel.rsi_ema(X, 5, 3)),
+    "panel.rolling_max": _case_panel(lambda X: panel.rolling_max(X, 252, 1)),
+    "_resample_ohlcv": _case_resample,
+    "calendar_map.resample": _case_calendar_resample,
+    "_prepare_true_sync.legacy": _case_prepare("legacy"),
+    "_prepare_true_sync.dense": _case_prepare("dense"),
+    "_prepare_true_sync.pandas": _case_prepare(None),
+    "run_eod_analyzer": _case_eod,
+    "run_smartstock_v296_engine": _case_backtest,
+    "draw_v296_charts": _case_charts,
+    "robustness.equity_bootstrap": _case_bootstrap("block"),
+    "robustness.equity_bootstrap.iid": _case_bootstrap("iid"),
+}
+
+# per-case symbol caps (rendering 1000 charts, or 1000 x 10k bootstrap paths, per pass
+# measures nothing new)
+MAX_SYMBOLS = {"draw_v296_charts": 10, "robustness.equity_bootstrap": 1, "robustness.equity_bootstrap.iid": 1}
+
+def run_benchmarks(cases=None, bars=DEFAULT_BARS, symbols=DEFAULT_SYMBOLS, repeat: int = 3,
+                   max_work: int = 5_000_000):
+    """
+    Yield one record per (case, bars, symbols). Combinations with bars * symbols
+    above `max_work`, or more symbols than the case's MAX_SYMBOLS cap, are reported
+    as skipped rather than run.
+    """
+    env = _env()
+    for name in cases or CASES:
+        for n_bars in bars:
+            for n_sym in symbols:
+                rec = {"case": name, "bars": n_bars, "symbols": n_sym, "repeat": repeat, **env}
+                if n_bars * n_sym > max_work:
+                    yield {**rec, "status": "skipped", "reason": "max_work"}
+                    continue
+                if n_sym > MAX_SYMBOLS.get(name, n_sym):
+                    yield {**rec, "status": "skipped", "reason": "max_symbols"}
+                    continue
+                try:
+                    fn = CASES[name](n_bars, n_sym)
+                    fn()  # warm-up: caches, imports, first-touch allocations
+                    times = _time(fn, repeat)
+                    yield {**rec, "status": "ok", "best_s": min(times), "mean_s": sum(times) / len(times),
+                           "per_symbol_s": min(times) / n_sym}
+                except ImportError as exc:
+                    yield {**rec, "status": "skipped", "reason": f"missing dependency: {exc.name}"}
+                finally:
+                    engine.use_store(None)
+
+def compare(old_path: str, new_path: str, threshold: float = 1.25) -> list[dict]:
+    """Return the cases whose best time grew by more than `threshold`x between two result files."""
+    def load(path):
+        with open(path) as fh:
+            recs = [json.loads(line) for line in fh if line.strip()]
+        return {(r["case"], r["bars"], r["symbols"]): r for r in recs if r.get("status") == "ok"}
+    old, new = load(old_path), load(new_path)
+    out = []
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key]["best_s"] / old[key]["best_s"] if old[key]["best_s"] > 0 else float("inf")
+        if ratio > threshold:
+            out.append({"case": key[0], "bars": key[1], "symbols": key[2], "old_s": old[key]["best_s"],
+                        "new_s": new[key]["best_s"], "ratio": ratio})
+    return out
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="SmartStock V2.9.6 benchmark suite")
+    ap.add_argument("-o", "--out", help="JSON-lines output (default: stdout)")
+    ap.add_argument("--case", action="append", choices=sorted(CASES), help="repeatable; default: all")
+    ap.add_argument("--bars", type=int, nargs="+", default=list(DEFAULT_BARS))
+    ap.add_argument("--symbols", type=int, nargs="+", default=list(DEFAULT_SYMBOLS))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--max-work", type=int, default=5_000_000, help="skip cases with bars*symbols above this")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="report regressions between two result files")
+    ap.add_argument("--threshold", type=float, default=1.25)
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        for r in regressions:
+            print(json.dumps(r))
+        return 1 if regressions else 0
+
+    fh = open(args.out, "w") if args.out else sys.stdout
+    try:
+        for rec in run_benchmarks(args.case, args.bars, args.symbols, args.repeat, args.max_work):
+            fh.write(json.dumps(rec) + "\n")
+            fh.flush()
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from engine import (V296_PARAMS, IndicatorGraph, _download_daily, data_fingerprint, run_eod_analyzer,
+                    run_smartstock_v296_engine)
+from instrument import count
+
+# ----------------------------
+# Process-wide result cache (shared by every Streamlit session of one server)
+# Four layers:
+#   _DATA    : downloaded daily frames, kept for a short `data_ttl` so repeat views
+#              do not hit the provider at all
+#   _GRAPHS  : engine.IndicatorGraph per (ticker, data fingerprint), so EOD, backtest
+#              and charts of the same bars share every indicator node
+#   _CHECKPOINTS : backtest snapshot per (ticker, start, params); moving `end` forward
+#              resumes from it instead of replaying from bar 252
+#   _RESULTS : EOD / backtest outputs keyed on (ticker, start, end, params, data
+#              fingerprint); a result is only recomputed when the bars it was
+#              built from change (new bar, revised/adjusted history); empty
+#              results (no data, too short, failed run) are not cached
+# Cached values are shared objects: callers must treat them as read-only.
+# ----------------------------
+class LRUCache:
+    """Thread-safe bounded LRU with an optional per-entry TTL (seconds)."""
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 128, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, self._MISSING)
+            if item is not self._MISSING:
+                stored_at, value = item
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+_DATA = LRUCache(maxsize=256, ttl=300.0)
+_RESULTS = LRUCache(maxsize=256, ttl=24 * 3600.0)
+_GRAPHS = LRUCache(maxsize=64, ttl=24 * 3600.0)
+_CHECKPOINTS = LRUCache(maxsize=256, ttl=24 * 3600.0)
+
+def configure(data_maxsize: int | None = None, data_ttl: float | None = None,
+              result_maxsize: int | None = None, result_ttl: float | None = None,
+              graph_maxsize: int | None = None, graph_ttl: float | None = None,
+              checkpoint_maxsize: int | None = None, checkpoint_ttl: float | None = None) -> None:
+    """Resize / re-time any of the four layers (None keeps a setting; existing entries are kept)."""
+    for cache, maxsize, ttl in ((_DATA, data_maxsize, data_ttl), (_RESULTS, result_maxsize, result_ttl),
+                                (_GRAPHS, graph_maxsize, graph_ttl), (_CHECKPOINTS, checkpoint_maxsize, checkpoint_ttl)):
+        if maxsize is not None:
+            cache.maxsize = maxsize
+        if ttl is not None:
+            cache.ttl = ttl
+
+def clear() -> None:
+    _DATA.clear()
+    _RESULTS.clear()
+    _GRAPHS.clear()
+    _CHECKPOINTS.clear()
+
+def cache_stats() -> dict:
+    return {"data": _DATA.stats(), "results": _RESULTS.stats(), "graphs": _GRAPHS.stats(),
+            "checkpoints": _CHECKPOINTS.stats()}
+
+def _params_key(params: dict | None) -> tuple:
+    return tuple(sorted({**V296_PARAMS, **(params or {})}.items()))
+
+def _cached_daily(symbol: str, start: str | None = None, end: str | None = None, period: str | None = None):
+    key = (symbol, start, end, period)
+    hit = _DATA.get(key)
+    if hit is not None:
+        count("cache.data.hit")
+        return hit
+    count("cache.data.miss")
+    df = _download_daily(symbol, start=start, end=end, period=period)
+    fp = data_fingerprint(df)
+    if not df.empty:  # a failed download is retried on the next view
+        _DATA.set(key, (df, fp))
+    return df, fp
+
+def cached_graph(symbol: str, df: pd.DataFrame, fp: str | None = None) -> IndicatorGraph:
+    """The shared IndicatorGraph of `df` (`fp`: its data_fingerprint, if already known)."""
+    key = (symbol, fp or data_fingerprint(df))
+    g = _GRAPHS.get(key)
+    if g is None:
+        count("cache.graph.miss")
+        g = IndicatorGraph(df, symbol)
+        _GRAPHS.set(key, g)
+    else:
+        count("cache.graph.hit")
+    return g
+
+def cached_eod_analyzer(symbol: str) -> dict | None:
+    """run_eod_analyzer with both cache layers (same return value)."""
+    d, fp = _cached_daily(symbol, period="10y")
+    key = ("eod", symbol, fp)
+    hit = _RESULTS.get(key)
+    if hit is not None:
+        count("cache.result.hit")
+        return hit
+    count("cache.result.miss")
+    res = run_eod_analyzer(symbol, graph=cached_graph(symbol, d, fp))
+    if res is not None:  # no data / too short / failed: ask again on the next view
+        _RESULTS.set(key, res)
+    return res
+
+def cached_backtest(symbol: str, start: str, end: str, params: dict | None = None, sync: str = "legacy"):
+    """run_smartstock_v296_engine with both cache layers (same return value)."""
+    df, fp = _cached_daily(symbol, start=start, end=end)
+    key = ("backtest", symbol, start, end, _params_key(params), sync, fp)
+    hit = _RESULTS.get(key)
+    if hit is not None:
+        count("cache.result.hit")
+        return hit
+    count("cache.result.miss")
+    cp_key = (symbol, start, _params_key(params), sync)
+    checkpoint = dict(_CHECKPOINTS.get(cp_key) or {})  # private copy: the engine overwrites it
+    out = run_smartstock_v296_engine(symbol, start, end, params=params, graph=cached_graph(symbol, df, fp),
+                                     checkpoint=checkpoint, sync=sync)
+    if checkpoint:
+        _CHECKPOINTS.set(cp_key, checkpoint)
+    if out[0]:  # same for an empty (failed) backtest
+        _RESULTS.set(key, out)
+    return out
@@ -0,0 +1,170 @@
+# calendars.py
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Calendar index maps (daily -> weekly / month-end buckets)
+# Computed once per trading calendar (= daily DatetimeIndex) and shared by every
+# symbol on it, so W/M pools and their daily sync become array ops instead of a
+# resample + reindex(method="ffill") per symbol:
+#   cal = calendar_map(df.index)
+#   w = cal.resample(df, "W")                 == _resample_ohlcv(df, "W")
+#   cal.ffill("W", w.index, w_flags)          == flags reindexed onto df.index (ffill)
+#   cal.scatter(w, "W")                       == w.reindex(pd.date_range(first, last, freq="W"))
+# Buckets follow pandas' "W" (W-SUN, labelled by the Sunday) and "ME" (labelled
+# by the month's last day); results are bit-identical to the pandas path, which
+# is still used for frames the fast path cannot reproduce (NaN bars, tz-aware
+# or non-float prices).
+# ----------------------------
+_NS_PER_DAY = 86_400_000_000_000
+_RULES = {"W": "W", "M": "ME"}
+_MAX_MAPS = 64
+
+class CalendarMap:
+    def __init__(self, index: pd.DatetimeIndex):
+        self.index = index
+        self._ns = index.as_unit("ns").asi8
+        self._buckets = {}
+        self._periods = {}
+        self._sync = {}
+
+    def _keys(self, tf: str) -> np.ndarray:
+        """Consecutive period id of every daily row (weeks Mon..Sun / calendar months)."""
+        day = self._ns // _NS_PER_DAY
+        if tf == "W":
+            return (day + 3) // 7                    # 1970-01-01 was a Thursday
+        if tf == "M":
+            return day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        raise ValueError(f"Unknown timeframe: {tf}")
+
+    def _labels(self, tf: str, keys: np.ndarray) -> pd.DatetimeIndex:
+        """Period-end labels of period ids (the Sunday / the month's last day)."""
+        if tf == "W":
+            end = (keys * 7 + 3).astype("datetime64[D]")
+        else:
+            end = (keys + 1).astype("datetime64[M]").astype("datetime64[D]") - 1
+        return pd.DatetimeIndex(end.astype(f"datetime64[{self.index.unit}]"), name=self.index.name)
+
+    def buckets(self, tf: str) -> tuple[np.ndarray, np.ndarray, pd.DatetimeIndex]:
+        """First row and size of every non-empty bucket, and the bucket labels. `tf`: "W" or "M"."""
+        out = self._buckets.get(tf)
+        if out is None:
+            key = self._keys(tf)
+            starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+            sizes = np.diff(np.r_[starts, len(key)])
+            out = self._buckets[tf] = (starts, sizes, self._labels(tf, key[starts]))
+        return out
+
+    def periods(self, tf: str) -> tuple[pd.DatetimeIndex, np.ndarray]:
+        """
+        Labels of every period from the first bucket to the last, empty ones included
+        (pd.date_range(first, last, freq="W" / "ME")), and each bucket's position in them.
+        """
+        out = self._periods.get(tf)
+        if out is None:
+            starts, _, labels = self.buckets(tf)
+            key = self._keys(tf)[starts]
+            if len(key):
+                pos = key - key[0]
+                out = (self._labels(tf, np.arange(key[0], key[-1] + 1)), pos)
+            else:
+                out = (labels, np.zeros(0, dtype=np.int64))
+            self._periods[tf] = out
+        return out
+
+    def scatter(self, pool: pd.DataFrame, tf: str) -> pd.DataFrame:
+        """A resample() pool of this calendar on every period, NaN rows for the empty ones."""
+        labels, pos = self.periods(tf)
+        if len(labels) == len(pool):
+            return pool
+        return pd.DataFrame({c: _scatter(pool[c].to_numpy(), pos, len(labels)) for c in pool.columns}, index=labels)
+
+    def resample(self, df: pd.DataFrame, tf: str) -> pd.DataFrame:
+        """_resample_ohlcv(df, "W" / "ME") for a frame on this calendar."""
+        if not _fast_ok(df):
+            from engine import _resample_ohlcv
+            return _resample_ohlcv(df, _RULES[tf])
+        starts, sizes, labels = self.buckets(tf)
+        last = starts + sizes - 1
+        cols = {c: df[c].to_numpy() for c in ("Open", "High", "Low", "Close", "Volume")}
+        return pd.DataFrame({
+            "Open": cols["Open"][starts],
+            "High": np.maximum.reduceat(cols["High"], starts),
+            "Low": np.minimum.reduceat(cols["Low"], starts),
+            "Close": cols["Close"][last],
+            "Volume": _group_sum(cols["Volume"], starts, sizes),
+        }, index=labels)
+
+    def sync_positions(self, tf: str, labels: pd.DatetimeIndex) -> np.ndarray:
+        """Per daily row, the position of the last label <= its date (-1 before the first)."""
+        for key, own in ((tf, self.buckets(tf)[2]), (tf + "*", self.periods(tf)[0])):
+            if labels is own or labels.equals(own):
+                pos = self._sync.get(key)
+                if pos is None:
+                    pos = self._sync[key] = np.searchsorted(own.as_unit("ns").asi8, self._ns, side="right") - 1
+                return pos
+        return np.searchsorted(labels.as_unit("ns").asi8, self._ns, side="right") - 1
+
+    def ffill(self, tf: str, labels: pd.DatetimeIndex, values: np.ndarray, fill=np.nan) -> np.ndarray:
+        """`values` (one per label) forward-filled onto the daily rows; `fill` before the first label."""
+        pos = self.sync_positions(tf, labels)
+        out = np.asarray(values)[np.maximum(pos, 0)]
+        if len(pos) and pos[0] < 0:
+            out = out.astype(np.result_type(out, np.asarray(fill)))
+            out[pos < 0] = fill
+        return out
+
+def _fast_ok(df: pd.DataFrame) -> bool:
+    """True if the array path reproduces _resample_ohlcv exactly for `df`."""
+    idx = df.index
+    if not isinstance(idx, pd.DatetimeIndex) or idx.tz is not None or not idx.is_monotonic_increasing or not len(idx):
+        return False
+    for c in ("Open", "High", "Low", "Close"):
+        if df[c].dtype != np.float64 or np.isnan(df[c].to_numpy()).any():
+            return False
+    v = df["Volume"]
+    return v.dtype == np.int64 or (v.dtype == np.float64 and not np.isnan(v.to_numpy()).any())
+
+def _scatter(x: np.ndarray, pos: np.ndarray, n: int) -> np.ndarray:
+    """`x` placed at `pos` of a length-`n` float array of NaN (reindex's upcast of int columns)."""
+    out = np.full(n, np.nan, dtype=np.result_type(x.dtype, np.float64))
+    out[pos] = x
+    return out
+
+def _group_sum(x: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Per-bucket sum with pandas' groupby summation (Kahan-compensated for floats)."""
+    if x.dtype.kind != "f":
+        return np.add.reduceat(x, starts)
+    total = np.zeros(len(starts))
+    comp = np.zeros(len(starts))
+    for k in range(int(sizes.max(initial=0))):
+        live = np.flatnonzero(sizes > k)
+        s, c = total[live], comp[live]
+        y = x[starts[live] + k] - c
+        t = s + y
+        c = t - s - y
+        c[~np.isfinite(c)] = 0.0
+        total[live], comp[live] = t, c
+    return total
+
+# ----------------------------
+# Shared maps, keyed by the calendar's dates
+# ----------------------------
+_MAPS = {}
+_LOCK = threading.Lock()
+
+def calendar_map(index: pd.DatetimeIndex) -> CalendarMap:
+    """The CalendarMap of `index`, built on first use and shared by every frame on the same dates."""
+    values = np.ascontiguousarray(index.asi8)
+    key = (len(values), str(index.dtype), hashlib.blake2b(values.tobytes(), digest_size=16).digest(), index.name)
+    with _LOCK:
+        cal = _MAPS.pop(key, None)
+        if cal is None:
+            cal = CalendarMap(index)
+        _MAPS[key] = cal  # most recently used last
+        while len(_MAPS) > _MAX_MAPS:
+            del _MAPS[next(iter(_MAPS))]
+    return cal
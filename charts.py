@@ -0,0 +1,106 @@
+# charts.py
+import io
+
+import mplfinance as mpf
+from matplotlib.figure import Figure
+
+from cache import LRUCache, cached_graph
+from engine import data_fingerprint
+from instrument import count, stage
+
+# ----------------------------
+# Plotting (Colab-style long figure)
+# IMPORTANT: Use data pools from run_eod_analyzer:
+#   - D_Data is daily downloaded once
+#   - W_Data/M_Data are resampled from daily inside engine (aligned)
+# Overlays come from the shared indicator graph (cache.cached_graph): nodes already
+# built by the EOD audit (daily 252H/20L/MA200, weekly MA50/bx_l) are read as is;
+# the others are computed on the visible window plus its warm-up only
+# (IndicatorGraph.tail), not on the full 10y D/W/M pools.
+# ----------------------------
+CHART_CONFIGS = [
+    # tf, show_n, h_p, l_p, ma_p, name
+    ("D", 80, 252, 20, 200, "DAILY"),
+    ("W", 52, 52, 10, 50, "WEEKLY"),
+    ("M", 40, 12, 6, 20, "MONTHLY"),
+]
+
+_PNG_CACHE = LRUCache(maxsize=128)
+
+def _window_overlays(g, tf: str, show_n: int, h_p: int, l_p: int, ma_p: int):
+    """Last `show_n` bars of timeframe `tf` with HI/LO/MA/bx_s/bx_l taken from graph `g`."""
+    df = g.bars(tf).tail(show_n).copy()
+    df["HI"] = g.tail(tf, show_n, "max_ref", "High", h_p)
+    df["LO"] = g.tail(tf, show_n, "min_ref", "Low", l_p)
+    df["MA"] = g.tail(tf, show_n, "sma", "Close", ma_p)
+
+    # BX: follow your chart preference (bar + line)
+    # bx_s: (5,3) ; bx_l: (20,10)
+    df["bx_s"] = g.tail(tf, show_n, "rsi_ema", "Close", 5, 3)
+    df["bx_l"] = g.tail(tf, show_n, "rsi_ema", "Close", 20, 10)
+    return df
+
+def draw_v296_charts(data_dict: dict, ticker: str, graph=None):
+    """`graph`: the IndicatorGraph of data_dict["D_Data"] (looked up in the shared cache if omitted)."""
+    g = graph if graph is not None else cached_graph(ticker, data_dict["D_Data"])
+    fig = Figure(figsize=(14, 22), facecolor="white")
+    gs = fig.add_gridspec(9, 1)
+
+    mc = mpf.make_marketcolors(up="#ef5350", down="#26a69a", edge="inherit", wick="inherit")
+    style = mpf.make_mpf_style(marketcolors=mc, gridstyle="--", gridcolor="#eeeeee", facecolor="white")
+
+    for i, (tf, show_n, h_p, l_p, ma_p, name) in enumerate(CHART_CONFIGS):
+        with stage("chart.overlays"):
+            p_df = _window_overlays(g, tf, show_n, h_p, l_p, ma_p)
+
+        ax_p = fig.add_subplot(gs[i * 3:i * 3 + 2, 0])
+        ax_b = fig.add_subplot(gs[i * 3 + 2, 0])
+
+        bar_colors = ["#26a69a" if v > 0 else "#ef5350" for v in p_df["bx_s"]]
+
+        apds = [
+            mpf.make_addplot(p_df["HI"], ax=ax_p, color="#9c27b0", linestyle="--", width=1.0),
+            mpf.make_addplot(p_df["LO"], ax=ax_p, color="#ff9800", linestyle=":", width=1.5),
+            mpf.make_addplot(p_df["MA"], ax=ax_p, color="#2196f3", linestyle="-", width=1.2),
+
+            mpf.make_addplot(p_df["bx_s"], ax=ax_b, type="bar", color=bar_colors, width=0.7),
+            # FIX: mplfinance does NOT accept linewidth= ; use width=
+            mpf.make_addplot(p_df["bx_l"], ax=ax_b, color="#1a237e", width=1.5),
+        ]
+
+        with stage("chart.plot"):
+            mpf.plot(
+                p_df,
+                type="candle",
+                ax=ax_p,
+                addplot=apds,
+                style=style,
+                datetime_format="%y-%m"
+            )
+
+        ax_p.set_title(f"{name} | {ticker} | V2.9.6", fontsize=12, fontweight="bold", loc="left")
+        ax_b.axhline(0, color="gray", alpha=0.3)
+        ax_b.set_ylabel("BX", fontsize=8)
+
+    fig.tight_layout()
+    return fig
+
+def render_v296_png(data_dict: dict, ticker: str, dpi: int = 100) -> bytes:
+    """
+    PNG of draw_v296_charts, cached per (ticker, data fingerprint of the daily bars, dpi):
+    the same key as the shared graph, so any new or revised bar (also deep in the
+    warm-up history of the overlays) renders a new picture.
+    """
+    key = (ticker, data_fingerprint(data_dict["D_Data"]), dpi)
+    png = _PNG_CACHE.get(key)
+    if png is not None:
+        count("cache.chart.hit")
+        return png
+    count("cache.chart.miss")
+    fig = draw_v296_charts(data_dict, ticker)
+    with stage("chart.render"):
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, facecolor="white")
+    png = buf.getvalue()
+    _PNG_CACHE.set(key, png)
+    return png
@@ -0,0 +1,125 @@
+# cli.py
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+# ----------------------------
+# Headless batch entry point (no Streamlit, no plotting)
+#   python cli.py eod symbols.txt -o out/                      -> out/eod.csv
+#   python cli.py backtest symbols.txt --start 2020-01-01 -o out/
+#                                      -> out/backtest.csv, out/trades/<sym>.csv, out/equity/<sym>.csv
+#                                         (+ --trace out/audit.npz: every state-machine decision, see audit.py)
+# Only the standard library is imported at module load; each subcommand imports
+# the engine (pandas/numpy) when it runs, yfinance only if it actually downloads,
+# so `--help`, argument errors and cache-served runs start fast.
+# ----------------------------
+BACKTEST_COLUMNS = ("symbol", "status", "Total Return", "Max Drawdown", "Macro Vetoes", "Signals Issued",
+                    "Signals Triggered", "Breakout Trades", "Reversal Trades", "Final Equity", "Trades")
+
+def _parse_params(items: list[str] | None) -> dict:
+    """KEY=VALUE overrides of V296_PARAMS; values are JSON (numbers, true/false)."""
+    from engine import V296_PARAMS
+    params = {}
+    for item in items or ():
+        key, sep, value = item.partition("=")
+        if not sep or key not in V296_PARAMS:
+            raise ValueError(f"Unknown parameter: {item!r} (expected one of {', '.join(V296_PARAMS)})")
+        params[key] = json.loads(value)
+    return params
+
+def _write_csv(path: str, rows: list[dict], columns) -> None:
+    with open(path, "w", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+# ----------------------------
+# Subcommands
+# ----------------------------
+def cmd_eod(args) -> int:
+    from screener import SCREEN_COLUMNS, iter_screen, read_symbols, screen_symbol
+    from store import open_store
+    symbols = read_symbols(args.symbols)
+    store = open_store(args.store, args.offline)
+    if args.workers > 1:
+        rows = iter_screen(symbols, args.workers, args.period, store=store)
+    else:
+        from engine import use_store
+        use_store(store)
+        rows = (screen_symbol(s, args.period) for s in symbols)
+    os.makedirs(args.out, exist_ok=True)
+    rows = list(rows)
+    _write_csv(os.path.join(args.out, "eod.csv"), rows, SCREEN_COLUMNS)
+    return sum(r["Action"] == "ERROR" for r in rows)
+
+def cmd_backtest(args) -> int:
+    from engine import run_smartstock_v296_engine, use_store
+    from screener import read_symbols
+    from store import open_store
+    use_store(open_store(args.store, args.offline))
+    trace = None
+    if args.trace:
+        from audit import TraceBuffer
+        trace = TraceBuffer(args.trace_capacity)
+    end = args.end or time.strftime("%Y-%m-%d")
+    for sub in ("trades", "equity"):
+        os.makedirs(os.path.join(args.out, sub), exist_ok=True)
+
+    rows = []
+    for symbol in read_symbols(args.symbols):
+        stats, trades_df, equity_df = run_smartstock_v296_engine(symbol, args.start, end, params=args.params or None,
+                                                                 trace=trace)
+        if not stats:
+            rows.append({"symbol": symbol, "status": "empty"})
+            continue
+        name = symbol.replace("/", "_")
+        trades_df.to_csv(os.path.join(args.out, "trades", f"{name}.csv"), index=False)
+        equity_df.to_csv(os.path.join(args.out, "equity", f"{name}.csv"), index=False)
+        rows.append({"symbol": symbol, "status": "ok", **stats, "Trades": len(trades_df)})
+    _write_csv(os.path.join(args.out, "backtest.csv"), rows, BACKTEST_COLUMNS)
+    if trace is not None:
+        trace.save(args.trace)
+        if trace.dropped:
+            print(f"trace: {trace.dropped} oldest events dropped (raise --trace-capacity)", file=sys.stderr)
+    return sum(r["status"] != "ok" for r in rows)
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="SmartStock V2.9.6 headless EOD audit / backtest")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    def common(p):
+        p.add_argument("symbols", help="file with one ticker per line")
+        p.add_argument("-o", "--out", required=True, help="output directory")
+        p.add_argument("--store", help="local OHLCV store directory (see store.py)")
+        p.add_argument("--offline", metavar="DIR", help="read <DIR>/<symbol>.csv instead of yfinance")
+
+    ep = sub.add_parser("eod", help="EOD decision for every symbol -> eod.csv")
+    common(ep)
+    ep.add_argument("--period", default="10y")
+    ep.add_argument("-w", "--workers", type=int, default=1, help="processes (1 = in-process)")
+
+    bp = sub.add_parser("backtest", help="True-Sync backtest for every symbol -> backtest.csv + trades/ + equity/")
+    common(bp)
+    bp.add_argument("--start", default="2020-01-01")
+    bp.add_argument("--end", help="exclusive (default: today)")
+    bp.add_argument("-p", "--param", action="append", metavar="KEY=VALUE", help="override a V296_PARAMS entry")
+    bp.add_argument("--trace", metavar="FILE", help="write the decision trace (.npz, .csv or .jsonl)")
+    bp.add_argument("--trace-capacity", type=int, default=1_000_000, help="events kept in the trace ring")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "backtest":
+        try:
+            args.params = _parse_params(args.param)
+        except ValueError as exc:
+            ap.error(str(exc))
+
+    t0 = time.perf_counter()
+    failed = cmd_eod(args) if args.cmd == "eod" else cmd_backtest(args)
+    print(f"{args.cmd}: {failed} failed, {time.perf_counter() - t0:.1f}s -> {args.out}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,13 @@
 # engine.py
+import hashlib
+
 import pandas as pd
 import numpy as np
-import yfinance as yf
+
+import audit
+from calendars import CalendarMap, calendar_map
+from incremental import TrueSyncRefs
+from instrument import count, error, stage
 
 # ----------------------------
 # Core Indicators (Colab-aligned)
@@ -19,16 +25,37 @@ def get_rsi_ema(series: pd.Series, rsi_period: int, ema_span: int) -> pd.Series:
     rsi = calculate_rsi_wilder(series, rsi_period)
     return (rsi - 50).ewm(span=ema_span, adjust=False).mean()
 
-def _download_daily(symbol: str, start: str | None = None, end: str | None = None, period: str | None = None) -> pd.DataFrame:
+# Optional local OHLCV store (see store.py); None keeps the direct yfinance path.
+_STORE = None
+
+def use_store(store) -> None:
+    """Route `_download_daily` through a local `store.OHLCVStore` (pass None to disable)."""
+    global _STORE
+    _STORE = store
+
+def _fetch_yf(symbol: str, start: str | None = None, end: str | None = None, period: str | None = None) -> pd.DataFrame:
+    import yfinance as yf  # ~0.2s to import; only the online download path needs it
+    # one Ticker per call: yf.download shares module-level result state between calls
+    # and is not safe from the screener / fetch.Fetcher worker threads
+    ticker = yf.Ticker(symbol)
     if period:
-        df = yf.download(symbol, period=period, interval="1d", auto_adjust=True)
+        df = ticker.history(period=period, interval="1d", auto_adjust=True)
     else:
-        df = yf.download(symbol, start=start, end=end, interval="1d", auto_adjust=True)
+        df = ticker.history(start=start, end=end, interval="1d", auto_adjust=True)
     if df is None or df.empty:
         return pd.DataFrame()
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
-    df = df.dropna(subset=["Open","High","Low","Close","Volume"], how="any")
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)  # exchange-local dates, like yf.download
+    df = df[["Open","High","Low","Close","Volume"]].dropna(how="any")
+    return df
+
+def _download_daily(symbol: str, start: str | None = None, end: str | None = None, period: str | None = None) -> pd.DataFrame:
+    with stage("download"):
+        if _STORE is not None:
+            df = _STORE.get(symbol, start=start, end=end, period=period)
+        else:
+            df = _fetch_yf(symbol, start=start, end=end, period=period)
+    count("bars.daily", len(df))
     return df
 
 def _resample_ohlcv(df_d: pd.DataFrame, rule: str) -> pd.DataFrame:
@@ -42,77 +69,246 @@ def _resample_ohlcv(df_d: pd.DataFrame, rule: str) -> pd.DataFrame:
     })
     return out.dropna(subset=["Open","High","Low","Close"], how="any")
 
+# ----------------------------
+# Indicator graph (shared by EOD, backtest and charts)
+# One graph per daily frame (= one data version of one symbol). Nodes are keyed on
+# (timeframe, indicator, column, params) and computed once on first use:
+#   g.bars("W")                          -> weekly OHLCV pool
+#   g.node("W", "sma", "Close", 50)      -> weekly MA50
+#   g.node("D", "max_ref", "High", 252)  -> 252D high of the bars *before* each bar
+#   g.tail("D", 80, "sma", "Close", 200) -> last 80 bars of that node: read from the
+#                                           node if built, else computed on the last
+#                                           80 bars + warm-up only (not stored)
+# Timeframes: "D" daily, "W" weekly, "M" month-end (same pools as _resample_ohlcv,
+# built from the shared calendars.calendar_map of the daily index); "W*" / "M*" are
+# the same pools on every calendar period from the first bar to the last, NaN rows
+# for periods without bars (Colab's `Close.resample(...).last()` backtest pools).
+# cache.cached_graph shares graphs process-wide by (symbol, data fingerprint).
+# ----------------------------
+_INDICATORS = {
+    "sma": lambda s, n: s.rolling(n).mean(),
+    "max": lambda s, n: s.rolling(n).max(),
+    "min": lambda s, n: s.rolling(n).min(),
+    "max_ref": lambda s, n: s.rolling(n).max().shift(1),
+    "min_ref": lambda s, n: s.rolling(n).min().shift(1),
+    "rsi": calculate_rsi_wilder,
+    "rsi_ema": get_rsi_ema,
+}
+
+# warm-up bars in front of a `tail` window: the rolling lookback (+1 for the shift of
+# *_ref, so HI/LO/MA are exact); the recursive RSI / EMA get 400 bars (their weights
+# decay by at most 0.95 per bar: 0.95**400 < 1e-8)
+RECURSIVE_WARMUP = 400
+_WARMUP = {
+    "sma": lambda n: n - 1,
+    "max": lambda n: n - 1,
+    "min": lambda n: n - 1,
+    "max_ref": lambda n: n,
+    "min_ref": lambda n: n,
+    "rsi": lambda *p: RECURSIVE_WARMUP,
+    "rsi_ema": lambda *p: RECURSIVE_WARMUP,
+}
+
+class IndicatorGraph:
+    def __init__(self, daily: pd.DataFrame, symbol: str | None = None):
+        self.daily = daily
+        self.symbol = symbol
+        self._calendar = None
+        self._nodes = {}
+
+    @property
+    def calendar(self) -> CalendarMap:
+        """Shared calendar map of the daily index (see calendars.py)."""
+        if self._calendar is None:
+            self._calendar = calendar_map(self.daily.index)
+        return self._calendar
+
+    def bars(self, tf: str) -> pd.DataFrame:
+        if tf == "D":
+            return self.daily
+        key = (tf, "bars")
+        out = self._nodes.get(key)
+        if out is None and tf in ("W*", "M*"):
+            dense = self.bars(tf[0])
+            if dense.index.equals(self.calendar.buckets(tf[0])[2]):
+                out = self.calendar.scatter(dense, tf[0])
+            elif len(dense):  # pandas resample fallback (see calendars._fast_ok)
+                full = pd.date_range(dense.index[0], dense.index[-1], freq="W" if tf == "W*" else "ME",
+                                     name=dense.index.name, unit=dense.index.unit)
+                out = dense.reindex(full)
+            else:
+                out = dense
+            self._nodes[key] = out
+        elif out is None:
+            with stage("resample"):
+                out = self.calendar.resample(self.daily, tf)
+            count("bars.weekly" if tf == "W" else "bars.monthly", len(out))
+            self._nodes[key] = out
+        return out
+
+    def node(self, tf: str, indicator: str, column: str = "Close", *params) -> pd.Series:
+        key = (tf, indicator, column, params)
+        out = self._nodes.get(key)
+        if out is None:
+            count("graph.miss")
+            out = _INDICATORS[indicator](self.bars(tf)[column], *params)
+            self._nodes[key] = out
+        else:
+            count("graph.hit")
+        return out
+
+    def tail(self, tf: str, n: int, indicator: str, column: str = "Close", *params) -> pd.Series:
+        """Last `n` values of node(tf, indicator, column, *params), without building the full node."""
+        out = self._nodes.get((tf, indicator, column, params))
+        if out is not None:
+            count("graph.hit")
+            return out.tail(n)
+        count("graph.window")
+        src = self.bars(tf)[column].tail(n + _WARMUP[indicator](*params))
+        return _INDICATORS[indicator](src, *params).tail(n)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
 # ----------------------------
 # EOD Analyzer (Aligned with your V2.9.6 decision tree)
 # Uses a single DAILY pool, and resamples for W/M.
 # ----------------------------
-def run_eod_analyzer(symbol: str) -> dict | None:
+def _eod_refs(g: IndicatorGraph) -> dict:
+    """Cheap daily refs of the last bar (no resampling, no RSI)."""
+    d = g.daily
+    c_d = float(d["Close"].iloc[-1])
+    h_d = float(d["High"].iloc[-1])
+    l_d = float(d["Low"].iloc[-1])
+    v_d = float(d["Volume"].iloc[-1])
+
+    h_ref = float(g.node("D", "max_ref", "High", 252).iloc[-1])
+    s_ref = float(g.node("D", "min_ref", "Low", 20).iloc[-1])
+
+    ma_long = float(g.node("D", "sma", "Close", 200).iloc[-1])
+    ma_mid  = float(g.node("D", "sma", "Close", 50).iloc[-1])
+    vol_ma20 = float(g.node("D", "sma", "Volume", 20).iloc[-1])
+
+    return {
+        "c_d": c_d,
+        "h_ref": h_ref,
+        "s_ref": s_ref,
+        "ma_long": ma_long,
+        "ma_mid": ma_mid,
+        "dist_pct": (h_ref - c_d) / h_ref if h_ref > 0 else np.nan,
+        "fuel": v_d / vol_ma20 if vol_ma20 > 0 else 0.0,
+        "push": (c_d - l_d) / (h_d - l_d) if h_d != l_d else 0.5,
+    }
+
+def _eod_macro(g: IndicatorGraph):
+    """Weekly/monthly pools and macro flags. Returns: w, m, w_bullish, m_bullish."""
+    w = g.bars("W")  # weekly from daily
+    m = g.bars("M")  # month-end from daily
+
+    with stage("indicators.macro"):
+        # Colab-style: weekly needs bx_l>-5
+        bx_l_w = float(g.node("W", "rsi_ema", "Close", 20, 10).iloc[-1]) if len(w) > 25 else -999
+        w_bullish = bool((w["Close"].iloc[-1] > g.node("W", "sma", "Close", 50).iloc[-1]) and (bx_l_w > -5))
+
+        m_bullish = bool(m["Close"].iloc[-1] > g.node("M", "sma", "Close", 20).iloc[-1]) if len(m) > 25 else False
+    return w, m, w_bullish, m_bullish
+
+def _eod_bx_s_cross(g: IndicatorGraph):
+    """Daily bx_s of the last two bars. Returns: bx_s_prev, bx_s_now."""
+    with stage("indicators.bx_s"):
+        bx_s = g.node("D", "rsi_ema", "Close", 5, 3)
+    bx_s_prev = float(bx_s.iloc[-2]) if len(bx_s) >= 2 else 0.0
+    bx_s_now  = float(bx_s.iloc[-1]) if len(bx_s) >= 1 else 0.0
+    return bx_s_prev, bx_s_now
+
+def _eod_decision(r: dict, macro, bx_s_cross) -> tuple[str, str]:
+    """
+    V2.9.6 decision tree over the refs of `_eod_refs`.
+    `macro()` -> (w_bullish, m_bullish) and `bx_s_cross()` -> (bx_s_prev, bx_s_now)
+    are only called on the branches that need them.
+    """
+    c_d = r["c_d"]
+    if c_d < r["s_ref"]:
+        return "SELL / 卖出", "Break 20D Support / 跌破20日支撑"
+
+    w_bullish, m_bullish = macro()
+    if not (w_bullish and m_bullish):
+        return "WAIT / MACRO_VETO", f"Macro Fail / 宏观否决 (W:{'PASS' if w_bullish else 'FAIL'}, M:{'PASS' if m_bullish else 'FAIL'})"
+
+    if c_d > r["h_ref"]:
+        if r["fuel"] > 1.2 and r["push"] > 0.7:
+            return "BUY / 突破买入", "Strong Breakout / 高位放量强势突破"
+        return "WAIT / 弱突破", "Above High but no fuel/push / 站上高点但动能不足"
+    if r["dist_pct"] < 0.01:
+        if r["fuel"] < 1.0:
+            return "WAIT / 等待(ABSORBING/消化压力)", "Near high with low volume / 高位缩量消化"
+    elif c_d > r["ma_mid"]:
+        bx_s_prev, bx_s_now = bx_s_cross()
+        if bx_s_prev <= 0 and bx_s_now > 0:
+            return "BUY / 反转买入", "Momentum Reversal / 动能由弱转强"
+    return "WAIT / 等待", "Normal Consolidation / 正常整理"
+
+_EOD_KINDS = {
+    "SELL / 卖出": audit.SELL_SIGNAL,
+    "WAIT / MACRO_VETO": audit.VETO,
+    "BUY / 突破买入": audit.BREAKOUT,
+    "BUY / 反转买入": audit.REVERSAL,
+}
+
+def _eod_event(g: IndicatorGraph, r: dict, action: str, w_bullish: bool, m_bullish: bool) -> tuple:
+    """audit.ROW_DTYPE row of one EOD decision; every other action is a "wait"."""
+    kind = _EOD_KINDS.get(action, audit.WAIT)
+    ref = r["s_ref"] if kind == audit.SELL_SIGNAL else r["ma_mid"] if kind == audit.REVERSAL else r["h_ref"]
+    bx_s_now = _eod_bx_s_cross(g)[1] if kind == audit.REVERSAL else np.nan
+    entry = audit.REVERSAL_ENTRY if kind == audit.REVERSAL else audit.BREAKOUT_ENTRY if kind == audit.BREAKOUT else 0
+    return (np.datetime64(g.daily.index[-1], "ns"), kind, entry, 0, w_bullish, m_bullish, r["c_d"],
+            ref, r["fuel"], r["push"], bx_s_now, np.nan, np.nan)
+
+def _eod_row(symbol: str, r: dict, action: str, reason: str, macro: str) -> dict:
+    return {
+        "symbol": symbol,
+        "Action": action,
+        "Reason": reason,
+        "Fuel": f"{r['fuel']:.2f}x",
+        "Push": f"{r['push']:.1%}",
+        "Gap": f"{r['dist_pct']:.2%}",
+        "Stop": round(r["s_ref"], 2),
+        "Macro": macro,
+    }
+
+def run_eod_analyzer(symbol: str, data: pd.DataFrame | None = None,
+                     graph: IndicatorGraph | None = None, trace: audit.TraceBuffer | None = None) -> dict | None:
+    """
+    `data`: an already downloaded 10y daily frame (skips the download).
+    `graph`: an IndicatorGraph over that frame, shared with other consumers (implies `data`).
+    `trace`: an audit.TraceBuffer receiving the decision of the last bar (see _eod_event).
+    """
     try:
         # Use enough bars to compute 252H/200MA etc.
-        d = _download_daily(symbol, period="10y")
+        if graph is not None:
+            d = graph.daily
+        else:
+            d = data if data is not None else _download_daily(symbol, period="10y")
         if d.empty or len(d) < 260:
             return None
-
-        w = _resample_ohlcv(d, "W")   # weekly from daily
-        m = _resample_ohlcv(d, "ME")  # month-end from daily
+        g = graph if graph is not None else IndicatorGraph(d, symbol)
 
         # ---- refs (same spirit as your Colab/EOD audit)
-        c_d = float(d["Close"].iloc[-1])
-        h_d = float(d["High"].iloc[-1])
-        l_d = float(d["Low"].iloc[-1])
-        v_d = float(d["Volume"].iloc[-1])
-
-        h_ref = float(d["High"].rolling(252).max().shift(1).iloc[-1])
-        s_ref = float(d["Low"].rolling(20).min().shift(1).iloc[-1])
-
-        ma_long = float(d["Close"].rolling(200).mean().iloc[-1])
-        ma_mid  = float(d["Close"].rolling(50).mean().iloc[-1])
-        vol_ma20 = float(d["Volume"].rolling(20).mean().iloc[-1])
+        with stage("indicators.refs"):
+            r = _eod_refs(g)
 
-        dist_pct = (h_ref - c_d) / h_ref if h_ref > 0 else np.nan
-        fuel = v_d / vol_ma20 if vol_ma20 > 0 else 0.0
-        push = (c_d - l_d) / (h_d - l_d) if h_d != l_d else 0.5
-
-        # ---- Macro (Colab-style: weekly needs bx_l>-5)
-        bx_l_w = float(get_rsi_ema(w["Close"], 20, 10).iloc[-1]) if len(w) > 25 else -999
-        w_bullish = (w["Close"].iloc[-1] > w["Close"].rolling(50).mean().iloc[-1]) and (bx_l_w > -5)
-
-        m_bullish = (m["Close"].iloc[-1] > m["Close"].rolling(20).mean().iloc[-1]) if len(m) > 25 else False
+        # ---- Macro: W/M pools are needed for plotting anyway, so evaluate eagerly
+        w, m, w_bullish, m_bullish = _eod_macro(g)
         macro_pass = bool(w_bullish and m_bullish)
 
-        # ---- bx_s reversal check (daily)
-        bx_s = get_rsi_ema(d["Close"], 5, 3)
-        bx_s_prev = float(bx_s.iloc[-2]) if len(bx_s) >= 2 else 0.0
-        bx_s_now  = float(bx_s.iloc[-1]) if len(bx_s) >= 1 else 0.0
-
         # ---- Decision Tree (match your described V2.9.6)
-        action, reason = "WAIT / 等待", "Normal Consolidation / 正常整理"
-
-        if c_d < s_ref:
-            action, reason = "SELL / 卖出", "Break 20D Support / 跌破20日支撑"
-        elif not macro_pass:
-            action, reason = "WAIT / MACRO_VETO", f"Macro Fail / 宏观否决 (W:{'PASS' if w_bullish else 'FAIL'}, M:{'PASS' if m_bullish else 'FAIL'})"
-        else:
-            if c_d > h_ref:
-                if fuel > 1.2 and push > 0.7:
-                    action, reason = "BUY / 突破买入", "Strong Breakout / 高位放量强势突破"
-                else:
-                    action, reason = "WAIT / 弱突破", "Above High but no fuel/push / 站上高点但动能不足"
-            elif dist_pct < 0.01:
-                if fuel < 1.0:
-                    action, reason = "WAIT / 等待(ABSORBING/消化压力)", "Near high with low volume / 高位缩量消化"
-            elif (bx_s_prev <= 0 and bx_s_now > 0 and c_d > ma_mid):
-                action, reason = "BUY / 反转买入", "Momentum Reversal / 动能由弱转强"
+        with stage("decision"):
+            action, reason = _eod_decision(r, lambda: (w_bullish, m_bullish), lambda: _eod_bx_s_cross(g))
+        if trace is not None:
+            trace.extend(symbol, [_eod_event(g, r, action, w_bullish, m_bullish)])
 
         return {
-            "symbol": symbol,
-            "Action": action,
-            "Reason": reason,
-            "Fuel": f"{fuel:.2f}x",
-            "Push": f"{push:.1%}",
-            "Gap": f"{dist_pct:.2%}",
-            "Stop": round(s_ref, 2),
-            "Macro": "PASS" if macro_pass else "FAIL",
+            **_eod_row(symbol, r, action, reason, "PASS" if macro_pass else "FAIL"),
 
             # return the pools for plotting
             "D_Data": d,
@@ -120,158 +316,397 @@ def run_eod_analyzer(symbol: str) -> dict | None:
             "M_Data": m,
 
             # for debugging if needed
-            "ma_long": ma_long,
-            "ma_mid": ma_mid,
-            "h_ref": h_ref,
-            "s_ref": s_ref,
+            "ma_long": r["ma_long"],
+            "ma_mid": r["ma_mid"],
+            "h_ref": r["h_ref"],
+            "s_ref": r["s_ref"],
         }
-    except Exception:
+    except Exception as exc:
+        error(exc)
         return None
 
+# ----------------------------
+# True Sync kernel (array-backed state machine)
+# ----------------------------
+# Strategy constants of V2.9.6; override any subset via `params=`.
+V296_PARAMS = {
+    "plan_ttl": 15,        # bars a breakout plan stays alive
+    "cooldown": 10,        # bars to wait after a sell
+    "max_pos": 0.7,        # fraction of cash committed per entry
+    "plan_trigger": 0.97,  # close > Upper_ref * plan_trigger issues a plan
+    "push_min": 0.7,       # close position in bar range for a breakout
+    "vol_min": 1.2,        # Volume / Vol_MA20 for a breakout
+    "slippage": 0.0005,    # applied to the next-day open
+    "fee": 0.001,          # commission on both sides
+}
+
+_KERNEL_COLUMNS = ("Open", "High", "Low", "Close", "Volume", "Upper_ref", "Lower_ref", "MA50", "Vol_MA20", "bx_s")
+
+def _true_sync_arrays(df: pd.DataFrame, w_bullish: np.ndarray, m_bullish: np.ndarray) -> dict:
+    """Pull every per-bar input of the state machine into contiguous float64/bool arrays."""
+    arrays = {c: np.ascontiguousarray(df[c].to_numpy(dtype=np.float64)) for c in _KERNEL_COLUMNS}
+    arrays["w_bullish"] = np.ascontiguousarray(w_bullish, dtype=bool)
+    arrays["m_bullish"] = np.ascontiguousarray(m_bullish, dtype=bool)
+    return arrays
+
+SYNC_MODES = ("legacy", "dense")
+
+def _prepare_true_sync(df: pd.DataFrame, graph: IndicatorGraph | None = None, sync: str = "legacy") -> dict:
+    """
+    Build the weekly/monthly sync pools and daily refs on `df`, then return the kernel arrays.
+    Indicators come from `graph` (an IndicatorGraph over the same bars; built if omitted).
+    `sync`: "legacy" keeps Colab's calendar pools, where a week/month without bars is a
+    NaN row that reads as not bullish; "dense" uses the EOD macro pools (periods with
+    bars only), which changes results on frames with empty weeks/months.
+    """
+    g = graph if graph is not None else IndicatorGraph(df)
+    w_bullish, m_bullish = _sync_flags(g, sync)
+
+    # ---- daily refs (Colab)
+    df["Upper_ref"] = g.node("D", "max_ref", "High", 252)
+    df["Lower_ref"] = g.node("D", "min_ref", "Low", 20)
+    df["MA50"] = g.node("D", "sma", "Close", 50)
+    df["Vol_MA20"] = g.node("D", "sma", "Volume", 20)
+    df["bx_s"] = g.node("D", "rsi_ema", "Close", 5, 3)
+
+    return _true_sync_arrays(df, w_bullish, m_bullish)
+
+def _sync_flags(g: IndicatorGraph, sync: str = "legacy") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Weekly/monthly macro flags of the True-Sync backtest, forward-filled onto the daily
+    bars through the calendar map. Days before the first period get True: bool(NaN)
+    in the original reindex(ffill) loop. Returns: w_bullish, m_bullish (bool per bar).
+    """
+    if sync not in SYNC_MODES:
+        raise ValueError(f"Unknown sync mode: {sync}")
+    wt, mt = ("W*", "M*") if sync == "legacy" else ("W", "M")
+    w = g.bars(wt)
+    w_flags = ((w["Close"] > g.node(wt, "sma", "Close", 50)) & (g.node(wt, "rsi_ema", "Close", 20, 10) > -5)).to_numpy()
+    m = g.bars(mt)
+    m_flags = (m["Close"] > g.node(mt, "sma", "Close", 20)).to_numpy()
+    cal = g.calendar
+    return cal.ffill("W", w.index, w_flags, fill=True), cal.ffill("M", m.index, m_flags, fill=True)
+
+def _kernel_state(init_cash: float = 100000.0) -> dict:
+    """State of the True-Sync state machine before its first bar (see _true_sync_kernel)."""
+    return {
+        "cash": init_cash, "pos": 0,
+        "pending_buy_active": False, "pending_buy_type": None, "pending_sell": False,
+        "plan_active": False, "plan_age": 0, "cooldown_timer": 0,
+        "entry_p": None, "entry_type": None,
+        "stats": {"issued": 0, "veto": 0, "triggered": 0, "ch_break": 0, "ch_rev": 0},
+    }
+
+def _true_sync_kernel(arrays: dict, index: pd.Index, init_cash: float = 100000.0, start: int = 252,
+                      params: dict | None = None, state: dict | None = None, trace: list | None = None):
+    """
+    Run the V2.9.6 plan / pending-buy / cooldown state machine over `arrays`.
+    `params` overrides entries of V296_PARAMS.
+    `state`: a _kernel_state() to start from (default: flat with `init_cash`); it is
+    updated in place to the state after the last bar, so a later call can resume.
+    `trace`: a list that receives one audit.ROW_DTYPE tuple per decision event.
+    Returns: stats counters(dict), trades(list of dict), equity_curve(list of float).
+    """
+    # Python floats keep the arithmetic (and NaN comparisons) identical to the
+    # original per-bar `float(df[...].iloc[i])` loop, without pandas indexing cost.
+    o_a = arrays["Open"].tolist()
+    h_a = arrays["High"].tolist()
+    l_a = arrays["Low"].tolist()
+    c_a = arrays["Close"].tolist()
+    v_a = arrays["Volume"].tolist()
+    upper_a = arrays["Upper_ref"].tolist()
+    lower_a = arrays["Lower_ref"].tolist()
+    ma50_a = arrays["MA50"].tolist()
+    vma_a = arrays["Vol_MA20"].tolist()
+    bx_a = arrays["bx_s"].tolist()
+    w_a = arrays["w_bullish"].tolist()
+    m_a = arrays["m_bullish"].tolist()
+
+    st = state if state is not None else _kernel_state(init_cash)
+    cash = st["cash"]
+    pos = st["pos"]
+    p = V296_PARAMS if params is None else {**V296_PARAMS, **params}
+    PLAN_TTL, COOLDOWN, MAX_POS = p["plan_ttl"], p["cooldown"], p["max_pos"]
+    PLAN_TRIGGER, PUSH_MIN, VOL_MIN = p["plan_trigger"], p["push_min"], p["vol_min"]
+    SLIP, FEE = p["slippage"], p["fee"]
+    pending_buy_active, pending_buy_type = st["pending_buy_active"], st["pending_buy_type"]
+    pending_sell = st["pending_sell"]
+    plan_active, plan_age = st["plan_active"], st["plan_age"]
+    cooldown_timer = st["cooldown_timer"]
+
+    stats = st["stats"]
+    trades = []
+    equity_curve = []
+
+    entry_p = st["entry_p"]
+    entry_type = st["entry_type"]
+
+    if trace is not None:
+        dates = np.asarray(index, dtype="datetime64[ns]")
+        ev = trace.append
+        nan = np.nan
+
+    for i in range(start, len(c_a)):
+        o_t = o_a[i]
+        h_t = h_a[i]
+        l_t = l_a[i]
+        c_t = c_a[i]
+        v_t = v_a[i]
+
+        # A) execute at next-day open
+        if pending_sell and pos > 0:
+            p_sell = o_t * (1 - SLIP)
+            cash += pos * p_sell * (1 - FEE)
+            ret = (p_sell / entry_p) - 1 if entry_p else np.nan
+            trades.append({
+                "Date": index[i],
+                "Type": "SELL",
+                "EntryType": entry_type,
+                "Price": p_sell,
+                "Ret": ret
+            })
+            if trace is not None:
+                ev((dates[i], audit.FILL_SELL, audit.ENTRY_CODES[entry_type], 0, w_a[i], m_a[i], c_t,
+                    nan, nan, nan, nan, p_sell, ret))
+            pos = 0
+            pending_sell = False
+            cooldown_timer = COOLDOWN
+
+        if pending_buy_active and pos == 0:
+            p_buy = o_t * (1 + SLIP)
+            pos = int((cash * MAX_POS) / (p_buy * (1 + FEE)))
+            cash -= pos * p_buy * (1 + FEE)
+            entry_p = p_buy
+            entry_type = pending_buy_type
+
+            pending_buy_active = False
+            stats["triggered"] += 1
+
+            trades.append({
+                "Date": index[i],
+                "Type": "BUY",
+                "EntryType": entry_type,
+                "Price": p_buy,
+                "Ret": np.nan
+            })
+            if trace is not None:
+                ev((dates[i], audit.FILL_BUY, audit.ENTRY_CODES[entry_type], 0, w_a[i], m_a[i], c_t,
+                    nan, nan, nan, nan, p_buy, nan))
+
+        equity_curve.append(cash + pos * c_t)
+        if cooldown_timer > 0:
+            cooldown_timer -= 1
+
+        # B) decision at close
+        if pos > 0 and (not pending_sell) and c_t < lower_a[i]:
+            pending_sell = True
+            if trace is not None:
+                ev((dates[i], audit.SELL_SIGNAL, audit.ENTRY_CODES[entry_type], 0, w_a[i], m_a[i], c_t,
+                    lower_a[i], nan, nan, nan, nan, nan))
+
+        if pos == 0 and (not pending_buy_active) and cooldown_timer == 0:
+            macro_pass = m_a[i] and w_a[i]
+            upper = upper_a[i]
+
+            # Channel 1: plan & breakout
+            if (not plan_active) and (c_t > upper * PLAN_TRIGGER):
+                plan_active = True
+                plan_age = 0
+                stats["issued"] += 1
+                if trace is not None:
+                    ev((dates[i], audit.PLAN_ISSUED, audit.BREAKOUT_ENTRY, 0, w_a[i], m_a[i], c_t,
+                        upper, nan, nan, nan, nan, nan))
+
+            if plan_active:
+                plan_age += 1
+                close_pos = (c_t - l_t) / (h_t - l_t) if h_t != l_t else 0.0
+                vol_ma20 = vma_a[i]
+                vol_ratio = v_t / vol_ma20 if vol_ma20 > 0 else 0.0
+
+                if (c_t > upper) and (close_pos > PUSH_MIN) and (vol_ratio > VOL_MIN):
+                    if macro_pass:
+                        pending_buy_active, pending_buy_type = True, "BREAKOUT"
+                        stats["ch_break"] += 1
+                        plan_active = False
+                    else:
+                        stats["veto"] += 1
+                        plan_active = False
+                    if trace is not None:
+                        ev((dates[i], audit.BREAKOUT if macro_pass else audit.VETO, audit.BREAKOUT_ENTRY, plan_age,
+                            w_a[i], m_a[i], c_t, upper, vol_ratio, close_pos, nan, nan, nan))
+                elif (plan_age > PLAN_TTL) or (c_t < ma50_a[i]):
+                    plan_active = False
+                    if trace is not None:
+                        ev((dates[i], audit.PLAN_EXPIRED if plan_age > PLAN_TTL else audit.PLAN_CANCELLED,
+                            audit.BREAKOUT_ENTRY, plan_age, w_a[i], m_a[i], c_t, ma50_a[i], vol_ratio, close_pos,
+                            nan, nan, nan))
+                elif trace is not None:
+                    ev((dates[i], audit.PLAN_AGED, audit.BREAKOUT_ENTRY, plan_age, w_a[i], m_a[i], c_t,
+                        upper, vol_ratio, close_pos, nan, nan, nan))
+
+            # Channel 2: reversal
+            if (not pending_buy_active) and macro_pass and (c_t > ma50_a[i]):
+                if bx_a[i - 1] <= 0 and bx_a[i] > 0:
+                    pending_buy_active, pending_buy_type = True, "REVERSAL"
+                    stats["ch_rev"] += 1
+                    if trace is not None:
+                        ev((dates[i], audit.REVERSAL, audit.REVERSAL_ENTRY, 0, w_a[i], m_a[i], c_t,
+                            ma50_a[i], nan, nan, bx_a[i], nan, nan))
+
+    st.update(cash=cash, pos=pos, pending_buy_active=pending_buy_active, pending_buy_type=pending_buy_type,
+              pending_sell=pending_sell, plan_active=plan_active, plan_age=plan_age,
+              cooldown_timer=cooldown_timer, entry_p=entry_p, entry_type=entry_type)
+    return stats, trades, equity_curve
+
+# ----------------------------
+# Backtest checkpoints
+# A checkpoint is a plain dict snapshot of one run at its last bar: kernel state,
+# TrueSyncRefs (indicator warm-up), the trades/equity so far, and the fingerprint of
+# the bars it covers. A run over the same bars plus newer ones (later `end`) resumes
+# from it and simulates only the new bars; any revision of a covered bar, other
+# params or another symbol invalidate it and the run starts over.
+# The fingerprint hashes one record per bar, so checking the covered prefix and
+# fingerprinting the longer frame for the next checkpoint is a single pass.
+# ----------------------------
+def _fingerprint_rows(df: pd.DataFrame) -> np.ndarray:
+    """(bars x 6) float64 records: the date (ns, as raw bits) and OHLCV of every bar."""
+    rows = np.empty((len(df), 6), dtype=np.float64)
+    rows[:, 0] = df.index.as_unit("ns").asi8.view(np.float64)
+    for j, c in enumerate(("Open", "High", "Low", "Close", "Volume"), 1):
+        rows[:, j] = df[c].to_numpy(dtype=np.float64)
+    return rows
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """Digest of every date and OHLCV value, so any new or revised bar changes it."""
+    if df is None or df.empty:
+        return "empty"
+    return hashlib.blake2b(_fingerprint_rows(df), digest_size=16).hexdigest()
+
+def _params_items(params: dict | None) -> list:
+    return sorted({**V296_PARAMS, **(params or {})}.items())
+
+def _copy_state(state: dict) -> dict:
+    return {**state, "stats": dict(state["stats"])}
+
+def _make_checkpoint(symbol: str, df: pd.DataFrame, params: dict | None, init_cash: float, state: dict,
+                     refs: TrueSyncRefs, trades: list, equity_curve: list, fingerprint: str | None = None) -> dict:
+    return {
+        "symbol": symbol,
+        "params": _params_items(params),
+        "sync": refs.sync,
+        "init_cash": init_cash,
+        "n_bars": len(df),
+        "last_date": df.index[-1],
+        "fingerprint": fingerprint or data_fingerprint(df),
+        "kernel": _copy_state(state),
+        "refs": refs.to_dict(),
+        "trades": list(trades),
+        "equity": list(equity_curve),
+    }
+
+def _resume_true_sync(symbol: str, df: pd.DataFrame, checkpoint: dict, params: dict | None, init_cash: float,
+                      sync: str = "legacy", trace: list | None = None):
+    """
+    Continue `checkpoint` over the bars of `df` after it, or return None if it does not apply.
+    Returns: stats, trades, equity_curve (whole run), kernel state, refs, data_fingerprint(df).
+    """
+    n = checkpoint.get("n_bars", 0)
+    if (checkpoint.get("symbol") != symbol or checkpoint.get("params") != _params_items(params)
+            or checkpoint.get("init_cash") != init_cash or checkpoint.get("sync") != sync or not 252 < n <= len(df)):
+        return None
+    rows = _fingerprint_rows(df)
+    digest = hashlib.blake2b(rows[:n], digest_size=16)
+    if digest.hexdigest() != checkpoint["fingerprint"]:
+        return None
+    digest.update(rows[n:])
+    refs = TrueSyncRefs.from_dict(checkpoint["refs"])
+    state = _copy_state(checkpoint["kernel"])
+
+    # kernel arrays over [n-1, N): the first row only supplies the previous bx_s
+    tail = df.iloc[n - 1:]
+    arrays = {c: tail[c].to_numpy(dtype=np.float64) for c in ("Open", "High", "Low", "Close", "Volume")}
+    rows = [refs.update(ts, *bar) for ts, *bar in zip(tail.index[1:], *(a[1:].tolist() for a in arrays.values()))]
+    for c in ("Upper_ref", "Lower_ref", "MA50", "Vol_MA20", "bx_s"):
+        arrays[c] = np.array([np.nan] + [r[c] for r in rows])
+    arrays["bx_s"][0] = checkpoint["refs"]["bx_s"]["value"]
+    arrays["w_bullish"] = np.array([True] + [r["w_bullish"] for r in rows])
+    arrays["m_bullish"] = np.array([True] + [r["m_bullish"] for r in rows])
+
+    stats, trades, equity_curve = _true_sync_kernel(arrays, tail.index, init_cash, start=1, params=params, state=state,
+                                                    trace=trace)
+    return stats, checkpoint["trades"] + trades, checkpoint["equity"] + equity_curve, state, refs, digest.hexdigest()
+
 # ----------------------------
 # True Sync Backtest Engine (Colab run_smartstock_v296_true_sync)
 # ----------------------------
-def run_smartstock_v296_engine(symbol: str, start: str, end: str):
+def run_smartstock_v296_engine(symbol: str, start: str, end: str, params: dict | None = None,
+                               data: pd.DataFrame | None = None, graph: IndicatorGraph | None = None,
+                               checkpoint: dict | None = None, trace: audit.TraceBuffer | None = None,
+                               sync: str = "legacy"):
     """
     Returns: stats(dict), trades_df, equity_df(Date, Equity)
     Strictly aligned with your Colab `run_smartstock_v296_true_sync`.
+    `params` overrides entries of V296_PARAMS (defaults reproduce V2.9.6).
+    `data`: an already downloaded daily frame for [start, end) (copied, not modified).
+    `graph`: an IndicatorGraph over that frame, shared with other consumers (implies `data`).
+    `checkpoint`: a dict to resume from if it covers a prefix of these bars (see
+    "Backtest checkpoints"); it is overwritten with the snapshot at this run's last bar.
+    Pass an empty dict to start checkpointing.
+    `trace`: an audit.TraceBuffer receiving every state-machine decision (only the
+    newly simulated bars when resuming from a checkpoint).
+    `sync`: "legacy" (Colab's W/M calendar pools) or "dense" (the EOD pools), see _prepare_true_sync.
     """
     try:
-        df = _download_daily(symbol, start=start, end=end)
+        if graph is not None:
+            data = graph.daily
+        df = data.copy() if data is not None else _download_daily(symbol, start=start, end=end)
         if df.empty or len(df) < 260:
             return {}, pd.DataFrame(), pd.DataFrame()
 
-        # ---- build weekly/monthly sync pools from daily (Colab)
-        df_w = df["Close"].resample("W").last().to_frame()
-        df_w["MA50_w"] = df_w["Close"].rolling(50).mean()
-        rsi_20_w = calculate_rsi_wilder(df_w["Close"], 20)
-        df_w["bx_l"] = (rsi_20_w - 50).ewm(span=10, adjust=False).mean()
-        df_w["w_bullish"] = (df_w["Close"] > df_w["MA50_w"]) & (df_w["bx_l"] > -5)
-        df_w_sync = df_w.reindex(df.index, method="ffill")
-
-        df_m = df["Close"].resample("ME").last().to_frame()
-        df_m["m_bullish"] = df_m["Close"] > df_m["Close"].rolling(20).mean()
-        df_m_sync = df_m.reindex(df.index, method="ffill")
-
-        # ---- daily refs (Colab)
-        df["Upper_ref"] = df["High"].rolling(252).max().shift(1)
-        df["Lower_ref"] = df["Low"].rolling(20).min().shift(1)
-        df["MA50"] = df["Close"].rolling(50).mean()
-        df["Vol_MA20"] = df["Volume"].rolling(20).mean()
-        df["bx_s"] = (calculate_rsi_wilder(df["Close"], 5) - 50).ewm(span=3, adjust=False).mean()
-
-        # ---- state machine (Colab)
-        cash = 100000.0
         init_cash = 100000.0
-        pos = 0
-        PLAN_TTL, COOLDOWN, MAX_POS = 15, 10, 0.7
-        pending_buy = {"active": False, "type": None}
-        pending_sell = False
-        plan = {"active": False, "age": 0}
-        cooldown_timer = 0
-
-        stats = {"issued": 0, "veto": 0, "triggered": 0, "ch_break": 0, "ch_rev": 0}
-        trades = []
-        equity_curve = []
-
-        entry_p = None
-        entry_type = None
-
-        for i in range(252, len(df)):
-            dt = df.index[i]
-            o_t = float(df["Open"].iloc[i])
-            h_t = float(df["High"].iloc[i])
-            l_t = float(df["Low"].iloc[i])
-            c_t = float(df["Close"].iloc[i])
-            v_t = float(df["Volume"].iloc[i])
-
-            # A) execute at next-day open
-            if pending_sell and pos > 0:
-                p_sell = o_t * (1 - 0.0005)
-                cash += pos * p_sell * (1 - 0.001)
-                trades.append({
-                    "Date": dt,
-                    "Type": "SELL",
-                    "EntryType": entry_type,
-                    "Price": p_sell,
-                    "Ret": (p_sell / entry_p) - 1 if entry_p else np.nan
-                })
-                pos = 0
-                pending_sell = False
-                cooldown_timer = COOLDOWN
-
-            if pending_buy["active"] and pos == 0:
-                p_buy = o_t * (1 + 0.0005)
-                pos = int((cash * MAX_POS) / (p_buy * 1.001))
-                cash -= pos * p_buy * 1.001
-                entry_p = p_buy
-                entry_type = pending_buy["type"]
-
-                pending_buy["active"] = False
-                stats["triggered"] += 1
-
-                trades.append({
-                    "Date": dt,
-                    "Type": "BUY",
-                    "EntryType": entry_type,
-                    "Price": p_buy,
-                    "Ret": np.nan
-                })
-
-            equity_curve.append(cash + pos * c_t)
-            if cooldown_timer > 0:
-                cooldown_timer -= 1
-
-            # B) decision at close
-            if pos > 0 and (not pending_sell) and c_t < float(df["Lower_ref"].iloc[i]):
-                pending_sell = True
-
-            if pos == 0 and (not pending_buy["active"]) and cooldown_timer == 0:
-                m_bull = bool(df_m_sync["m_bullish"].iloc[i])
-                w_bull = bool(df_w_sync["w_bullish"].iloc[i])
-                macro_pass = m_bull and w_bull
-
-                upper = float(df["Upper_ref"].iloc[i])
-
-                # Channel 1: plan & breakout
-                if (not plan["active"]) and (c_t > upper * 0.97):
-                    plan["active"] = True
-                    plan["age"] = 0
-                    stats["issued"] += 1
-
-                if plan["active"]:
-                    plan["age"] += 1
-                    close_pos = (c_t - l_t) / (h_t - l_t) if h_t != l_t else 0.0
-                    vol_ma20 = float(df["Vol_MA20"].iloc[i])
-                    vol_ratio = v_t / vol_ma20 if vol_ma20 > 0 else 0.0
-
-                    if (c_t > upper) and (close_pos > 0.7) and (vol_ratio > 1.2):
-                        if macro_pass:
-                            pending_buy = {"active": True, "type": "BREAKOUT"}
-                            stats["ch_break"] += 1
-                            plan["active"] = False
-                        else:
-                            stats["veto"] += 1
-                            plan["active"] = False
-                    elif (plan["age"] > PLAN_TTL) or (c_t < float(df["MA50"].iloc[i])):
-                        plan["active"] = False
-
-                # Channel 2: reversal
-                bx_s_now = float(df["bx_s"].iloc[i])
-                bx_s_prev = float(df["bx_s"].iloc[i - 1])
-                if (not pending_buy["active"]) and macro_pass and (c_t > float(df["MA50"].iloc[i])):
-                    if bx_s_prev <= 0 and bx_s_now > 0:
-                        pending_buy = {"active": True, "type": "REVERSAL"}
-                        stats["ch_rev"] += 1
-
-        eq = pd.Series(equity_curve, index=df.index[252:252 + len(equity_curve)], name="Equity")
-        equity_df = eq.reset_index().rename(columns={"index": "Date"})
-
-        # stats
-        total_ret = (eq.iloc[-1] / init_cash) - 1 if len(eq) else 0.0
-        dd = (eq / eq.cummax() - 1).min() if len(eq) else 0.0
-
-        trades_df = pd.DataFrame(trades)
+        events = [] if trace is not None else None
+        resumed = fingerprint = None
+        if checkpoint:
+            with stage("resume"):
+                resumed = _resume_true_sync(symbol, df, checkpoint, params, init_cash, sync, events)
+            count("checkpoint.hit" if resumed is not None else "checkpoint.miss")
+        if resumed is not None:
+            stats, trades, equity_curve, state, refs, fingerprint = resumed
+            count("bars.simulated", len(df) - checkpoint["n_bars"])
+        else:
+            # ---- sync pools, daily refs, then the state machine (Colab) over contiguous arrays
+            with stage("prepare"):
+                arrays = _prepare_true_sync(df, graph if graph is not None else IndicatorGraph(df, symbol), sync)
+            state = _kernel_state(init_cash)
+            with stage("kernel"):
+                stats, trades, equity_curve = _true_sync_kernel(arrays, df.index, init_cash, params=params, state=state,
+                                                                trace=events)
+            count("bars.simulated", len(equity_curve))
+            refs = None
+        if checkpoint is not None:
+            with stage("checkpoint"):
+                if refs is None:
+                    refs = TrueSyncRefs.from_history(df, sync)
+                snapshot = _make_checkpoint(symbol, df, params, init_cash, state, refs, trades, equity_curve,
+                                            fingerprint)
+                checkpoint.clear()
+                checkpoint.update(snapshot)
+        count("trades", len(trades))
+        if trace is not None:
+            trace.extend(symbol, events)
+            count("trace.events", len(events))
+
+        with stage("stats"):
+            # plain arrays: a one-bar resume should not pay pandas overhead per equity point
+            eq = np.array(equity_curve, dtype=np.float64)
+            dates = df.index[252:252 + len(eq)]
+            equity_df = pd.DataFrame({"Date" if dates.name in (None, "index") else dates.name: dates, "Equity": eq})
+
+            # stats (fmax / fmin skip NaN like Series.cummax / .min)
+            total_ret = (eq[-1] / init_cash) - 1 if len(eq) else 0.0
+            dd = np.fmin.reduce(eq / np.fmax.accumulate(eq) - 1) if len(eq) else 0.0
+
+            trades_df = pd.DataFrame(trades)
 
         out_stats = {
             "Total Return": f"{total_ret:.2%}",
@@ -281,11 +716,12 @@ def run_smartstock_v296_engine(symbol: str, start: str, end: str):
             "Signals Triggered": int(stats["triggered"]),
             "Breakout Trades": int(stats["ch_break"]),
             "Reversal Trades": int(stats["ch_rev"]),
-            "Final Equity": f"${eq.iloc[-1]:,.0f}" if len(eq) else "$100,000",
+            "Final Equity": f"${eq[-1]:,.0f}" if len(eq) else "$100,000",
         }
         return out_stats, trades_df, equity_df
 
-    except Exception:
+    except Exception as exc:
+        error(exc)
         return {}, pd.DataFrame(), pd.DataFrame()
 
 
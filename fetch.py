@@ -0,0 +1,388 @@
+# fetch.py
+import argparse
+import csv
+import http.client
+import io
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from store import OHLCV_COLUMNS, _period_start
+
+# ----------------------------
+# Concurrent market-data fetch layer
+# Provider interface: any callable `provider(symbol, start=None, end=None) -> DataFrame`
+# (daily OHLCV, end exclusive; the same contract as an OHLCVStore source). Providers
+# raise RateLimited / TransientError for retryable failures and FetchError for
+# permanent ones; an empty frame means "no data".
+#   fetcher = Fetcher(HTTPSource("http://127.0.0.1:8765"), workers=16, rate=50)
+#   frames, report = fetcher.fetch_many(symbols, start="2015-01-01")
+#   OHLCVStore(root, source=fetcher)   /   engine.use_store(fetcher)
+# A stand-in provider server (synthetic bars, optional latency / errors / 429s) is
+# included for offline load tests:  python fetch.py serve --port 8765
+# ----------------------------
+REPORT_COLUMNS = ("symbol", "status", "rows", "attempts", "elapsed_s", "reason")
+
+class FetchError(Exception):
+    """Permanent failure for one symbol (not retried)."""
+
+class TransientError(FetchError):
+    """Retryable failure: connection error, timeout, 5xx."""
+
+class RateLimited(TransientError):
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """Token bucket shared by all workers (`rate` requests/s, bursts up to `burst`)."""
+    def __init__(self, rate: float | None, burst: int | None = None):
+        self.rate = rate
+        self.burst = float(burst or max(1, int(rate or 1)))
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available; returns 0.0, or the seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self.paused_until - now
+            if wait > 0:
+                return wait
+            if self.rate is None:
+                return 0.0
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        while (wait := self.try_acquire()) > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every worker back for `seconds` (provider said Retry-After)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+# ----------------------------
+# Providers
+# ----------------------------
+def yfinance_provider(symbol: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+    """
+    yfinance behind the provider interface (yfinance reports most failures as an empty
+    frame). engine._fetch_yf uses one yf.Ticker per call, so it is safe from the
+    Fetcher's worker threads.
+    """
+    from engine import _fetch_yf
+    try:
+        return _fetch_yf(symbol, start=start, end=end)
+    except (OSError, ValueError) as exc:
+        raise TransientError(f"{type(exc).__name__}: {exc}") from exc
+
+class HTTPSource:
+    """
+    Provider for a CSV-over-HTTP endpoint: GET <base>/daily/<symbol>?start=&end= returning
+    Date,Open,High,Low,Close,Volume. Keeps up to `pool_size` keep-alive connections
+    for reuse across threads.
+    """
+    def __init__(self, base_url: str, pool_size: int = 16, timeout: float = 10.0):
+        u = urllib.parse.urlsplit(base_url)
+        self.host, self.port = u.hostname, u.port or (443 if u.scheme == "https" else 80)
+        self.prefix = u.path.rstrip("/")
+        self.https = u.scheme == "https"
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def __call__(self, symbol: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        query = urllib.parse.urlencode({k: v for k, v in (("start", start), ("end", end)) if v is not None})
+        path = f"{self.prefix}/daily/{urllib.parse.quote(symbol, safe='')}" + (f"?{query}" if query else "")
+        conn = self._connect()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            raise TransientError(f"{type(exc).__name__}: {exc}") from exc
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+        if resp.status == 200:
+            df = pd.read_csv(io.BytesIO(body), index_col="Date", parse_dates=True)
+            return df[OHLCV_COLUMNS].dropna(how="any")
+        if resp.status == 404:
+            return pd.DataFrame()
+        if resp.status == 429:
+            retry_after = resp.getheader("Retry-After")
+            raise RateLimited("HTTP 429", float(retry_after) if retry_after else None)
+        if resp.status >= 500:
+            raise TransientError(f"HTTP {resp.status}")
+        raise FetchError(f"HTTP {resp.status}: {body[:200].decode(errors='replace')}")
+
+# ----------------------------
+# Fetcher: bounded thread pool + shared rate limit + retries with backoff
+# ----------------------------
+class Fetcher:
+    """
+    Wraps a provider with retries (exponential backoff with jitter, Retry-After aware)
+    and a shared rate limit. Calling it fetches one symbol (raising on final failure),
+    so it can itself be used as an OHLCVStore source; `get` makes it a drop-in for
+    engine.use_store; `fetch_many` pulls a list of symbols concurrently.
+    """
+    def __init__(self, provider=yfinance_provider, workers: int = 8, rate: float | None = None,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0):
+        self.provider = provider
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _delay(self, attempt: int, exc: Exception) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * (0.5 + random.random() / 2)
+        if isinstance(exc, RateLimited) and exc.retry_after is not None:
+            self.limiter.pause(exc.retry_after)
+            delay = max(delay, exc.retry_after)
+        return delay
+
+    def fetch(self, symbol: str, start: str | None = None, end: str | None = None) -> tuple[pd.DataFrame, dict]:
+        """Fetch one symbol. Returns: frame (empty on failure), report row."""
+        t0 = time.perf_counter()
+        row = {"symbol": symbol, "status": "ok", "rows": 0, "attempts": 0, "elapsed_s": 0.0, "reason": ""}
+        df = pd.DataFrame()
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            row["attempts"] = attempt + 1
+            try:
+                df = self.provider(symbol, start=start, end=end)
+                if df is None or df.empty:
+                    df = pd.DataFrame()
+                    row.update(status="empty", reason="no data")
+                else:
+                    row.update(status="ok", reason="")
+                break
+            except TransientError as exc:
+                row.update(status="error", reason=f"{type(exc).__name__}: {exc}")
+                if attempt < self.retries:
+                    time.sleep(self._delay(attempt, exc))
+            except Exception as exc:
+                row.update(status="error", reason=f"{type(exc).__name__}: {exc}")
+                break
+        else:
+            row["reason"] += f" (gave up after {row['attempts']} attempts)"
+        if row["status"] == "error":
+            df = pd.DataFrame()
+        row["rows"] = len(df)
+        row["elapsed_s"] = round(time.perf_counter() - t0, 4)
+        return df, row
+
+    def __call__(self, symbol: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        df, row = self.fetch(symbol, start, end)
+        if row["status"] == "error":
+            raise FetchError(f"{symbol}: {row['reason']}")
+        return df
+
+    def get(self, symbol: str, start: str | None = None, end: str | None = None, period: str | None = None) -> pd.DataFrame:
+        if period:
+            p_start = _period_start(period)
+            start, end = (None if p_start is None else str(p_start.date())), None
+        return self.fetch(symbol, start, end)[0]
+
+    def map(self, fn, symbols: list[str]):
+        """Yield fn(symbol) for every symbol, in input order, from `workers` threads."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            yield from pool.map(fn, symbols)
+
+    def fetch_many(self, symbols: list[str], start: str | None = None, end: str | None = None):
+        """Returns: {symbol: frame} of the successful fetches, report rows (REPORT_COLUMNS) for all."""
+        frames, report = {}, []
+        for df, row in self.map(lambda s: self.fetch(s, start, end), symbols):
+            report.append(row)
+            if row["status"] == "ok":
+                frames[row["symbol"]] = df
+        return frames, report
+
+def refresh_store(store, symbols: list[str], workers: int = 8, start: str | None = None,
+                  end: str | None = None) -> list[dict]:
+    """
+    Sync every symbol of an OHLCVStore concurrently (give the store a Fetcher source
+    for retries and rate limiting). Returns one report row per symbol.
+    """
+    def one(symbol: str) -> dict:
+        t0 = time.perf_counter()
+        try:
+            store.sync(symbol, start, end)
+            rows, status, reason = len(store.read(symbol)), "ok", ""
+        except Exception as exc:
+            rows, status, reason = 0, "error", f"{type(exc).__name__}: {exc}"
+        return {"symbol": symbol, "status": status, "rows": rows, "attempts": None,
+                "elapsed_s": round(time.perf_counter() - t0, 4), "reason": reason}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(one, symbols))
+
+# ----------------------------
+# Local stand-in provider server (offline load tests)
+# ----------------------------
+def make_server(host: str = "127.0.0.1", port: int = 0, source=None, latency: float = 0.0,
+                error_rate: float = 0.0, rate: float | None = None, seed: int = 0) -> ThreadingHTTPServer:
+    """
+    HTTP/1.1 keep-alive server for HTTPSource. `source` has a store-style
+    `.get(symbol, start, end)` (default: synthetic.SyntheticStore()). Each request
+    sleeps `latency` seconds, fails with 503 at `error_rate`, and answers 429
+    (Retry-After: 1) beyond `rate` requests/s.
+    """
+    if source is None:
+        from synthetic import SyntheticStore
+        source = SyntheticStore()
+    limiter = RateLimiter(rate) if rate else None
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    bodies = {}  # (symbol, start, end) -> CSV, so load tests measure the client, not bar generation
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", headers: dict | None = None) -> None:
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            u = urllib.parse.urlsplit(self.path)
+            parts = u.path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] != "daily":
+                return self._send(400, b"expected /daily/<symbol>")
+            if limiter is not None and limiter.try_acquire() > 0:
+                return self._send(429, b"rate limited", {"Retry-After": "1"})
+            if latency:
+                time.sleep(latency)
+            with lock:
+                fail = rng.random() < error_rate
+            if fail:
+                return self._send(503, b"injected failure")
+            q = dict(urllib.parse.parse_qsl(u.query))
+            key = (urllib.parse.unquote(parts[1]), q.get("start"), q.get("end"))
+            with lock:
+                body = bodies.get(key)
+            if body is None:
+                df = source.get(key[0], start=key[1], end=key[2])
+                body = b"" if df is None or df.empty else df[OHLCV_COLUMNS].rename_axis("Date").to_csv().encode()
+                with lock:
+                    bodies[key] = body
+            if not body:
+                return self._send(404, b"no data")
+            self._send(200, body, {"Content-Type": "text/csv"})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+@contextmanager
+def stand_in_server(**options):
+    """Run make_server(**options) on a background thread; yields its base URL."""
+    server = make_server(**options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{server.server_address[0]}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+# ----------------------------
+# CLI
+# ----------------------------
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="SmartStock V2.9.6 market-data fetcher")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("serve", help="run the local stand-in provider")
+    sp.add_argument("--host", default="127.0.0.1")
+    sp.add_argument("--port", type=int, default=8765)
+    sp.add_argument("--bars", type=int, default=5000, help="synthetic bars per symbol")
+    sp.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    sp.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    sp.add_argument("--rate", type=float, default=None, help="requests/s before answering 429")
+
+    pp = sub.add_parser("pull", help="fetch a symbol file concurrently")
+    pp.add_argument("symbols", help="file with one ticker per line")
+    pp.add_argument("--url", help="HTTPSource base URL (default: yfinance)")
+    pp.add_argument("--store", help="sync into this OHLCV store directory instead of discarding the bars")
+    pp.add_argument("--start")
+    pp.add_argument("--end")
+    pp.add_argument("-w", "--workers", type=int, default=8)
+    pp.add_argument("--rate", type=float, default=None, help="max requests/s")
+    pp.add_argument("--retries", type=int, default=3)
+    pp.add_argument("-o", "--out", help="CSV report (default: stdout)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "serve":
+        from synthetic import SyntheticStore
+        server = make_server(args.host, args.port, SyntheticStore(args.bars), args.latency, args.error_rate, args.rate)
+        print(f"serving http://{args.host}:{server.server_address[1]}/daily/<symbol>", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    from screener import read_symbols
+    symbols = read_symbols(args.symbols)
+    fetcher = Fetcher(HTTPSource(args.url, pool_size=args.workers) if args.url else yfinance_provider,
+                      workers=args.workers, rate=args.rate, retries=args.retries)
+    t0 = time.perf_counter()
+    if args.store:
+        from store import OHLCVStore
+        report = refresh_store(OHLCVStore(args.store, source=fetcher, refresh_after=0.0), symbols,
+                               args.workers, args.start, args.end)
+    else:
+        report = fetcher.fetch_many(symbols, args.start, args.end)[1]
+
+    fh = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        writer = csv.DictWriter(fh, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(report)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    failed = sum(r["status"] == "error" for r in report)
+    print(f"{len(report)} symbols, {failed} failed, {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,658 @@
+# incremental.py
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Streaming indicator state (O(1) per bar)
+# Each class reproduces the exact floating-point recurrence pandas uses, so
+# seeding from history and then updating bar by bar yields the same numbers as
+# the batch functions in engine.py:
+#   EWM          -> Series.ewm(..., adjust=False).mean()
+#   WilderRSI    -> calculate_rsi_wilder
+#   RsiEma       -> get_rsi_ema
+#   RollingMax/RollingMin -> Series.rolling(n).max()/.min()   (monotonic deques)
+#   RollingMean  -> Series.rolling(n).mean()                  (Kahan running sum)
+# All states round-trip through to_dict()/from_dict() (JSON-safe).
+# ----------------------------
+NaN = float("nan")
+
+def _isnan(x: float) -> bool:
+    return x != x
+
+class EWM:
+    """ewm(adjust=False, ignore_na=False, min_periods=0).mean() on a stream."""
+    def __init__(self, span: float | None = None, alpha: float | None = None):
+        # pandas converts span/alpha into a center of mass, then back into alpha
+        if span is not None:
+            com = (span - 1) / 2.0
+        elif alpha is not None:
+            com = (1 - alpha) / alpha
+        else:
+            raise ValueError("EWM needs span or alpha")
+        self.span, self.alpha_in = span, alpha
+        self.com = float(com)
+        self.alpha = 1.0 / (1.0 + com)
+        self.weighted = NaN
+        self.old_wt = 1.0
+        self.started = False
+        self.nobs = 0
+        self.value = NaN
+
+    def update(self, cur: float) -> float:
+        cur = float(cur)
+        if math.isinf(cur):  # pandas' window ops turn +-inf into NaN first
+            cur = NaN
+        is_obs = not _isnan(cur)
+        self.nobs += is_obs
+        if not self.started:
+            self.started = True
+            self.weighted = cur
+            self.old_wt = 1.0
+        elif not _isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                # avoid numerical errors on constant series (pandas does the same)
+                if self.weighted != cur:
+                    # pandas re-derives the new weight after NaN gaps, but only when com == 1
+                    new_wt = 1.0 - self.old_wt if self.com == 1 else self.alpha
+                    self.weighted = self.old_wt * self.weighted + new_wt * cur
+                    self.weighted /= (self.old_wt + new_wt)
+                self.old_wt = 1.0
+        elif is_obs:
+            self.weighted = cur
+        self.value = self.weighted if self.nobs >= 1 else NaN
+        return self.value
+
+    def peek(self, cur: float) -> float:
+        """The value update(cur) would return, without consuming the bar."""
+        saved = self.__dict__.copy()
+        out = self.update(cur)
+        self.__dict__.update(saved)
+        return out
+
+    def to_dict(self) -> dict:
+        return {"kind": "EWM", "span": self.span, "alpha": self.alpha_in, "weighted": self.weighted,
+                "old_wt": self.old_wt, "started": self.started, "nobs": self.nobs, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "EWM":
+        obj = cls(span=d["span"], alpha=d["alpha"])
+        obj.weighted, obj.old_wt, obj.started = d["weighted"], d["old_wt"], d["started"]
+        obj.nobs, obj.value = d["nobs"], d["value"]
+        return obj
+
+class WilderRSI:
+    """calculate_rsi_wilder(series, period) on a stream."""
+    def __init__(self, period: int):
+        self.period = period
+        self.prev = NaN
+        self.gain = EWM(alpha=1 / period)
+        self.loss = EWM(alpha=1 / period)
+        self.value = NaN
+
+    def update(self, close: float) -> float:
+        close = float(close)
+        delta = close - self.prev  # NaN on the first bar, like Series.diff()
+        self.prev = close
+        g = self.gain.update(delta if delta > 0 else 0.0)
+        l = self.loss.update(-(delta if delta < 0 else 0.0))
+        rs = g / (l + 1e-12)
+        self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+    def peek(self, close: float) -> float:
+        delta = float(close) - self.prev
+        g = self.gain.peek(delta if delta > 0 else 0.0)
+        l = self.loss.peek(-(delta if delta < 0 else 0.0))
+        return 100 - (100 / (1 + g / (l + 1e-12)))
+
+    def to_dict(self) -> dict:
+        return {"kind": "WilderRSI", "period": self.period, "prev": self.prev,
+                "gain": self.gain.to_dict(), "loss": self.loss.to_dict(), "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "WilderRSI":
+        obj = cls(d["period"])
+        obj.prev, obj.value = d["prev"], d["value"]
+        obj.gain, obj.loss = EWM.from_dict(d["gain"]), EWM.from_dict(d["loss"])
+        return obj
+
+class RsiEma:
+    """get_rsi_ema(series, rsi_period, ema_span) on a stream (bx_s = (5, 3), bx_l = (20, 10))."""
+    def __init__(self, rsi_period: int, ema_span: int):
+        self.rsi = WilderRSI(rsi_period)
+        self.ema = EWM(span=ema_span)
+        self.value = NaN
+
+    def update(self, close: float) -> float:
+        self.value = self.ema.update(self.rsi.update(close) - 50)
+        return self.value
+
+    def peek(self, close: float) -> float:
+        return self.ema.peek(self.rsi.peek(close) - 50)
+
+    def to_dict(self) -> dict:
+        return {"kind": "RsiEma", "rsi": self.rsi.to_dict(), "ema": self.ema.to_dict(), "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RsiEma":
+        obj = cls.__new__(cls)
+        obj.rsi, obj.ema, obj.value = WilderRSI.from_dict(d["rsi"]), EWM.from_dict(d["ema"]), d["value"]
+        return obj
+
+class _RollingExtreme:
+    """Monotonic-deque rolling max/min with pandas' min_periods=window NaN semantics."""
+    _is_max = True
+
+    def __init__(self, window: int):
+        self.window = window
+        self.i = 0
+        self.vals = deque()   # (index, value) candidates, monotonic
+        self.nan_idx = deque()  # indices of NaNs still inside the window
+        self.value = NaN
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        i, w = self.i, self.window
+        self.i += 1
+        if math.isnan(x) or math.isinf(x):
+            self.nan_idx.append(i)
+        else:
+            if self._is_max:
+                while self.vals and self.vals[-1][1] <= x:
+                    self.vals.pop()
+            else:
+                while self.vals and self.vals[-1][1] >= x:
+                    self.vals.pop()
+            self.vals.append((i, x))
+        while self.vals and self.vals[0][0] <= i - w:
+            self.vals.popleft()
+        while self.nan_idx and self.nan_idx[0] <= i - w:
+            self.nan_idx.popleft()
+        full = self.i >= w and not self.nan_idx
+        self.value = self.vals[0][1] if (full and self.vals) else NaN
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {"kind": type(self).__name__, "window": self.window, "i": self.i,
+                "vals": [list(v) for v in self.vals], "nan_idx": list(self.nan_idx), "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        obj = cls(d["window"])
+        obj.i, obj.value = d["i"], d["value"]
+        obj.vals = deque((int(i), float(v)) for i, v in d["vals"])
+        obj.nan_idx = deque(d["nan_idx"])
+        return obj
+
+class RollingMax(_RollingExtreme):
+    _is_max = True
+
+class RollingMin(_RollingExtreme):
+    _is_max = False
+
+class RollingMean:
+    """
+    Series.rolling(window).mean() on a stream. Mirrors pandas' running Kahan sum
+    (separate add/remove compensation, sign counters and the repeated-value guard),
+    which is what makes the result bit-identical rather than merely close.
+    """
+    def __init__(self, window: int):
+        self.window = window
+        self.buf = deque()
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.same_ct = 0
+        self.prev_value = NaN
+        self.value = NaN
+
+    def _add(self, val: float) -> None:
+        if val == val:
+            self.nobs += 1
+            y = val - self.comp_add
+            t = self.sum_x + y
+            self.comp_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.same_ct += 1
+            else:
+                self.same_ct = 1
+            self.prev_value = val
+
+    def _remove(self, val: float) -> None:
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.comp_remove
+            t = self.sum_x + y
+            self.comp_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct -= 1
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        if math.isinf(x):
+            x = NaN
+        if len(self.buf) == self.window:
+            self._remove(self.buf.popleft())
+        self.buf.append(x)
+        self._add(x)
+        if self.nobs >= self.window and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.same_ct >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+        else:
+            result = NaN
+        self.value = result
+        return result
+
+    def peek(self, x: float) -> float:
+        """The value update(x) would return, without consuming the bar."""
+        full = len(self.buf) == self.window
+        removed = self.buf[0] if full else None
+        saved = (self.sum_x, self.comp_add, self.comp_remove, self.nobs, self.neg_ct, self.same_ct,
+                 self.prev_value, self.value)
+        out = self.update(x)
+        self.buf.pop()
+        if full:
+            self.buf.appendleft(removed)
+        (self.sum_x, self.comp_add, self.comp_remove, self.nobs, self.neg_ct, self.same_ct,
+         self.prev_value, self.value) = saved
+        return out
+
+    def to_dict(self) -> dict:
+        return {"kind": "RollingMean", "window": self.window, "buf": list(self.buf), "sum_x": self.sum_x,
+                "comp_add": self.comp_add, "comp_remove": self.comp_remove, "nobs": self.nobs,
+                "neg_ct": self.neg_ct, "same_ct": self.same_ct, "prev_value": self.prev_value, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RollingMean":
+        obj = cls(d["window"])
+        obj.buf = deque(d["buf"])
+        for k in ("sum_x", "comp_add", "comp_remove", "nobs", "neg_ct", "same_ct", "prev_value", "value"):
+            setattr(obj, k, d[k])
+        return obj
+
+_KINDS = {c.__name__: c for c in (EWM, WilderRSI, RsiEma, RollingMax, RollingMin, RollingMean)}
+
+def state_from_dict(d: dict):
+    """Rebuild any indicator state from its to_dict() output."""
+    return _KINDS[d["kind"]].from_dict(d)
+
+def seed(state, series: pd.Series | np.ndarray):
+    """Feed a history into `state` and return it (the value after the last bar is `state.value`)."""
+    for x in np.asarray(series, dtype=np.float64).tolist():
+        state.update(x)
+    return state
+
+# ----------------------------
+# Whole-array seeding: the state `seed` would reach, without the per-bar Python loop
+#   EWM          -> pandas' ewm on the whole input (the state is its last output,
+#                   plus the weight decay over trailing NaNs)
+#   RollingMax/Min -> only the last window is fed, indices shifted to the full length
+#   RollingMean  -> the Kahan sum depends on every value: one inlined pass
+# ----------------------------
+def _seed_ewm(values: np.ndarray, span: float | None = None, alpha: float | None = None):
+    """(EWM, its value after every bar)."""
+    obj = EWM(span=span, alpha=alpha)
+    x = np.where(np.isinf(values), np.nan, values)
+    if len(x) == 0:
+        return obj, x
+    out = pd.Series(x).ewm(span=span, alpha=alpha, adjust=False).mean().to_numpy()
+    obs = np.flatnonzero(~np.isnan(x))
+    obj.started = True
+    obj.nobs = len(obs)
+    obj.weighted = obj.value = float(out[-1])
+    if len(obs):
+        for _ in range(len(x) - 1 - obs[-1]):
+            obj.old_wt *= 1.0 - obj.alpha
+    return obj, out
+
+def _seed_wilder(closes: np.ndarray, period: int):
+    """(WilderRSI, its value after every bar)."""
+    obj = WilderRSI(period)
+    if len(closes) == 0:
+        return obj, closes
+    with np.errstate(invalid="ignore"):
+        delta = np.diff(closes, prepend=np.nan)
+        obj.gain, gain = _seed_ewm(np.where(delta > 0, delta, 0.0), alpha=1 / period)
+        obj.loss, loss = _seed_ewm(-np.where(delta < 0, delta, 0.0), alpha=1 / period)
+        out = 100 - (100 / (1 + gain / (loss + 1e-12)))
+    obj.prev, obj.value = float(closes[-1]), float(out[-1])
+    return obj, out
+
+def _seed_rsi_ema(closes: np.ndarray, rsi_period: int, ema_span: int) -> RsiEma:
+    obj = RsiEma(rsi_period, ema_span)
+    if len(closes):
+        obj.rsi, rsi = _seed_wilder(closes, rsi_period)
+        obj.ema, out = _seed_ewm(rsi - 50, span=ema_span)
+        obj.value = float(out[-1])
+    return obj
+
+def _seed_extreme(cls, values: np.ndarray, window: int):
+    obj = seed(cls(window), values[-window:])
+    shift = len(values) - obj.i
+    obj.i += shift
+    obj.vals = deque((i + shift, v) for i, v in obj.vals)
+    obj.nan_idx = deque(i + shift for i in obj.nan_idx)
+    return obj
+
+def _seed_mean(values: np.ndarray, window: int) -> RollingMean:
+    """
+    RollingMean.update over every value but the last: the Kahan sum in one inlined
+    loop, the counters from the window / the trailing run of equal values; the last
+    value then goes through update().
+    """
+    obj = RollingMean(window)
+    x = np.where(np.isinf(values), np.nan, values)
+    if len(x) == 0:
+        return obj
+    xs = x.tolist()
+    sum_x = comp_add = comp_remove = 0.0
+    for old, val in zip([NaN] * window + xs, xs[:-1]):  # remove x[i - window], then add x[i]
+        if old == old:
+            y = -old - comp_remove
+            t = sum_x + y
+            comp_remove = t - sum_x - y
+            sum_x = t
+        if val == val:
+            y = val - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+    buf = x[max(0, len(x) - 1 - window):-1]
+    seen = x[:-1][~np.isnan(x[:-1])]
+    obj.buf = deque(buf.tolist())
+    obj.sum_x, obj.comp_add, obj.comp_remove = sum_x, comp_add, comp_remove
+    obj.nobs = int((~np.isnan(buf)).sum())
+    obj.neg_ct = int((np.signbit(buf) & ~np.isnan(buf)).sum())
+    if len(seen):
+        other = np.flatnonzero(seen != seen[-1])
+        obj.same_ct = len(seen) - (int(other[-1]) + 1 if len(other) else 0)
+        obj.prev_value = float(seen[-1])
+    obj.update(xs[-1])
+    return obj
+
+# ----------------------------
+# Daily EOD refs, maintained incrementally (same fields as engine._eod_refs)
+# ----------------------------
+class DailyRefs:
+    """
+    Incremental version of the daily part of the EOD audit.
+    `update(o, h, l, c, v)` returns the `_eod_refs` dict of the new bar plus
+    `bx_s_prev` / `bx_s_now`; `h_ref` / `s_ref` are the windows *before* the bar (shift(1)).
+    """
+    def __init__(self):
+        self.high252 = RollingMax(252)
+        self.low20 = RollingMin(20)
+        self.ma200 = RollingMean(200)
+        self.ma50 = RollingMean(50)
+        self.vol20 = RollingMean(20)
+        self.bx_s = RsiEma(5, 3)
+        self.bars = 0
+
+    @classmethod
+    def from_history(cls, d: pd.DataFrame) -> "DailyRefs":
+        obj = cls()
+        cols = [d[c].to_numpy(dtype=np.float64).tolist() for c in ("Open", "High", "Low", "Close", "Volume")]
+        for bar in zip(*cols):
+            obj.update(*bar)
+        return obj
+
+    def update(self, o: float, h: float, l: float, c: float, v: float) -> dict:
+        h_ref, s_ref = self.high252.value, self.low20.value
+        bx_s_prev = self.bx_s.value
+        self.high252.update(h)
+        self.low20.update(l)
+        ma_long = self.ma200.update(c)
+        ma_mid = self.ma50.update(c)
+        vol_ma20 = self.vol20.update(v)
+        bx_s_now = self.bx_s.update(c)
+        self.bars += 1
+        c, h, l, v = float(c), float(h), float(l), float(v)
+        return {
+            "c_d": c,
+            "h_ref": h_ref,
+            "s_ref": s_ref,
+            "ma_long": ma_long,
+            "ma_mid": ma_mid,
+            "dist_pct": (h_ref - c) / h_ref if h_ref > 0 else np.nan,
+            "fuel": v / vol_ma20 if vol_ma20 > 0 else 0.0,
+            "push": (c - l) / (h - l) if h != l else 0.5,
+            "bx_s_prev": bx_s_prev if self.bars >= 2 else 0.0,
+            "bx_s_now": bx_s_now,
+        }
+
+    def to_dict(self) -> dict:
+        return {"kind": "DailyRefs", "bars": self.bars,
+                **{k: getattr(self, k).to_dict() for k in ("high252", "low20", "ma200", "ma50", "vol20", "bx_s")}}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DailyRefs":
+        obj = cls()
+        obj.bars = d["bars"]
+        for k in ("high252", "low20", "ma200", "ma50", "vol20", "bx_s"):
+            setattr(obj, k, state_from_dict(d[k]))
+        return obj
+
+_KINDS["DailyRefs"] = DailyRefs
+
+# ----------------------------
+# True-Sync backtest inputs, maintained incrementally (same values as engine._prepare_true_sync)
+# Weekly (W-SUN) / month-end pools are aggregated bar by bar; a period's flag becomes
+# visible once the period is complete (a bar of a later period arrives, or the bar
+# falls on the period's last day), which is what reindex(method="ffill") onto the
+# daily dates yields. Before the first complete period the flag is True (na_value=True).
+# ----------------------------
+def _period_keys(ts: pd.Timestamp) -> tuple[int, bool, int, bool]:
+    """(week id, bar closes its week, month id, bar closes its month) of a daily timestamp."""
+    day = int(ts.value // 86_400_000_000_000)
+    weekday = (day + 3) % 7  # 1970-01-01 was a Thursday
+    return day + 6 - weekday, weekday == 6, ts.year * 12 + ts.month, bool(ts.is_month_end)
+
+def _period_feed(ids: np.ndarray, last_closed: bool, closes: np.ndarray, step: int, legacy: bool):
+    """
+    Closes fed to the weekly/monthly states by update() over bars with period `ids`
+    (`last_closed`: the last bar ends its period), with the NaN rows of empty periods
+    if `legacy`. Returns: feed, open period id (or None), last closed period id (or None).
+    """
+    first = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    periods = ids[first].tolist()
+    ends = closes[np.r_[first[1:] - 1, len(ids) - 1]]
+    if legacy:
+        pos = np.cumsum(np.r_[0, np.diff(periods) // step - 1] + 1) - 1
+        feed = np.full(pos[-1] + 1, np.nan)
+        feed[pos] = ends
+    else:
+        feed = ends
+    if last_closed:
+        return feed, None, periods[-1]
+    return feed[:-1], periods[-1], periods[-2] if len(periods) > 1 else None
+
+class TrueSyncRefs:
+    """
+    `update(ts, o, h, l, c, v)` returns the per-bar kernel inputs of the new bar:
+    Upper_ref, Lower_ref, MA50, Vol_MA20, bx_s, w_bullish, m_bullish.
+    `sync` as in engine._prepare_true_sync: "legacy" also feeds a NaN close for every
+    calendar week/month without bars (the flag reads False until the next close).
+    """
+    _STATES = ("high252", "low20", "ma50", "vol20", "bx_s", "ma50_w", "bx_l_w", "ma20_m")
+    _FIELDS = ("sync", "week", "week_close", "w_bullish", "last_week",
+               "month", "month_close", "m_bullish", "last_month")
+
+    def __init__(self, sync: str = "legacy"):
+        self.sync = sync
+        self.high252 = RollingMax(252)
+        self.low20 = RollingMin(20)
+        self.ma50 = RollingMean(50)
+        self.vol20 = RollingMean(20)
+        self.bx_s = RsiEma(5, 3)
+        self.ma50_w = RollingMean(50)
+        self.bx_l_w = RsiEma(20, 10)
+        self.ma20_m = RollingMean(20)
+        self.week, self.week_close, self.w_bullish, self.last_week = None, NaN, True, None
+        self.month, self.month_close, self.m_bullish, self.last_month = None, NaN, True, None
+
+    @classmethod
+    def from_history(cls, d: pd.DataFrame, sync: str = "legacy") -> "TrueSyncRefs":
+        """The state after update() over every bar of `d`, seeded from whole arrays."""
+        obj = cls(sync)
+        if len(d) == 0:
+            return obj
+        o, h, l, c, v = (d[k].to_numpy(dtype=np.float64) for k in ("Open", "High", "Low", "Close", "Volume"))
+        if not (d.index.is_monotonic_increasing and d.index.is_unique):
+            for ts, *bar in zip(d.index, o.tolist(), h.tolist(), l.tolist(), c.tolist(), v.tolist()):
+                obj.update(ts, *bar)  # a repeated date reopens its closed period: replay
+            return obj
+        obj.high252 = _seed_extreme(RollingMax, h, 252)
+        obj.low20 = _seed_extreme(RollingMin, l, 20)
+        obj.ma50 = _seed_mean(c, 50)
+        obj.vol20 = _seed_mean(v, 20)
+        obj.bx_s = _seed_rsi_ema(c, 5, 3)
+
+        day = d.index.as_unit("ns").asi8 // 86_400_000_000_000
+        weekday = (day + 3) % 7
+        legacy = sync == "legacy"
+        feed, obj.week, obj.last_week = _period_feed(day + 6 - weekday, weekday[-1] == 6, c, 7, legacy)
+        if len(feed):
+            obj.ma50_w = _seed_mean(feed, 50)
+            obj.bx_l_w = _seed_rsi_ema(feed, 20, 10)
+            obj.w_bullish = bool((feed[-1] > obj.ma50_w.value) and (obj.bx_l_w.value > -5))
+        month = np.asarray(d.index.year * 12 + d.index.month)
+        feed, obj.month, obj.last_month = _period_feed(month, bool(d.index[-1].is_month_end), c, 1, legacy)
+        if len(feed):
+            obj.ma20_m = _seed_mean(feed, 20)
+            obj.m_bullish = bool(feed[-1] > obj.ma20_m.value)
+        obj.week_close = obj.month_close = float(c[-1])
+        return obj
+
+    def _close_week(self) -> None:
+        ma = self.ma50_w.update(self.week_close)
+        bx = self.bx_l_w.update(self.week_close)
+        self.w_bullish = (self.week_close > ma) and (bx > -5)
+        self.last_week, self.week = self.week, None
+
+    def _close_month(self) -> None:
+        self.m_bullish = self.month_close > self.ma20_m.update(self.month_close)
+        self.last_month, self.month = self.month, None
+
+    def _skip_empty(self, week: int, month: int) -> None:
+        """Legacy pools: one NaN row per calendar period between the last closed one and the new bar's."""
+        if self.week is None and self.last_week is not None:
+            for _ in range((week - self.last_week) // 7 - 1):
+                self.ma50_w.update(NaN)
+                self.bx_l_w.update(NaN)
+                self.w_bullish = False
+        if self.month is None and self.last_month is not None:
+            for _ in range(month - self.last_month - 1):
+                self.ma20_m.update(NaN)
+                self.m_bullish = False
+
+    def update(self, ts: pd.Timestamp, o: float, h: float, l: float, c: float, v: float) -> dict:
+        week, week_end, month, month_end = _period_keys(ts)
+        if self.week is not None and week != self.week:
+            self._close_week()
+        if self.month is not None and month != self.month:
+            self._close_month()
+        if self.sync == "legacy":
+            self._skip_empty(week, month)
+        self.week, self.week_close = week, float(c)
+        self.month, self.month_close = month, float(c)
+        if week_end:
+            self._close_week()
+        if month_end:
+            self._close_month()
+
+        upper, lower = self.high252.value, self.low20.value
+        self.high252.update(h)
+        self.low20.update(l)
+        return {
+            "Upper_ref": upper,
+            "Lower_ref": lower,
+            "MA50": self.ma50.update(c),
+            "Vol_MA20": self.vol20.update(v),
+            "bx_s": self.bx_s.update(c),
+            "w_bullish": self.w_bullish,
+            "m_bullish": self.m_bullish,
+        }
+
+    def to_dict(self) -> dict:
+        return {"kind": "TrueSyncRefs", **{k: getattr(self, k).to_dict() for k in self._STATES},
+                **{k: getattr(self, k) for k in self._FIELDS}}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TrueSyncRefs":
+        obj = cls()
+        for k in cls._STATES:
+            setattr(obj, k, state_from_dict(d[k]))
+        for k in cls._FIELDS:
+            setattr(obj, k, d[k])
+        return obj
+
+_KINDS["TrueSyncRefs"] = TrueSyncRefs
+
+# ----------------------------
+# EOD macro flags, maintained incrementally (same values as engine._eod_macro)
+# The EOD audit resamples the whole history, so its last weekly/monthly bar is the
+# period in progress: completed periods are folded into the states, the current
+# one is only peeked at with its latest close.
+# ----------------------------
+class EodMacro:
+    """`update(ts, close)` consumes a daily close; `flags()` -> (w_bullish, m_bullish) as of that bar."""
+    def __init__(self):
+        self.ma50_w = RollingMean(50)
+        self.bx_l_w = RsiEma(20, 10)
+        self.ma20_m = RollingMean(20)
+        self.weeks = self.months = 0  # periods seen, the current one included
+        self.week, self.week_close = None, NaN
+        self.month, self.month_close = None, NaN
+
+    def update(self, ts: pd.Timestamp, close: float) -> None:
+        week, _, month, _ = _period_keys(ts)
+        if week != self.week:
+            if self.week is not None:
+                self.ma50_w.update(self.week_close)
+                self.bx_l_w.update(self.week_close)
+            self.week = week
+            self.weeks += 1
+        if month != self.month:
+            if self.month is not None:
+                self.ma20_m.update(self.month_close)
+            self.month = month
+            self.months += 1
+        self.week_close = self.month_close = float(close)
+
+    def flags(self) -> tuple[bool, bool]:
+        c = self.week_close
+        bx_l_w = self.bx_l_w.peek(c) if self.weeks > 25 else -999
+        w_bullish = bool((c > self.ma50_w.peek(c)) and (bx_l_w > -5))
+        m_bullish = bool(self.month_close > self.ma20_m.peek(self.month_close)) if self.months > 25 else False
+        return w_bullish, m_bullish
+
+    def to_dict(self) -> dict:
+        return {"kind": "EodMacro", "ma50_w": self.ma50_w.to_dict(), "bx_l_w": self.bx_l_w.to_dict(),
+                "ma20_m": self.ma20_m.to_dict(), "weeks": self.weeks, "months": self.months,
+                "week": self.week, "week_close": self.week_close, "month": self.month, "month_close": self.month_close}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "EodMacro":
+        obj = cls()
+        for k in ("ma50_w", "bx_l_w", "ma20_m"):
+            setattr(obj, k, state_from_dict(d[k]))
+        for k in ("weeks", "months", "week", "week_close", "month", "month_close"):
+            setattr(obj, k, d[k])
+        return obj
+
+_KINDS["EodMacro"] = EodMacro
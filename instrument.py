@@ -0,0 +1,150 @@
+# instrument.py
+import json
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ----------------------------
+# Optional per-run instrumentation
+#   with recording("eod", symbol="D05.SI") as rec:
+#       run_eod_analyzer("D05.SI")
+#   rec.record() -> {"run", "meta", "wall_s", "cpu_s", "stages", "counters", "errors"}
+# Engine code calls stage()/count()/error() unconditionally; with no active
+# recording they return a shared no-op, so the disabled cost is one ContextVar lookup.
+# Nested stages are recorded as "outer/inner".
+# ----------------------------
+_ACTIVE: ContextVar = ContextVar("smartstock_recorder", default=None)
+_SINKS = []
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    __slots__ = ("rec", "name", "w0", "c0")
+
+    def __init__(self, rec: "Recorder", name: str):
+        self.rec = rec
+        self.name = name
+
+    def __enter__(self):
+        self.rec._stack.append(self.name)
+        self.w0 = time.perf_counter()
+        self.c0 = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.w0
+        cpu = time.process_time() - self.c0
+        path = "/".join(self.rec._stack)
+        self.rec._stack.pop()
+        if exc[0] is not None and self.rec._exc_stage is None:
+            # innermost stage an exception escaped from, for error()
+            self.rec._exc_stage = path
+        s = self.rec.stages.setdefault(path, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+        s["wall_s"] += wall
+        s["cpu_s"] += cpu
+        s["calls"] += 1
+        return False
+
+class Recorder:
+    def __init__(self, run: str, **meta):
+        self.run = run
+        self.meta = meta
+        self.stages = {}
+        self.counters = {}
+        self.errors = []
+        self._stack = []
+        self._exc_stage = None
+        self._w0 = time.perf_counter()
+        self._c0 = time.process_time()
+        self.wall_s = None
+        self.cpu_s = None
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def error(self, exc: BaseException) -> None:
+        self.errors.append({
+            "stage": self._exc_stage or "/".join(self._stack) or None,
+            "type": type(exc).__name__,
+            "message": str(exc),
+            "traceback": "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)),
+        })
+        self._exc_stage = None
+
+    def finish(self) -> None:
+        """Freeze wall/CPU totals; calling it again extends the run to now."""
+        self.wall_s = time.perf_counter() - self._w0
+        self.cpu_s = time.process_time() - self._c0
+
+    def record(self) -> dict:
+        return {
+            "run": self.run,
+            "meta": self.meta,
+            "wall_s": self.wall_s if self.wall_s is not None else time.perf_counter() - self._w0,
+            "cpu_s": self.cpu_s if self.cpu_s is not None else time.process_time() - self._c0,
+            "stages": self.stages,
+            "counters": self.counters,
+            "errors": self.errors,
+        }
+
+# ---- engine-facing helpers (no-ops unless a recording is active)
+def stage(name: str):
+    rec = _ACTIVE.get()
+    return _NULL_STAGE if rec is None else _Stage(rec, name)
+
+def count(name: str, n: int = 1) -> None:
+    rec = _ACTIVE.get()
+    if rec is not None:
+        rec.count(name, n)
+
+def error(exc: BaseException) -> None:
+    rec = _ACTIVE.get()
+    if rec is not None:
+        rec.error(exc)
+
+def active() -> Recorder | None:
+    return _ACTIVE.get()
+
+# ---- caller-facing API
+def add_sink(fn) -> None:
+    """Register `fn(record_dict)`, called once at the end of every recording."""
+    _SINKS.append(fn)
+
+def remove_sink(fn) -> None:
+    _SINKS.remove(fn)
+
+def jsonl_sink(path: str):
+    """Sink appending each record as one JSON line to `path`."""
+    def sink(rec: dict) -> None:
+        with open(path, "a") as fh:
+            fh.write(json.dumps(rec, default=str) + "\n")
+    return sink
+
+@contextmanager
+def recording(run: str, enabled: bool = True, **meta):
+    """Activate a Recorder for the enclosed block (yields None when disabled)."""
+    if not enabled:
+        yield None
+        return
+    rec = Recorder(run, **meta)
+    token = _ACTIVE.set(rec)
+    try:
+        yield rec
+    finally:
+        _ACTIVE.reset(token)
+        rec.finish()
+        for sink in list(_SINKS):
+            sink(rec.record())
@@ -0,0 +1,337 @@
+# panel.py
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import incremental
+
+# ----------------------------
+# Batched indicator kernels on a (dates x symbols) panel
+# X is a float matrix on a shared calendar; NaN means "no bar" (not listed yet,
+# delisted, halted). Every column is evaluated over its own bars only, exactly as
+# the single-series functions would see them, so for each symbol
+#   rsi_wilder(X, 5)[:, j][bars]  ==  calculate_rsi_wilder(pd.Series(X[bars, j]), 5)
+# bit for bit, and gap rows come back as NaN.
+# How: columns are compacted (each symbol's bars moved to the top, in order), the
+# kernels run on the compacted matrix (EWM as one vectorised recurrence over
+# dates, rolling windows through pandas' own 2D rolling), then scattered back.
+# ----------------------------
+def stack(frames: dict, column: str) -> tuple[pd.DatetimeIndex, list[str], np.ndarray]:
+    """Stack `column` of per-symbol daily frames on their union calendar. Returns: index, symbols, X."""
+    symbols = list(frames)
+    index = frames[symbols[0]].index
+    for sym in symbols[1:]:
+        index = index.union(frames[sym].index)
+    X = np.full((len(index), len(symbols)), np.nan)
+    for j, sym in enumerate(symbols):
+        X[index.get_indexer(frames[sym].index), j] = frames[sym][column].to_numpy(dtype=np.float64)
+    return index, symbols, X
+
+def _compact(X: np.ndarray):
+    """Move each column's bars to the top. Returns: compacted X, row order, bar mask."""
+    X = np.asarray(X, dtype=np.float64)
+    valid = ~np.isnan(X)
+    if valid.all():
+        return X, None, valid
+    order = np.argsort(~valid, axis=0, kind="stable")
+    return np.take_along_axis(X, order, axis=0), order, valid
+
+def _scatter(C: np.ndarray, order: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Inverse of _compact: put compacted rows back on the calendar, NaN on gap rows."""
+    if order is None:
+        return C
+    out = np.empty_like(C)
+    np.put_along_axis(out, order, C, axis=0)
+    out[~valid] = np.nan
+    return out
+
+def _ewm(C: np.ndarray, span: float | None = None, alpha: float | None = None) -> np.ndarray:
+    """ewm(adjust=False).mean() down every column of a gap-free (compacted) matrix."""
+    # same span/alpha -> com -> alpha round trip and update rule as pandas (see incremental.EWM)
+    com = (span - 1) / 2.0 if span is not None else (1 - alpha) / alpha
+    alpha = 1.0 / (1.0 + com)
+    old_wt = 1.0 - alpha
+    new_wt = 1.0 - old_wt if com == 1 else alpha
+    out = np.empty_like(C)
+    if len(C) == 0:
+        return out
+    w = C[0].copy()
+    out[0] = w
+    for t in range(1, len(C)):
+        cur = C[t]
+        # pandas leaves the average untouched when the input equals it (constant series guard)
+        np.copyto(w, (old_wt * w + new_wt * cur) / (old_wt + new_wt), where=w != cur)
+        out[t] = w
+    return out
+
+def _rsi_wilder(C: np.ndarray, period: int) -> np.ndarray:
+    delta = np.full_like(C, np.nan)
+    delta[1:] = C[1:] - C[:-1]
+    alpha = 1 / period
+    avg_gain = _ewm(np.where(delta > 0, delta, 0.0), alpha=alpha)
+    avg_loss = _ewm(-np.where(delta < 0, delta, 0.0), alpha=alpha)
+    rs = avg_gain / (avg_loss + 1e-12)
+    return 100 - (100 / (1 + rs))
+
+def rsi_wilder(X: np.ndarray, period: int) -> np.ndarray:
+    """calculate_rsi_wilder on every column."""
+    C, order, valid = _compact(X)
+    return _scatter(_rsi_wilder(C, period), order, valid)
+
+def rsi_ema(X: np.ndarray, rsi_period: int, ema_span: int) -> np.ndarray:
+    """get_rsi_ema on every column (bx_s = (5, 3), bx_l = (20, 10))."""
+    C, order, valid = _compact(X)
+    return _scatter(_ewm(_rsi_wilder(C, rsi_period) - 50, span=ema_span), order, valid)
+
+def _rolling(X: np.ndarray, window: int, how: str, shift: int) -> np.ndarray:
+    C, order, valid = _compact(X)
+    out = getattr(pd.DataFrame(C).rolling(window), how)().to_numpy()
+    if shift:
+        out = np.concatenate((np.full((shift, out.shape[1]), np.nan), out[:-shift]))
+    return _scatter(out, order, valid)
+
+def rolling_max(X: np.ndarray, window: int, shift: int = 0) -> np.ndarray:
+    """Series.rolling(window).max().shift(shift) on every column (Upper_ref = rolling_max(H, 252, 1))."""
+    return _rolling(X, window, "max", shift)
+
+def rolling_min(X: np.ndarray, window: int, shift: int = 0) -> np.ndarray:
+    """Series.rolling(window).min().shift(shift) on every column (Lower_ref = rolling_min(L, 20, 1))."""
+    return _rolling(X, window, "min", shift)
+
+def rolling_mean(X: np.ndarray, window: int, shift: int = 0) -> np.ndarray:
+    """Series.rolling(window).mean().shift(shift) on every column."""
+    return _rolling(X, window, "mean", shift)
+
+def volume_ratio(V: np.ndarray, window: int = 20) -> np.ndarray:
+    """Volume / Vol_MA(window), 0.0 while the MA is undefined or not positive (the kernel's vol_ratio)."""
+    vma = rolling_mean(V, window)
+    out = np.zeros_like(vma)
+    np.divide(V, vma, out=out, where=vma > 0)
+    out[np.isnan(V)] = np.nan
+    return out
+
+# ----------------------------
+# Per-tick column states (the streaming counterpart of the kernels above)
+# One incremental.* state per column, held as arrays: `update(j, x)` advances the
+# columns `j` (distinct) by one value each with the same float operations as the
+# scalar state, so every column stays bit-identical to it; `peek` is update without
+# committing. `load(j, state)` / `dump(j)` convert from / to the scalar objects
+# (seeding, JSON snapshots). Columns are added with `grow(n)`. Rolling extremes
+# have no `peek` (nothing needs one).
+# ----------------------------
+class _Columns:
+    """Arrays of per-column fields: name -> (dtype, initial value, trailing shape)."""
+    def __init__(self, fields: dict):
+        self._fields = fields
+        self.size = 0
+        for name, (dtype, fill, shape) in fields.items():
+            setattr(self, name, np.full((0, *shape), fill, dtype=dtype))
+
+    def grow(self, n: int) -> None:
+        if n <= self.size:
+            return
+        for name, (dtype, fill, shape) in self._fields.items():
+            new = np.full((n, *shape), fill, dtype=dtype)
+            new[:self.size] = getattr(self, name)
+            setattr(self, name, new)
+        self.size = n
+
+    def _commit(self, j: np.ndarray, new: dict) -> None:
+        for name, values in new.items():
+            getattr(self, name)[j] = values
+
+    def update(self, j: np.ndarray, x: np.ndarray) -> np.ndarray:
+        value, new = self._step(j, x)
+        self._commit(j, new)
+        return value
+
+    def peek(self, j: np.ndarray, x: np.ndarray) -> np.ndarray:
+        return self._step(j, x)[0]
+
+class ColEWM(_Columns):
+    """incremental.EWM per column."""
+    def __init__(self, span: float | None = None, alpha: float | None = None):
+        super().__init__({"weighted": (np.float64, np.nan, ()), "old_wt": (np.float64, 1.0, ()),
+                          "started": (bool, False, ()), "nobs": (np.int64, 0, ())})
+        self.proto = incremental.EWM(span=span, alpha=alpha)
+
+    def _step(self, j, x):
+        alpha, com = self.proto.alpha, self.proto.com
+        cur = np.where(np.isinf(x), np.nan, x)
+        is_obs = ~np.isnan(cur)
+        nobs = self.nobs[j] + is_obs
+        started, w, ow = self.started[j], self.weighted[j], self.old_wt[j]
+        live = started & ~np.isnan(w)
+        with np.errstate(invalid="ignore"):
+            decayed = ow * (1.0 - alpha)
+            new_wt = 1.0 - decayed if com == 1 else alpha
+            mixed = (decayed * w + new_wt * cur) / (decayed + new_wt)
+        w = np.where(live & is_obs & (w != cur), mixed, w)
+        w = np.where(~started | (started & np.isnan(self.weighted[j]) & is_obs), cur, w)
+        ow = np.where(live, np.where(is_obs, 1.0, decayed), np.where(started, ow, 1.0))
+        value = np.where(nobs >= 1, w, np.nan)
+        return value, {"weighted": w, "old_wt": ow, "started": True, "nobs": nobs}
+
+    def load(self, j: int, st: "incremental.EWM") -> None:
+        self.weighted[j], self.old_wt[j], self.started[j], self.nobs[j] = st.weighted, st.old_wt, st.started, st.nobs
+
+    def dump(self, j: int) -> "incremental.EWM":
+        st = incremental.EWM(span=self.proto.span, alpha=self.proto.alpha_in)
+        st.weighted, st.old_wt = float(self.weighted[j]), float(self.old_wt[j])
+        st.started, st.nobs = bool(self.started[j]), int(self.nobs[j])
+        st.value = st.weighted if st.nobs >= 1 else np.nan
+        return st
+
+class ColRsiEma(_Columns):
+    """incremental.RsiEma per column."""
+    def __init__(self, rsi_period: int, ema_span: int):
+        super().__init__({"prev": (np.float64, np.nan, ()), "rsi": (np.float64, np.nan, ()),
+                          "value": (np.float64, np.nan, ())})
+        self.rsi_period, self.ema_span = rsi_period, ema_span
+        self.gain, self.loss = ColEWM(alpha=1 / rsi_period), ColEWM(alpha=1 / rsi_period)
+        self.ema = ColEWM(span=ema_span)
+
+    def grow(self, n: int) -> None:
+        super().grow(n)
+        for part in (self.gain, self.loss, self.ema):
+            part.grow(n)
+
+    def _step(self, j, x):
+        with np.errstate(invalid="ignore"):
+            delta = x - self.prev[j]
+            g, g_new = self.gain._step(j, np.where(delta > 0, delta, 0.0))
+            l, l_new = self.loss._step(j, -np.where(delta < 0, delta, 0.0))
+            rsi = 100 - (100 / (1 + g / (l + 1e-12)))
+        value, e_new = self.ema._step(j, rsi - 50)
+        return value, {"prev": x, "rsi": rsi, "value": value, "gain": g_new, "loss": l_new, "ema": e_new}
+
+    def _commit(self, j, new):
+        for name in ("gain", "loss", "ema"):
+            getattr(self, name)._commit(j, new.pop(name))
+        super()._commit(j, new)
+
+    def load(self, j: int, st: "incremental.RsiEma") -> None:
+        self.prev[j], self.rsi[j], self.value[j] = st.rsi.prev, st.rsi.value, st.value
+        self.gain.load(j, st.rsi.gain)
+        self.loss.load(j, st.rsi.loss)
+        self.ema.load(j, st.ema)
+
+    def dump(self, j: int) -> "incremental.RsiEma":
+        st = incremental.RsiEma(self.rsi_period, self.ema_span)
+        st.rsi.prev, st.rsi.value, st.value = float(self.prev[j]), float(self.rsi[j]), float(self.value[j])
+        st.rsi.gain, st.rsi.loss, st.ema = self.gain.dump(j), self.loss.dump(j), self.ema.dump(j)
+        return st
+
+class ColRollingMean(_Columns):
+    """incremental.RollingMean per column (ring buffer; `n` = values pushed, capped at the window)."""
+    def __init__(self, window: int):
+        super().__init__({"buf": (np.float64, np.nan, (window,)), "head": (np.int64, 0, ()), "n": (np.int64, 0, ()),
+                          "sum_x": (np.float64, 0.0, ()), "comp_add": (np.float64, 0.0, ()),
+                          "comp_remove": (np.float64, 0.0, ()), "nobs": (np.int64, 0, ()),
+                          "neg_ct": (np.int64, 0, ()), "same_ct": (np.int64, 0, ()),
+                          "prev_value": (np.float64, np.nan, ()), "value": (np.float64, np.nan, ())})
+        self.window = window
+
+    def _step(self, j, x):
+        x = np.where(np.isinf(x), np.nan, x)
+        w = self.window
+        head, n = self.head[j], self.n[j]
+        slot = (head + n) % w  # the oldest value's slot once the ring is full
+        s, ca, cr = self.sum_x[j], self.comp_add[j], self.comp_remove[j]
+        nobs, neg, same, prev = self.nobs[j], self.neg_ct[j], self.same_ct[j], self.prev_value[j]
+        # remove the value leaving the window (RollingMean._remove)
+        old = self.buf[j, slot]
+        out = (n == w) & ~np.isnan(old)
+        y = -old - cr
+        t = s + y
+        cr = np.where(out, t - s - y, cr)
+        s = np.where(out, t, s)
+        nobs = nobs - out
+        neg = neg - (out & np.signbit(old))
+        # add the new one (RollingMean._add)
+        inn = ~np.isnan(x)
+        y = x - ca
+        t = s + y
+        ca = np.where(inn, t - s - y, ca)
+        s = np.where(inn, t, s)
+        nobs = nobs + inn
+        neg = neg + (inn & np.signbit(x))
+        same = np.where(inn, np.where(x == prev, same + 1, 1), same)
+        prev = np.where(inn, x, prev)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = s / nobs
+        result = np.where(same >= nobs, prev, np.where((neg == 0) & (result < 0), 0.0,
+                                                        np.where((neg == nobs) & (result > 0), 0.0, result)))
+        result = np.where((nobs >= w) & (nobs > 0), result, np.nan)
+        full = n == w
+        new = {"head": np.where(full, (head + 1) % w, head), "n": np.where(full, n, n + 1), "sum_x": s,
+               "comp_add": ca, "comp_remove": cr, "nobs": nobs, "neg_ct": neg, "same_ct": same,
+               "prev_value": prev, "value": result}
+        return result, {**new, "_slot": (slot, x)}
+
+    def _commit(self, j, new):
+        slot, x = new.pop("_slot")
+        self.buf[j, slot] = x
+        super()._commit(j, new)
+
+    def load(self, j: int, st: "incremental.RollingMean") -> None:
+        self.buf[j] = np.nan
+        self.buf[j, :len(st.buf)] = list(st.buf)
+        self.head[j], self.n[j] = 0, len(st.buf)
+        self.sum_x[j], self.comp_add[j], self.comp_remove[j] = st.sum_x, st.comp_add, st.comp_remove
+        self.nobs[j], self.neg_ct[j], self.same_ct[j] = st.nobs, st.neg_ct, st.same_ct
+        self.prev_value[j], self.value[j] = st.prev_value, st.value
+
+    def dump(self, j: int) -> "incremental.RollingMean":
+        st = incremental.RollingMean(self.window)
+        ring = np.roll(self.buf[j], -int(self.head[j]))[:int(self.n[j])]
+        st.buf = deque(ring.tolist())
+        st.sum_x, st.comp_add, st.comp_remove = float(self.sum_x[j]), float(self.comp_add[j]), float(self.comp_remove[j])
+        st.nobs, st.neg_ct, st.same_ct = int(self.nobs[j]), int(self.neg_ct[j]), int(self.same_ct[j])
+        st.prev_value, st.value = float(self.prev_value[j]), float(self.value[j])
+        return st
+
+class ColRollingExtreme(_Columns):
+    """
+    incremental.RollingMax / RollingMin per column: a ring of the window (NaN for
+    NaN/inf and unfilled slots, so the extreme reads NaN exactly when the deque
+    version does). Loaded deques keep only their candidates; the other slots get
+    -inf / +inf, which can never be the extreme of a later window.
+    """
+    def __init__(self, window: int, is_max: bool):
+        super().__init__({"ring": (np.float64, np.nan, (window,)), "i": (np.int64, 0, ()),
+                          "value": (np.float64, np.nan, ())})
+        self.window, self.is_max = window, is_max
+
+    def update(self, j, x):
+        self.ring[j, self.i[j] % self.window] = np.where(np.isinf(x), np.nan, x)
+        self.i[j] += 1
+        ring = self.ring[j]
+        self.value[j] = value = ring.max(axis=1) if self.is_max else ring.min(axis=1)
+        return value
+
+    def load(self, j: int, st) -> None:
+        w = self.window
+        ring = np.full(w, -np.inf if self.is_max else np.inf)
+        ring[[k % w for k in range(st.i - w, 0)]] = np.nan  # never filled
+        for k, v in st.vals:
+            ring[k % w] = v
+        ring[[k % w for k in st.nan_idx]] = np.nan
+        self.ring[j], self.i[j], self.value[j] = ring, st.i, st.value
+
+    def dump(self, j: int):
+        w, i = self.window, int(self.i[j])
+        st = (incremental.RollingMax if self.is_max else incremental.RollingMin)(w)
+        st.i, st.value = i, float(self.value[j])
+        idx = list(range(max(0, i - w), i))
+        vals = self.ring[j, [k % w for k in idx]]
+        # a value stays a deque candidate while every later value in the window is below (above) it
+        later = np.fmax.accumulate(vals[::-1])[::-1] if self.is_max else np.fmin.accumulate(vals[::-1])[::-1]
+        later = np.r_[later[1:], np.nan]
+        for k, v, nxt in zip(idx, vals.tolist(), later.tolist()):
+            if v != v:
+                st.nan_idx.append(k)
+            elif nxt != nxt or (v > nxt if self.is_max else v < nxt):
+                st.vals.append((k, v))
+        return st
@@ -0,0 +1,222 @@
+# portfolio.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import panel
+from engine import V296_PARAMS, IndicatorGraph, _download_daily, _prepare_true_sync, _sync_flags
+
+# ----------------------------
+# Portfolio True-Sync backtest (shared cash pool)
+# Same per-symbol state machine as run_smartstock_v296_engine (decide at close,
+# execute at next open), evaluated for all symbols at once per date.
+# Capital rule: each entry may use at most equity * max_pos / max_positions,
+# capped by free cash, and at most `max_positions` names are held at a time.
+# With one symbol and max_positions=1 this reduces to the single-symbol engine.
+# Pending buys that find no free slot (or cannot afford one share) on their
+# execution day are dropped and counted as skipped.
+# Prep: the daily refs run once on the (dates x symbols) panel (panel.py kernels,
+# bit-identical per symbol); only the W/M macro flags are built per symbol. Frames
+# with NaN bars take the per-symbol pandas prep (the panel reads NaN as "no bar").
+# ----------------------------
+_FLOAT_COLS = ("Open", "High", "Low", "Close", "Volume", "Upper_ref", "Lower_ref", "MA50", "Vol_MA20", "bx_s")
+_OHLCV = ("Open", "High", "Low", "Close", "Volume")
+
+def _clean(df: pd.DataFrame) -> bool:
+    return not np.isnan(df[list(_OHLCV)].to_numpy(dtype=np.float64)).any()
+
+def _prepare_one(df: pd.DataFrame):
+    """Per-symbol prep: (index, kernel arrays) for frames with NaN bars, else (index, (w_bullish, m_bullish))."""
+    if _clean(df):
+        return df.index, _sync_flags(IndicatorGraph(df))
+    return df.index, _prepare_true_sync(df)
+
+def _align(frames: dict, per_symbol: dict, symbols: list[str], index: pd.DatetimeIndex, start: int) -> dict:
+    """Stack per-symbol kernel inputs into (dates x symbols) matrices on the union calendar (NaN = no bar)."""
+    T, S = len(index), len(symbols)
+    out = {c: np.full((T, S), np.nan) for c in _OHLCV}
+    out["bx_prev"] = np.full((T, S), np.nan)
+    out["w_bullish"] = np.zeros((T, S), dtype=bool)
+    out["m_bullish"] = np.zeros((T, S), dtype=bool)
+    out["active"] = np.zeros((T, S), dtype=bool)
+    rows = {}
+    for j, sym in enumerate(symbols):
+        sym_index, prep = per_symbol[sym]
+        r = rows[sym] = index.get_indexer(sym_index)
+        for c in _OHLCV:
+            out[c][r, j] = frames[sym][c].to_numpy(dtype=np.float64)
+        w_bullish, m_bullish = (prep["w_bullish"], prep["m_bullish"]) if isinstance(prep, dict) else prep
+        out["w_bullish"][r, j] = w_bullish
+        out["m_bullish"][r, j] = m_bullish
+        out["active"][r[start:], j] = True
+
+    # daily refs of every symbol at once (Colab: 252D high / 20D low before the bar, MA50, Vol_MA20, bx_s)
+    out["Upper_ref"] = panel.rolling_max(out["High"], 252, 1)
+    out["Lower_ref"] = panel.rolling_min(out["Low"], 20, 1)
+    out["MA50"] = panel.rolling_mean(out["Close"], 50)
+    out["Vol_MA20"] = panel.rolling_mean(out["Volume"], 20)
+    out["bx_s"] = panel.rsi_ema(out["Close"], 5, 3)
+    for c in _FLOAT_COLS[len(_OHLCV):]:
+        out[c] = np.require(out[c], requirements="W")  # pandas' rolling output may be a read-only view
+    for j, sym in enumerate(symbols):
+        r, prep = rows[sym], per_symbol[sym][1]
+        if isinstance(prep, dict):  # pandas prep (NaN bars)
+            for c in _FLOAT_COLS:
+                out[c][r, j] = prep[c]
+        # previous bar of the symbol's own series, not of the union calendar
+        out["bx_prev"][r[1:], j] = out["bx_s"][r[:-1], j]
+    return out
+
+def run_portfolio_backtest(symbols: list[str], start: str, end: str, max_positions: int = 10,
+                           init_cash: float = 100000.0, params: dict | None = None,
+                           data: dict | None = None, warmup: int = 252, workers: int | None = None):
+    """
+    Returns: stats(dict), trades_df, equity_df(Date, Equity, Cash, Positions)
+    `data` maps symbol -> daily OHLCV DataFrame and skips the download.
+    Symbols with fewer than 260 bars are left out (same rule as the single engine).
+    `workers` > 1 builds the per-symbol W/M flags in a process pool (at most
+    os.cpu_count() processes; none on a single core).
+    """
+    p = V296_PARAMS if params is None else {**V296_PARAMS, **params}
+    frames = {}
+    for sym in symbols:
+        df = data[sym].copy() if data is not None else _download_daily(sym, start=start, end=end)
+        if not df.empty and len(df) >= 260:
+            frames[sym] = df
+    workers = min(workers or 1, os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_symbol = dict(zip(frames, pool.map(_prepare_one, frames.values(), chunksize=8)))
+    else:
+        per_symbol = {sym: _prepare_one(df) for sym, df in frames.items()}
+    used = [s for s in symbols if s in per_symbol]
+    if not used:
+        return {}, pd.DataFrame(), pd.DataFrame()
+
+    index = per_symbol[used[0]][0]
+    for sym in used[1:]:
+        index = index.union(per_symbol[sym][0])
+    a = _align(frames, per_symbol, used, index, warmup)
+    T, S = len(index), len(used)
+
+    SLIP, FEE = p["slippage"], p["fee"]
+    cash = float(init_cash)
+    pos = np.zeros(S, dtype=np.int64)
+    last_close = np.zeros(S)
+    entry_p = np.full(S, np.nan)
+    entry_type = np.array([None] * S, dtype=object)
+    pending_buy = np.zeros(S, dtype=bool)
+    pending_type = np.array([None] * S, dtype=object)
+    pending_sell = np.zeros(S, dtype=bool)
+    plan_active = np.zeros(S, dtype=bool)
+    plan_age = np.zeros(S, dtype=np.int64)
+    cooldown = np.zeros(S, dtype=np.int64)
+    counts = {k: np.zeros(S, dtype=np.int64) for k in ("issued", "veto", "triggered", "ch_break", "ch_rev", "skipped")}
+
+    trades = []
+    eq_out = np.empty(T)
+    cash_out = np.empty(T)
+    npos_out = np.empty(T, dtype=np.int64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for t in range(T):
+            act = a["active"][t]
+            o, h, l, c, v = a["Open"][t], a["High"][t], a["Low"][t], a["Close"][t], a["Volume"][t]
+
+            # A) execute at next-day open: sells free cash before buys use it
+            sells = np.flatnonzero(pending_sell & (pos > 0) & act)
+            for j in sells:
+                p_sell = o[j] * (1 - SLIP)
+                cash += pos[j] * p_sell * (1 - FEE)
+                trades.append({"Date": index[t], "Symbol": used[j], "Type": "SELL", "EntryType": entry_type[j],
+                               "Price": p_sell, "Ret": (p_sell / entry_p[j]) - 1 if entry_p[j] else np.nan})
+                pos[j] = 0
+            pending_sell[sells] = False
+            cooldown[sells] = p["cooldown"]
+
+            buys = np.flatnonzero(pending_buy & (pos == 0) & act)
+            if len(buys):
+                equity_open = cash + float(pos @ last_close)
+                slots = max_positions - int((pos > 0).sum())
+                for j in buys:
+                    if slots <= 0:
+                        counts["skipped"][j] += 1
+                        continue
+                    p_buy = o[j] * (1 + SLIP)
+                    budget = min(cash, equity_open * p["max_pos"] / max_positions)
+                    n = int(budget / (p_buy * (1 + FEE)))
+                    if n <= 0:  # cannot afford one share: no trade, the plan is dropped
+                        counts["skipped"][j] += 1
+                        continue
+                    cash -= n * p_buy * (1 + FEE)
+                    pos[j] = n
+                    entry_p[j] = p_buy
+                    entry_type[j] = pending_type[j]
+                    counts["triggered"][j] += 1
+                    slots -= 1
+                    trades.append({"Date": index[t], "Symbol": used[j], "Type": "BUY", "EntryType": entry_type[j],
+                                   "Price": p_buy, "Ret": np.nan})
+                pending_buy[buys] = False
+
+            np.copyto(last_close, c, where=act)
+            eq_out[t] = cash + float(pos @ last_close)
+            cash_out[t] = cash
+            npos_out[t] = int((pos > 0).sum())
+            cooldown[act & (cooldown > 0)] -= 1
+
+            # B) decision at close, vectorized over symbols
+            pending_sell |= act & (pos > 0) & ~pending_sell & (c < a["Lower_ref"][t])
+
+            elig = act & (pos == 0) & ~pending_buy & (cooldown == 0)
+            if not elig.any():
+                continue
+            macro = a["w_bullish"][t] & a["m_bullish"][t]
+            upper = a["Upper_ref"][t]
+            ma50 = a["MA50"][t]
+
+            issue = elig & ~plan_active & (c > upper * p["plan_trigger"])
+            plan_active |= issue
+            plan_age[issue] = 0
+            counts["issued"] += issue
+
+            live = elig & plan_active
+            plan_age += live
+            close_pos = np.where(h != l, (c - l) / (h - l), 0.0)
+            vma = a["Vol_MA20"][t]
+            vol_ratio = np.where(vma > 0, v / vma, 0.0)
+            brk = live & (c > upper) & (close_pos > p["push_min"]) & (vol_ratio > p["vol_min"])
+            expire = live & ~brk & ((plan_age > p["plan_ttl"]) | (c < ma50))
+            go = brk & macro
+            pending_buy |= go
+            pending_type[go] = "BREAKOUT"
+            counts["ch_break"] += go
+            counts["veto"] += brk & ~macro
+            plan_active &= ~(brk | expire)
+
+            bx_now = a["bx_s"][t]
+            rev = elig & ~pending_buy & macro & (c > ma50) & (a["bx_prev"][t] <= 0) & (bx_now > 0)
+            pending_buy |= rev
+            pending_type[rev] = "REVERSAL"
+            counts["ch_rev"] += rev
+
+    equity_df = pd.DataFrame({"Date": index, "Equity": eq_out, "Cash": cash_out, "Positions": npos_out})
+    trades_df = pd.DataFrame(trades)
+
+    eq = equity_df["Equity"]
+    total_ret = eq.iloc[-1] / init_cash - 1
+    dd = (eq / eq.cummax() - 1).min()
+    stats = {
+        "Total Return": f"{total_ret:.2%}",
+        "Max Drawdown": f"{dd:.2%}",
+        "Macro Vetoes": int(counts["veto"].sum()),
+        "Signals Issued": int(counts["issued"].sum()),
+        "Signals Triggered": int(counts["triggered"].sum()),
+        "Breakout Trades": int(counts["ch_break"].sum()),
+        "Reversal Trades": int(counts["ch_rev"].sum()),
+        "Skipped (no slot / cash)": int(counts["skipped"].sum()),
+        "Symbols": len(used),
+        "Final Equity": f"${eq.iloc[-1]:,.0f}",
+    }
+    return stats, trades_df, equity_df
@@ -0,0 +1,208 @@
+# robustness.py
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from engine import V296_PARAMS
+
+# ----------------------------
+# Monte Carlo / bootstrap robustness of one backtest
+# Resamples the backtest's own returns into thousands of alternative paths in
+# batched NumPy (chunks of paths x bars, in log space), instead of re-running the engine:
+#   equity_bootstrap : daily equity returns, iid ("iid") or circular blocks ("block",
+#                      keeps volatility clustering / trade-length autocorrelation);
+#                      "block" reads each block's growth / highs / drawdown from
+#                      per-start tables instead of expanding every path step,
+#                      "iid" walks the steps once with running per-path state
+#   trade_bootstrap  : closed-trade returns, compounded at the engine's MAX_POS exposure
+# Each returns {metric: ndarray(n_paths)}; `summarize` turns that into percentiles.
+# ----------------------------
+PERCENTILES = (5, 25, 50, 75, 95)
+CHUNKS = {"iid": 10000, "block": 1000}  # default paths per batch (iid walks steps with one vector per path)
+
+def _metrics(high: np.ndarray, min_drawdown: np.ndarray, total: np.ndarray) -> dict:
+    """
+    `high`: (paths x steps + 2) new-high flags framed by True at the start and an end
+    sentinel, so the gaps between consecutive highs are the under-water runs (+1);
+    `min_drawdown` / `total`: lowest log drawdown and final log growth per path.
+    """
+    n = high.shape[1] - 2
+    n_high = high.sum(axis=1)
+    gaps = np.diff(np.flatnonzero(high))
+    first = np.concatenate(([0], np.cumsum(n_high)[:-1]))
+    return {
+        "total_return": np.expm1(total),
+        "max_drawdown": np.expm1(min_drawdown),
+        "max_underwater": np.maximum.reduceat(gaps, first) - 1,
+        "underwater_frac": 1 - (n_high - 2) / n,
+    }
+
+def _path_metrics(log_growth: np.ndarray) -> dict:
+    """Metrics of a (paths x steps) matrix of cumulative log growth (start = 0)."""
+    n_paths, n = log_growth.shape
+    peak = np.maximum.accumulate(log_growth, axis=1)
+    np.maximum(peak, 0.0, out=peak)
+    high = np.ones((n_paths, n + 2), dtype=bool)
+    np.greater_equal(log_growth, peak, out=high[:, 1:-1])
+    return _metrics(high, np.subtract(log_growth, peak, out=peak).min(axis=1), log_growth[:, -1])
+
+def _iid_metrics(log_ret: np.ndarray, draws, n_paths: int) -> dict:
+    """
+    Metrics of iid paths, walking the steps once with one vector per path: `draws`
+    yields (steps x paths) blocks of indices into `log_ret`. Same values as
+    _path_metrics on the expanded paths, without the (paths x steps) matrices.
+    """
+    level = np.zeros(n_paths)   # cumulative log growth
+    peak = np.zeros(n_paths)    # running max (from 0)
+    worst = np.zeros(n_paths)   # lowest level - peak
+    run = np.zeros(n_paths, dtype=np.int64)      # current under-water run
+    longest = np.zeros(n_paths, dtype=np.int64)
+    n_high = np.zeros(n_paths, dtype=np.int64)
+    step, gap = np.empty(n_paths), np.empty(n_paths)
+    high = np.empty(n_paths, dtype=bool)
+    n = 0
+    for block in draws:
+        for idx in block:
+            np.take(log_ret, idx, out=step)
+            np.add(level, step, out=level)
+            np.maximum(peak, level, out=peak)
+            np.subtract(level, peak, out=gap)
+            np.minimum(worst, gap, out=worst)
+            np.greater_equal(level, peak, out=high)
+            run += 1
+            run[high] = 0
+            np.maximum(longest, run, out=longest)
+            n_high += high
+        n += len(block)
+    return {
+        "total_return": np.expm1(level),
+        "max_drawdown": np.expm1(worst),
+        "max_underwater": longest,
+        "underwater_frac": 1 - n_high / n,
+    }
+
+def _iid_draws(rng, n: int, n_paths: int, steps: int = 256):
+    """Uniform indices into the n returns, drawn `steps` rows at a time."""
+    for lo in range(0, n, steps):
+        yield rng.integers(0, n, size=(min(steps, n - lo), n_paths))
+
+def _block_tables(log_ret: np.ndarray, n: int, block: int) -> dict:
+    """
+    Lookup tables per block start s (0 <= s < n), over the block's steps k:
+      growth[s, k] = log_ret[s:s + k + 1].sum()   (growth inside the block)
+      runmax / runmin : its running maximum / minimum
+      new_high        : growth == runmax (a high within the block)
+      gap_min[s, k]   : min over j >= k of growth - runmax, up to the block end
+                        (gap_min_last: up to the end of the last block, which is cut at n)
+    """
+    prefix = np.concatenate(([0.0], np.cumsum(log_ret)))
+    growth = sliding_window_view(prefix[1:], block)[:n] - prefix[:n, None]
+    runmax = np.maximum.accumulate(growth, axis=1)
+    below = growth - runmax
+    last = n - (-(-n // block) - 1) * block
+    return {
+        "growth": growth,
+        "runmax": runmax,
+        "runmin": np.minimum.accumulate(growth, axis=1),
+        "new_high": below == 0.0,
+        "gap_min": np.minimum.accumulate(below[:, ::-1], axis=1)[:, ::-1],
+        "gap_min_last": np.minimum.accumulate(below[:, last - 1::-1], axis=1)[:, ::-1],
+    }
+
+def _block_metrics(t: dict, starts: np.ndarray, n: int) -> dict:
+    """
+    Metrics of the paths made of the blocks at `starts` (paths x blocks) from table
+    lookups, without a cumsum / running max over every step. Relative to a block's
+    start, with `level` the path's earlier peak, step k is a new high iff
+    growth == runmax >= level, and its drawdown is growth - max(level, runmax):
+    so a block's worst point is runmin - level over the steps whose runmax is below
+    the level (a prefix, runmax only grows) and gap_min over the rest.
+    """
+    n_paths, n_blocks = starts.shape
+    block = t["growth"].shape[1]
+    end = np.full(n_blocks, block - 1)
+    end[-1] = n - 1 - (n_blocks - 1) * block  # the last block is cut at n
+    # path level before each block, and the peak before each block relative to that level
+    offset = np.zeros((n_paths, n_blocks))
+    np.cumsum(t["growth"][starts[:, :-1], end[:-1]], axis=1, out=offset[:, 1:])
+    top = t["runmax"][starts, end]
+    prior = np.zeros((n_paths, n_blocks))
+    np.maximum.accumulate(offset[:, :-1] + top[:, :-1], axis=1, out=prior[:, 1:])
+    np.maximum(prior, 0.0, out=prior)
+    level = prior - offset
+    worst = t["runmin"][starts, end] - level  # blocks that stay below the level
+
+    high = np.zeros((n_paths, n_blocks, block), dtype=bool)
+    p, b = np.nonzero(top >= level)  # blocks that may reach a new high
+    if len(p):
+        rows, lv, length = starts[p, b], level[p, b], end[b] + 1
+        below = np.take(t["runmax"], rows, axis=0) < lv[:, None]
+        k = np.minimum(below.sum(axis=1), length)  # steps below the level
+        high[p, b] = np.take(t["new_high"], rows, axis=0) & ~below
+        pre = np.where(k > 0, t["runmin"][rows, np.maximum(k - 1, 0)] - lv, np.inf)
+        cut = b == n_blocks - 1
+        gap = np.where(cut, t["gap_min_last"][rows, np.minimum(k, end[-1])], t["gap_min"][rows, np.minimum(k, block - 1)])
+        worst[p, b] = np.minimum(pre, np.where(k < length, gap, np.inf))
+    framed = np.ones((n_paths, n + 2), dtype=bool)
+    framed[:, 1:-1] = high.reshape(n_paths, -1)[:, :n]
+    return _metrics(framed, worst.min(axis=1), offset[:, -1] + t["growth"][starts[:, -1], end[-1]])
+
+def _bootstrap(returns: np.ndarray, n_paths: int, method: str, block: int, seed, chunk: int | None) -> dict:
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) == 0:
+        raise ValueError("No returns to resample")
+    if method not in ("iid", "block"):
+        raise ValueError(f"Unknown method: {method}")
+    n = len(returns)
+    block = max(1, min(block, n))
+    log_ret = np.log1p(returns)
+    log_ret = np.concatenate((log_ret, log_ret[:block]))  # circular blocks without a modulo
+    n_blocks = -(-n // block)
+    if method == "block":
+        tables = _block_tables(log_ret, n, block)
+    rng = np.random.default_rng(seed)
+    chunk = chunk or CHUNKS[method]
+    parts = []
+    for lo in range(0, n_paths, chunk):
+        size = min(chunk, n_paths - lo)
+        if method == "block":
+            starts = rng.integers(0, n, size=(size, n_blocks))
+            parts.append(_block_metrics(tables, starts, n))
+        else:
+            parts.append(_iid_metrics(log_ret, _iid_draws(rng, n, size), size))
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+def equity_bootstrap(equity_df: pd.DataFrame, n_paths: int = 10000, method: str = "block", block: int = 20,
+                     seed=None, chunk: int | None = None) -> dict:
+    """Resample the daily returns of `equity_df["Equity"]` into `n_paths` paths of the same length."""
+    returns = equity_df["Equity"].pct_change().to_numpy()[1:]
+    return _bootstrap(returns, n_paths, method, block, seed, chunk)
+
+def trade_bootstrap(trades_df: pd.DataFrame, n_paths: int = 10000, exposure: float | None = None,
+                    seed=None, chunk: int | None = None) -> dict:
+    """
+    Resample closed-trade returns (SELL rows of `trades_df`) with replacement.
+    Each trade moves equity by exposure * Ret (default: V296_PARAMS["max_pos"]);
+    `max_underwater` is then measured in trades, not bars.
+    """
+    exposure = V296_PARAMS["max_pos"] if exposure is None else exposure
+    rets = trades_df.loc[trades_df["Type"] == "SELL", "Ret"].to_numpy(dtype=np.float64)
+    return _bootstrap(exposure * rets, n_paths, "iid", 1, seed, chunk)
+
+def observed_metrics(equity_df: pd.DataFrame) -> dict:
+    """The same metrics for the actual backtest path."""
+    eq = equity_df["Equity"].to_numpy(dtype=np.float64)
+    return {k: v[0].item() for k, v in _path_metrics(np.log(eq[1:] / eq[0])[None, :]).items()}
+
+def summarize(dist: dict, observed: dict | None = None, percentiles=PERCENTILES) -> pd.DataFrame:
+    """Percentile table (metrics x percentiles), plus mean and the observed value if given."""
+    rows = {}
+    for k, v in dist.items():
+        row = {f"p{p}": float(x) for p, x in zip(percentiles, np.percentile(v, percentiles))}
+        row["mean"] = float(np.mean(v))
+        if observed is not None:
+            row["observed"] = observed[k]
+            row["pct_rank"] = float((v <= observed[k]).mean())
+        rows[k] = row
+    return pd.DataFrame.from_dict(rows, orient="index")
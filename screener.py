@@ -0,0 +1,86 @@
+# screener.py
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import (IndicatorGraph, _download_daily, _eod_bx_s_cross, _eod_decision, _eod_macro, _eod_refs, _eod_row,
+                    use_store)
+
+# ----------------------------
+# Universe EOD screener (V2.9.6 decision tree, cheap predicates first)
+# Rows carry the same fields as run_eod_analyzer minus the D/W/M pools.
+# "Macro" is "SKIP" when the tree decided before needing the weekly/monthly pools.
+# ----------------------------
+SCREEN_COLUMNS = ("symbol", "Date", "Action", "Reason", "Fuel", "Push", "Gap", "Stop", "Macro")
+
+def screen_symbol(symbol: str, period: str = "10y") -> dict:
+    """Run the V2.9.6 EOD decision tree for one symbol, resampling W/M only if the tree reaches the macro check."""
+    try:
+        d = _download_daily(symbol, period=period)
+        if d.empty or len(d) < 260:
+            return {"symbol": symbol, "Action": "ERROR", "Reason": f"not enough data ({len(d)} bars)"}
+
+        g = IndicatorGraph(d, symbol)
+        r = _eod_refs(g)
+        macro_state = {}
+
+        def macro():
+            _, _, w_bullish, m_bullish = _eod_macro(g)
+            macro_state["pass"] = w_bullish and m_bullish
+            return w_bullish, m_bullish
+
+        action, reason = _eod_decision(r, macro, lambda: _eod_bx_s_cross(g))
+        macro_flag = "SKIP" if not macro_state else ("PASS" if macro_state["pass"] else "FAIL")
+        return {"Date": str(d.index[-1].date()), **_eod_row(symbol, r, action, reason, macro_flag)}
+    except Exception as exc:
+        return {"symbol": symbol, "Action": "ERROR", "Reason": f"{type(exc).__name__}: {exc}"}
+
+def _screen_batch(symbols: list[str], period: str) -> list[dict]:
+    return [screen_symbol(s, period) for s in symbols]
+
+def iter_screen(symbols: list[str], workers: int | None = None, period: str = "10y", batch_size: int = 16,
+                store=None):
+    """
+    Yield one compact row per symbol, in input order, from a process pool.
+    `store` (a store.OHLCVStore) is installed in every worker via engine.use_store.
+    """
+    batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+    init = (use_store, (store,)) if store is not None else (None, ())
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init[0], initargs=init[1]) as pool:
+        for rows in pool.map(_screen_batch, batches, [period] * len(batches)):
+            yield from rows
+
+def read_symbols(path: str) -> list[str]:
+    """One symbol per line; blank lines and '#' comments are ignored."""
+    with open(path) as fh:
+        return [s for s in (line.split("#", 1)[0].strip() for line in fh) if s]
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="SmartStock V2.9.6 universe EOD screener")
+    ap.add_argument("symbols", help="file with one ticker per line")
+    ap.add_argument("-o", "--out", help="CSV output (default: stdout)")
+    ap.add_argument("-w", "--workers", type=int, default=None)
+    ap.add_argument("--period", default="10y")
+    ap.add_argument("--store", help="local OHLCV store directory (see store.py)")
+    ap.add_argument("--offline", metavar="DIR", help="read <DIR>/<symbol>.csv instead of yfinance")
+    args = ap.parse_args(argv)
+
+    from store import open_store
+    store = open_store(args.store, args.offline)
+
+    fh = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        writer = csv.DictWriter(fh, fieldnames=SCREEN_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for row in iter_screen(read_symbols(args.symbols), args.workers, args.period, store=store):
+            writer.writerow(row)
+            fh.flush()
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# store.py
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrument import count, stage
+
+# ----------------------------
+# Local columnar OHLCV store (one directory per symbol)
+#   dates.npy : int64 ns timestamps, ascending, unique
+#   ohlcv.npy : float64 (N, 5) Open/High/Low/Close/Volume
+#   meta.json : earliest start already requested from the source, last sync time
+# Both .npy files are opened with mmap_mode="r", so slicing a date range only
+# touches the pages it needs.
+# ----------------------------
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+def _to_ns(ts) -> int:
+    return int(pd.Timestamp(ts).as_unit("ns").value)
+
+def _period_start(period: str, now: pd.Timestamp | None = None) -> pd.Timestamp | None:
+    """Translate a yfinance-style period ("10y", "6mo", "30d", "ytd", "max") into a start date."""
+    now = (now or pd.Timestamp.today()).normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(now.year, 1, 1)
+    for suffix, unit in (("mo", "months"), ("y", "years"), ("d", "days"), ("wk", "weeks")):
+        if period.endswith(suffix):
+            return now - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Unsupported period: {period}")
+
+def yfinance_source(symbol: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+    """Default online source: the plain yfinance path of engine._download_daily."""
+    from engine import _fetch_yf
+    return _fetch_yf(symbol, start=start, end=end)
+
+class LocalFileSource:
+    """
+    Offline source reading `<root>/<symbol>.csv` (or `.parquet`) with a Date column
+    and OHLCV columns. Used for tests and network-less batch hosts.
+    """
+    def __init__(self, root: str):
+        self.root = root
+
+    def __call__(self, symbol: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        pq = os.path.join(self.root, f"{symbol}.parquet")
+        path = os.path.join(self.root, f"{symbol}.csv")
+        if os.path.exists(pq):
+            df = pd.read_parquet(pq)
+        elif os.path.exists(path):
+            df = pd.read_csv(path)
+        else:
+            return pd.DataFrame()
+        if "Date" in df.columns:
+            df = df.set_index("Date")
+        df.index = pd.to_datetime(df.index)
+        df = df.sort_index()
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index < pd.Timestamp(end)]
+        return df
+
+class OHLCVStore:
+    """
+    Per-symbol on-disk daily bars with incremental tail/head fill from `source`.
+    `source(symbol, start, end)` returns a daily OHLCV DataFrame (end exclusive,
+    like yf.download); defaults to yfinance, pass `source=None` to serve strictly
+    from disk or a `LocalFileSource` to run offline.
+    A symbol is re-checked against the source at most every `refresh_after` seconds.
+    """
+    def __init__(self, root: str, source=yfinance_source, refresh_after: float = 3600.0):
+        self.root = root
+        self.source = source
+        self.refresh_after = refresh_after
+        os.makedirs(root, exist_ok=True)
+
+    # ---- raw file access
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.replace("/", "_"))
+
+    def _load(self, symbol: str):
+        d = self._dir(symbol)
+        if not os.path.exists(os.path.join(d, "dates.npy")):
+            return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+        dates = np.load(os.path.join(d, "dates.npy"), mmap_mode="r")
+        values = np.load(os.path.join(d, "ohlcv.npy"), mmap_mode="r")
+        return dates, values
+
+    def _meta(self, symbol: str) -> dict:
+        path = os.path.join(self._dir(symbol), "meta.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as fh:
+            return json.load(fh)
+
+    def _write(self, symbol: str, dates: np.ndarray, values: np.ndarray, meta: dict) -> None:
+        d = self._dir(symbol)
+        os.makedirs(d, exist_ok=True)
+        # write-then-rename so concurrent readers never see a half-written file
+        for name, arr in (("dates.npy", dates), ("ohlcv.npy", values)):
+            tmp = os.path.join(d, f".{name}.tmp")
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.ascontiguousarray(arr))
+            os.replace(tmp, os.path.join(d, name))
+        tmp = os.path.join(d, ".meta.json.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, os.path.join(d, "meta.json"))
+
+    # ---- public API
+    def symbols(self) -> list[str]:
+        return sorted(s for s in os.listdir(self.root) if os.path.exists(os.path.join(self.root, s, "dates.npy")))
+
+    def last_date(self, symbol: str) -> pd.Timestamp | None:
+        dates, _ = self._load(symbol)
+        return pd.Timestamp(int(dates[-1])) if len(dates) else None
+
+    def read(self, symbol: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        """Slice stored bars to [start, end) without touching the source."""
+        dates, values = self._load(symbol)
+        lo = np.searchsorted(dates, _to_ns(start), "left") if start is not None else 0
+        hi = np.searchsorted(dates, _to_ns(end), "left") if end is not None else len(dates)
+        if hi <= lo:
+            return pd.DataFrame()
+        index = pd.DatetimeIndex(np.asarray(dates[lo:hi]).view("datetime64[ns]"), name="Date")
+        return pd.DataFrame(np.array(values[lo:hi]), index=index, columns=OHLCV_COLUMNS)
+
+    def append(self, symbol: str, df: pd.DataFrame, requested_start=None) -> int:
+        """
+        Merge `df` into the stored bars; rows on an already stored date replace it
+        (providers revise the latest bar). Returns the number of stored rows after the merge.
+        Nothing is written while the symbol has no bars (an empty pull is not stored).
+        """
+        dates, values = self._load(symbol)
+        if df is not None and not df.empty:
+            df = df[OHLCV_COLUMNS].dropna(how="any")
+        if not len(dates) and (df is None or df.empty):
+            return 0
+        meta = self._meta(symbol)
+        if df is not None and not df.empty:
+            new_dates = df.index.as_unit("ns").asi8.astype(np.int64)
+            new_values = df.to_numpy(dtype=np.float64)
+            keep = ~np.isin(dates, new_dates)
+            dates = np.concatenate([np.asarray(dates)[keep], new_dates])
+            values = np.concatenate([np.asarray(values)[keep], new_values])
+            order = np.argsort(dates, kind="stable")
+            dates, values = dates[order], values[order]
+        if requested_start is not None:
+            prev = meta.get("start")
+            req = _to_ns(requested_start)
+            meta["start"] = req if prev is None else min(prev, req)
+        elif "start" not in meta and len(dates):
+            meta["start"] = int(dates[0])
+        meta["synced"] = time.time()
+        self._write(symbol, dates, values, meta)
+        return len(dates)
+
+    def sync(self, symbol: str, start: str | None = None, end: str | None = None) -> None:
+        """Fetch only what is missing for [start, end): the head before the stored range and the tail after it."""
+        if self.source is None:
+            count("store.hit")
+            return
+        dates, _ = self._load(symbol)
+        meta = self._meta(symbol)
+        stale = time.time() - meta.get("synced", 0.0) >= self.refresh_after
+        if not len(dates):
+            if stale:
+                count("store.fetch")
+                self.append(symbol, self.source(symbol, start=start, end=end), requested_start=start or 0)
+            return
+
+        head_start = meta.get("start", int(dates[0]))
+        if start is not None and _to_ns(start) < head_start:
+            first = str(pd.Timestamp(head_start).date())
+            count("store.fetch")
+            self.append(symbol, self.source(symbol, start=start, end=first), requested_start=start)
+
+        last = int(dates[-1])
+        wants_tail = end is None or _to_ns(end) > last + 86_400_000_000_000
+        if wants_tail and stale:
+            # re-read the last stored bar too, in case it was a partial session
+            count("store.fetch")
+            self.append(symbol, self.source(symbol, start=str(pd.Timestamp(last).date()), end=end))
+        else:
+            count("store.hit")
+
+    def get(self, symbol: str, start: str | None = None, end: str | None = None, period: str | None = None) -> pd.DataFrame:
+        """Sync the missing pieces from the source, then serve [start, end) from disk."""
+        if period:
+            p_start = _period_start(period)
+            start = None if p_start is None else str(p_start.date())
+            end = None
+        with stage("store.sync"):
+            self.sync(symbol, start, end)
+        with stage("store.read"):
+            return self.read(symbol, start, end)
+
+def open_store(root: str | None = None, offline: str | None = None) -> OHLCVStore | None:
+    """
+    The store behind the batch CLIs' --store / --offline flags: `offline` reads
+    <offline>/<symbol>.csv instead of yfinance (cached under <offline>/.store unless
+    `root` is given). None when neither is set, i.e. the direct download path.
+    """
+    if not (root or offline):
+        return None
+    source = LocalFileSource(offline) if offline else yfinance_source
+    return OHLCVStore(root or os.path.join(offline, ".store"), source=source)
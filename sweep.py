@@ -0,0 +1,113 @@
+# sweep.py
+import csv
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+import pandas as pd
+
+from engine import V296_PARAMS, _download_daily, _prepare_true_sync, _true_sync_kernel
+
+# ----------------------------
+# Parameter sweep over the V2.9.6 strategy constants
+# Indicators are built once per symbol; only the state machine is re-run per combo.
+# ----------------------------
+SWEEP_COLUMNS = (
+    "symbol", *V296_PARAMS.keys(),
+    "total_return", "max_drawdown", "final_equity", "trades",
+    "issued", "veto", "triggered", "ch_break", "ch_rev",
+)
+
+def param_grid(grid: dict) -> list[dict]:
+    """Expand {"plan_ttl": [10, 15], "cooldown": [5, 10], ...} into full V296_PARAMS dicts."""
+    unknown = set(grid) - set(V296_PARAMS)
+    if unknown:
+        raise KeyError(f"Unknown V2.9.6 params: {sorted(unknown)}")
+    keys = list(grid)
+    combos = itertools.product(*(grid[k] for k in keys))
+    return [{**V296_PARAMS, **dict(zip(keys, values))} for values in combos]
+
+def _sweep_row(symbol: str, params: dict, init_cash: float, stats: dict, trades: list, equity_curve: list) -> dict:
+    eq = np.asarray(equity_curve, dtype=np.float64)
+    if len(eq):
+        total_ret = eq[-1] / init_cash - 1
+        max_dd = np.fmin.reduce(eq / np.fmax.accumulate(eq) - 1)  # NaN-tolerant, like the engine's stats
+        final_eq = eq[-1]
+    else:
+        total_ret, max_dd, final_eq = 0.0, 0.0, init_cash
+    return {
+        "symbol": symbol,
+        **params,
+        "total_return": float(total_ret),
+        "max_drawdown": float(max_dd),
+        "final_equity": float(final_eq),
+        "trades": len(trades),
+        **stats,
+    }
+
+def _run_chunk(symbol: str, arrays: dict, index: pd.Index, chunk: list[dict], init_cash: float) -> list[dict]:
+    """Worker entry point: one symbol's arrays, many param combos."""
+    rows = []
+    for params in chunk:
+        stats, trades, equity_curve = _true_sync_kernel(arrays, index, init_cash, params=params)
+        rows.append(_sweep_row(symbol, params, init_cash, stats, trades, equity_curve))
+    return rows
+
+def iter_param_sweep(symbols: list[str], grid: dict | list[dict], start: str, end: str,
+                     workers: int | None = None, chunk_size: int = 64, init_cash: float = 100000.0):
+    """
+    Yield one stats row (dict) per (symbol, params) as soon as its chunk finishes.
+    `grid` is either a grid dict for `param_grid` or an explicit list of param dicts.
+    Symbols with too little data are skipped.
+    Symbols are downloaded and prepared one at a time while the workers run the
+    previous ones; at most two chunks per worker are in flight, so rows stream
+    from the first symbol on and only those chunks' arrays are held.
+    """
+    combos = param_grid(grid) if isinstance(grid, dict) else [{**V296_PARAMS, **p} for p in grid]
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    max_workers = workers or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for symbol in symbols:
+            df = _download_daily(symbol, start=start, end=end)
+            if df.empty or len(df) < 260:
+                continue
+            arrays = _prepare_true_sync(df)
+            for chunk in chunks:
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        yield from fut.result()
+                pending.add(pool.submit(_run_chunk, symbol, arrays, df.index, chunk, init_cash))
+            del df, arrays
+        for fut in as_completed(pending):
+            yield from fut.result()
+
+def run_param_sweep(symbols: list[str], grid: dict | list[dict], start: str, end: str,
+                    workers: int | None = None, chunk_size: int = 64, init_cash: float = 100000.0,
+                    out_csv: str | None = None) -> pd.DataFrame:
+    """
+    Run the sweep and return the results table (one row per symbol x params).
+    With `out_csv`, rows are also appended to disk as they arrive, so an overnight
+    run keeps its partial results if interrupted.
+    """
+    rows = []
+    fh = writer = None
+    try:
+        if out_csv:
+            new_file = not os.path.exists(out_csv) or os.path.getsize(out_csv) == 0
+            fh = open(out_csv, "a", newline="")
+            writer = csv.DictWriter(fh, fieldnames=SWEEP_COLUMNS)
+            if new_file:
+                writer.writeheader()
+        for row in iter_param_sweep(symbols, grid, start, end, workers, chunk_size, init_cash):
+            rows.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                fh.flush()
+    finally:
+        if fh is not None:
+            fh.close()
+    return pd.DataFrame(rows, columns=list(SWEEP_COLUMNS))
@@ -0,0 +1,169 @@
+# tests/test_audit.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import audit
+import engine
+from audit import TraceBuffer
+from engine import run_eod_analyzer, run_smartstock_v296_engine
+from synthetic import make_ohlcv
+
+# ----------------------------
+# TraceBuffer ring / query / decode / persistence
+# ----------------------------
+def _rows(n: int, kind: int = audit.WAIT, day0: str = "2020-01-01") -> list:
+    dates = pd.date_range(day0, periods=n, freq="D").to_numpy()
+    return [(d, kind, 0, i, True, False, float(i), np.nan, np.nan, np.nan, np.nan, np.nan, np.nan)
+            for i, d in enumerate(dates)]
+
+def test_ring_wraps_at_capacity():
+    buf = TraceBuffer(capacity=5)
+    buf.extend("A", _rows(3))
+    buf.extend("B", _rows(4, day0="2021-01-01"))
+    assert (buf.n, len(buf), buf.dropped) == (7, 5, 2)
+    ev = buf.view()
+    assert ev["symbol"].tolist() == [0, 1, 1, 1, 1]   # oldest first
+    assert ev["close"].tolist() == [2.0, 0.0, 1.0, 2.0, 3.0]
+    buf.extend("C", _rows(12))  # one block larger than the ring keeps its newest rows
+    assert buf.dropped == 14 and buf.view()["close"].tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert (buf.view()["symbol"] == 2).all()
+    buf.clear()
+    assert len(buf) == 0 and buf.dropped == 0 and len(buf.view()) == 0
+
+def test_query_filters():
+    buf = TraceBuffer()
+    buf.extend("A", _rows(10, audit.VETO))
+    buf.extend("B", _rows(10, audit.WAIT))
+    assert len(buf.query(kind="veto")) == 10 and (buf.query(kind="veto")["symbol"] == 0).all()
+    assert len(buf.query(symbol="B")) == 10 and len(buf.query(symbol="ZZZ")) == 0
+    got = buf.query(symbol="A", start="2020-01-03", end="2020-01-05")
+    assert got["close"].tolist() == [2.0, 3.0, 4.0]
+    assert len(buf.query(kind="breakout")) == 0
+    with pytest.raises(ValueError):
+        buf.query(kind="nope")
+
+def test_to_frame_decodes_and_keeps_dtypes():
+    buf = TraceBuffer()
+    buf.extend("A", _rows(2, audit.BREAKOUT))
+    df = buf.to_frame()
+    assert list(df.columns) == list(audit.EVENT_DTYPE.names)
+    assert df["symbol"].tolist() == ["A", "A"] and df["kind"].tolist() == ["breakout", "breakout"]
+    assert df["entry"].tolist() == ["", ""]
+    assert df["date"].dtype == "datetime64[ns]" and df["plan_age"].dtype == np.int16
+    assert df["w_bullish"].dtype == bool and df["close"].dtype == np.float64
+    assert TraceBuffer().to_frame().empty
+
+def test_save_load_round_trip(tmp_path):
+    buf = TraceBuffer(capacity=4)
+    buf.extend("A", _rows(3, audit.VETO))
+    buf.extend("B", _rows(3, audit.REVERSAL))
+    buf.save(str(tmp_path / "t.npz"))
+    back = TraceBuffer.load(str(tmp_path / "t.npz"))
+    assert back.view().tobytes() == buf.view().tobytes()
+    pd.testing.assert_frame_equal(back.to_frame(), buf.to_frame())
+    assert back.query(symbol="B")["kind"].tolist() == [audit.REVERSAL] * 3
+    small = TraceBuffer.load(str(tmp_path / "t.npz"), capacity=2)  # keeps the newest
+    assert small.view().tobytes() == buf.view()[-2:].tobytes()
+    buf.save(str(tmp_path / "t.csv"))
+    buf.save(str(tmp_path / "t.jsonl"))
+    assert pd.read_csv(tmp_path / "t.csv")["kind"].tolist() == buf.to_frame()["kind"].tolist()
+    assert len(pd.read_json(tmp_path / "t.jsonl", lines=True)) == 4
+
+# ----------------------------
+# Events of the True-Sync kernel on a hand-built history
+# ----------------------------
+def _scripted() -> tuple[dict, pd.DatetimeIndex]:
+    """
+    46 bars against fixed refs (Upper 10, Lower 8, MA50 5, Vol_MA20 100), resting at 9:
+    plan + breakout, buy, sell; after the cooldown a vetoed breakout, a reversal buy,
+    sell; then a plan cancelled under MA50 and one that runs past its 15-bar TTL.
+    """
+    n = 46
+    bar = {c: np.full(n, 9.0) for c in ("Open", "High", "Low", "Close")}
+    vol = np.full(n, 100.0)
+    bx = np.full(n, -1.0)
+    w = np.ones(n, dtype=bool)
+
+    def at(i, c, h=None, l=None, v=100.0):
+        bar["Close"][i], bar["High"][i], bar["Low"][i], vol[i] = c, h if h else c, l if l else c, v
+        if h is None:
+            bar["Open"][i] = c
+
+    at(1, 9.8, 10.0, 9.0)            # plan issued (> 9.7), aged 1
+    at(2, 10.5, 10.6, 9.0, 200.0)    # breakout: push 0.94, volume 2x
+    at(4, 7.5)                       # under Lower_ref: sell signal
+    at(14, 9.8, 10.0, 9.0)           # cooldown over: plan issued ...
+    w[14:16] = False
+    at(15, 10.5, 10.6, 9.0, 200.0)   # ... and vetoed (weekly bearish)
+    bx[16] = 1.0                     # bx_s crosses zero above MA50: reversal
+    at(18, 7.5)
+    at(28, 9.8, 10.0, 9.0)
+    at(29, 4.0)                      # under MA50: plan cancelled
+    for i in range(30, 46):
+        at(i, 9.75)                  # plan issued at 30, ages 1..15, expires at 45
+    arrays = {**bar, "Volume": vol, "Upper_ref": np.full(n, 10.0), "Lower_ref": np.full(n, 8.0),
+              "MA50": np.full(n, 5.0), "Vol_MA20": np.full(n, 100.0), "bx_s": bx,
+              "w_bullish": w, "m_bullish": np.ones(n, dtype=bool)}
+    return arrays, pd.bdate_range("2020-01-01", periods=n)
+
+def test_kernel_events_on_scripted_history():
+    arrays, index = _scripted()
+    rows = []
+    stats, trades, _ = engine._true_sync_kernel(arrays, index, start=1, trace=rows)
+    buf = TraceBuffer()
+    buf.extend("X", rows)
+    ev = buf.view()
+    got = [(int(np.searchsorted(index.to_numpy(), d)), audit.KINDS[k]) for d, k in zip(ev["date"], ev["kind"])]
+    want = [(1, "plan_issued"), (1, "plan_aged"), (2, "breakout"), (3, "fill_buy"), (4, "sell_signal"),
+            (5, "fill_sell"), (14, "plan_issued"), (14, "plan_aged"), (15, "veto"), (16, "reversal"),
+            (17, "fill_buy"), (18, "sell_signal"), (19, "fill_sell"), (28, "plan_issued"), (28, "plan_aged"),
+            (29, "plan_cancelled"), (30, "plan_issued")]
+    want += [(i, "plan_aged") for i in range(30, 45)] + [(45, "plan_expired")]
+    assert got == want
+    assert stats == {"issued": 4, "veto": 1, "triggered": 2, "ch_break": 1, "ch_rev": 1}
+    assert [t["EntryType"] for t in trades] == ["BREAKOUT", "BREAKOUT", "REVERSAL", "REVERSAL"]
+
+    df = buf.to_frame()
+    brk = df[df["kind"] == "breakout"].iloc[0]
+    assert (brk["entry"], brk["plan_age"], brk["ref"], brk["vol_ratio"]) == ("BREAKOUT", 2, 10.0, 2.0)
+    assert brk["push"] == pytest.approx(1.5 / 1.6)
+    veto = df[df["kind"] == "veto"].iloc[0]
+    assert not veto["w_bullish"] and veto["m_bullish"]
+    fills = df[df["kind"].isin(["fill_buy", "fill_sell"])]
+    assert fills["price"].tolist() == [t["Price"] for t in trades]
+    assert fills["entry"].tolist() == ["BREAKOUT", "BREAKOUT", "REVERSAL", "REVERSAL"]
+    assert df.loc[df["kind"] == "fill_sell", "ret"].tolist() == [trades[1]["Ret"], trades[3]["Ret"]]
+    assert df[df["kind"] == "plan_expired"]["plan_age"].tolist() == [16]
+    assert df[df["kind"] == "reversal"]["bx_s"].tolist() == [1.0]
+
+# ----------------------------
+# Tracing must not change results
+# ----------------------------
+FRAMES = {"a": make_ohlcv(1500, seed=1), "b": make_ohlcv(1500, seed=7, halt_prob=0.01, halt_len=8)}
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_trace_leaves_backtest_bit_identical(name):
+    df = FRAMES[name]
+    want = run_smartstock_v296_engine(name, None, None, data=df)
+    buf = TraceBuffer()
+    got = run_smartstock_v296_engine(name, None, None, data=df, trace=buf)
+    assert got[0] == want[0]
+    pd.testing.assert_frame_equal(got[1], want[1], check_exact=True)
+    pd.testing.assert_frame_equal(got[2], want[2], check_exact=True)
+    # the buffer agrees with the run's counters
+    kinds = buf.to_frame()["kind"].value_counts()
+    assert kinds.get("plan_issued", 0) == want[0]["Signals Issued"]
+    assert kinds.get("veto", 0) == want[0]["Macro Vetoes"]
+    assert kinds.get("fill_buy", 0) == want[0]["Signals Triggered"] == (want[1]["Type"] == "BUY").sum()
+    assert kinds.get("fill_sell", 0) == (want[1]["Type"] == "SELL").sum()
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_trace_leaves_eod_identical(name):
+    def scalars(res):
+        return {k: v for k, v in res.items() if not isinstance(v, pd.DataFrame)}
+    want = run_eod_analyzer(name, data=FRAMES[name])
+    buf = TraceBuffer()
+    assert scalars(run_eod_analyzer(name, data=FRAMES[name], trace=buf)) == scalars(want)
+    ev = buf.to_frame()
+    assert len(ev) == 1 and ev["date"].iloc[0] == FRAMES[name].index[-1] and ev["symbol"].iloc[0] == name
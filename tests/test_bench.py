@@ -0,0 +1,28 @@
+# tests/test_bench.py
+import bench
+
+def test_charts_case_is_capped():
+    recs = list(bench.run_benchmarks(["draw_v296_charts"], bars=[1000], symbols=[1000], repeat=1))
+    assert [(r["status"], r["reason"]) for r in recs] == [("skipped", "max_symbols")]
+
+def test_records_and_compare(tmp_path):
+    recs = list(bench.run_benchmarks(["get_rsi_ema", "calendar_map.resample"], bars=[300], symbols=[2], repeat=1))
+    assert [r["status"] for r in recs] == ["ok", "ok"]
+    path = tmp_path / "a.jsonl"
+    path.write_text("".join(bench.json.dumps(r) + "\n" for r in recs))
+    assert bench.compare(str(path), str(path)) == []
+
+def test_bootstrap_case_is_capped():
+    recs = list(bench.run_benchmarks(["robustness.equity_bootstrap"], bars=[1000], symbols=[100], repeat=1))
+    assert [(r["status"], r["reason"]) for r in recs] == [("skipped", "max_symbols")]
+
+def test_legacy_prep_beats_the_pandas_baseline():
+    # the default backtest sync: W*/M* pools come from the cached calendar periods
+    recs = {r["case"]: r for r in bench.run_benchmarks(["_prepare_true_sync.legacy", "_prepare_true_sync.pandas"],
+                                                       bars=[5000], symbols=[3], repeat=3)}
+    assert recs["_prepare_true_sync.legacy"]["best_s"] < 0.75 * recs["_prepare_true_sync.pandas"]["best_s"]
+
+def test_iid_bootstrap_under_a_second():
+    # 10k paths x 20 years of daily bars (trade_bootstrap always takes the iid path)
+    recs = list(bench.run_benchmarks(["robustness.equity_bootstrap.iid"], bars=[5040], symbols=[1], repeat=2))
+    assert recs[0]["status"] == "ok" and recs[0]["best_s"] < 1.0
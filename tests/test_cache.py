@@ -0,0 +1,49 @@
+# tests/test_cache.py
+import pytest
+
+import cache
+import engine
+from synthetic import SyntheticStore
+
+@pytest.fixture
+def store():
+    def use(n_bars: int):
+        engine.use_store(SyntheticStore(n_bars))
+    cache.clear()
+    yield use
+    engine.use_store(None)
+    cache.clear()
+
+def test_none_eod_result_is_not_cached(store):
+    store(100)  # too short for the EOD audit
+    assert cache.cached_eod_analyzer("A") is None
+    assert len(cache._RESULTS) == 0
+    assert cache.cached_eod_analyzer("A") is None
+    assert cache._RESULTS.stats()["misses"] == 2
+
+def test_eod_result_is_cached(store):
+    store(1500)
+    res = cache.cached_eod_analyzer("A")
+    assert res is not None
+    assert cache.cached_eod_analyzer("A") is res
+
+def test_empty_backtest_is_not_cached(store):
+    store(200)  # too short for the backtest
+    stats, _, _ = cache.cached_backtest("A", None, None)
+    assert stats == {} and len(cache._RESULTS) == 0
+
+def test_backtest_result_is_cached(store):
+    store(1500)
+    out = cache.cached_backtest("A", None, None)
+    assert out[0] and cache.cached_backtest("A", None, None) is out
+
+def test_configure_reaches_every_layer():
+    layers = (cache._DATA, cache._RESULTS, cache._GRAPHS, cache._CHECKPOINTS)
+    saved = [(c.maxsize, c.ttl) for c in layers]
+    try:
+        cache.configure(data_maxsize=1, result_ttl=5.0, graph_maxsize=2, graph_ttl=6.0,
+                        checkpoint_maxsize=3, checkpoint_ttl=7.0)
+        assert [(c.maxsize, c.ttl) for c in layers] == [(1, saved[0][1]), (saved[1][0], 5.0), (2, 6.0), (3, 7.0)]
+    finally:
+        for c, (maxsize, ttl) in zip(layers, saved):
+            c.maxsize, c.ttl = maxsize, ttl
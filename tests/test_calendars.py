@@ -0,0 +1,117 @@
+# tests/test_calendars.py
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calendars import CalendarMap, _fast_ok, calendar_map
+from engine import _resample_ohlcv
+from synthetic import make_ohlcv
+
+# ----------------------------
+# CalendarMap.resample / ffill against resample() + reindex(method="ffill")
+# ----------------------------
+RULES = {"W": "W", "M": "ME"}
+
+def _weekend_bars() -> pd.DataFrame:
+    df = make_ohlcv(600, seed=3)
+    days = df.index.to_numpy().copy()
+    wd = df.index.dayofweek.to_numpy()
+    days[(wd == 4) & (np.arange(len(df)) % 2 == 0)] += np.timedelta64(1, "D")   # some Fridays -> Saturday
+    days[(wd == 0) & (np.arange(len(df)) % 3 == 0)] -= np.timedelta64(1, "D")   # some Mondays -> Sunday
+    return df.set_axis(pd.DatetimeIndex(days, name="Date"), axis=0)
+
+def _csv_round_trip(df: pd.DataFrame) -> pd.DataFrame:
+    buf = io.StringIO()
+    df.to_csv(buf)
+    buf.seek(0)
+    return pd.read_csv(buf, index_col="Date", parse_dates=True)
+
+def _frames() -> dict:
+    base = make_ohlcv(900, seed=1)
+    nan_bars = base.copy()
+    nan_bars.iloc[[10, 11, 300], [0, 3]] = np.nan
+    int_prices = base.round().astype(np.int64)
+    kahan = base.copy()
+    kahan["Volume"] = np.where(np.arange(len(base)) % 3 == 0, 1e16, 1.0)
+    return {
+        "plain": base,
+        "empty_weeks": make_ohlcv(900, seed=2, halt_prob=0.02, halt_len=12),
+        "empty_months": make_ohlcv(900, seed=4, halt_prob=0.004, halt_len=50),
+        "weekend_bars": _weekend_bars(),
+        "int_volume": base.assign(Volume=base["Volume"].astype(np.int64)),
+        "kahan_volume": kahan,
+        "ns_unit": base.set_axis(base.index.as_unit("ns"), axis=0),
+        "s_unit": base.set_axis(base.index.as_unit("s"), axis=0),
+        "csv_round_trip": _csv_round_trip(base),
+        "pickle_round_trip": pd.read_pickle(io.BytesIO(_pickled(base))),
+        # fallbacks to the pandas path
+        "nan_bars": nan_bars,
+        "tz_aware": base.tz_localize("Asia/Singapore"),
+        "int_prices": int_prices,
+    }
+
+def _pickled(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_pickle(buf)
+    return buf.getvalue()
+
+FRAMES = _frames()
+FALLBACK = {"nan_bars", "tz_aware", "int_prices"}
+
+def test_fast_path_selection():
+    for name, df in FRAMES.items():
+        assert _fast_ok(df) == (name not in FALLBACK), name
+
+@pytest.mark.parametrize("tf", ["W", "M"])
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_resample_matches_pandas(name, tf):
+    df = FRAMES[name]
+    got = CalendarMap(df.index).resample(df, tf)
+    want = _resample_ohlcv(df, RULES[tf])
+    pd.testing.assert_frame_equal(got, want, check_freq=False)
+
+@pytest.mark.parametrize("tf", ["W", "M"])
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_ffill_matches_reindex(name, tf):
+    df = FRAMES[name]
+    cal = CalendarMap(df.index)
+    pool = _resample_ohlcv(df, RULES[tf])
+    flags = (pool["Close"] > pool["Close"].rolling(3).mean()).to_numpy()
+    want = pd.Series(flags, index=pool.index).reindex(df.index, method="ffill")
+    got = cal.ffill(tf, pool.index, flags, fill=True)
+    np.testing.assert_array_equal(got, want.fillna(True).astype(bool).to_numpy())
+    closes = cal.ffill(tf, pool.index, pool["Close"].to_numpy())
+    np.testing.assert_array_equal(closes, pool["Close"].reindex(df.index, method="ffill").to_numpy())
+
+@pytest.mark.parametrize("tf", ["W", "M"])
+def test_ffill_onto_foreign_labels(tf):
+    # the legacy backtest pools label every calendar period, empty ones included
+    df = FRAMES["empty_weeks"]
+    sparse = df["Close"].resample(RULES[tf]).last()
+    flags = (sparse > sparse.rolling(4).mean()).to_numpy()
+    got = calendar_map(df.index).ffill(tf, sparse.index, flags, fill=True)
+    want = pd.Series(flags, index=sparse.index).reindex(df.index, method="ffill")
+    np.testing.assert_array_equal(got, want.fillna(True).astype(bool).to_numpy())
+
+@pytest.mark.parametrize("tf", ["W", "M"])
+@pytest.mark.parametrize("name", sorted(set(FRAMES) - FALLBACK))
+def test_scatter_matches_date_range_reindex(name, tf):
+    df = FRAMES[name]
+    cal = CalendarMap(df.index)
+    pool = cal.resample(df, tf)
+    full = pd.date_range(pool.index[0], pool.index[-1], freq=RULES[tf], name=pool.index.name, unit=pool.index.unit)
+    pd.testing.assert_frame_equal(cal.scatter(pool, tf), pool.reindex(full), check_freq=False)
+    labels, _ = cal.periods(tf)
+    assert cal.periods(tf)[0] is labels  # built once per calendar
+    flags = np.arange(len(labels)) % 3 == 0
+    want = pd.Series(flags, index=full).reindex(df.index, method="ffill").fillna(True).astype(bool)
+    np.testing.assert_array_equal(cal.ffill(tf, labels, flags, fill=True), want.to_numpy())
+
+def test_maps_are_shared_per_calendar():
+    df = FRAMES["plain"]
+    assert calendar_map(df.index) is calendar_map(df.index.copy())
+    assert calendar_map(df.index) is not calendar_map(df.index[:-1])
+    units = {calendar_map(FRAMES[n].index).index.unit for n in ("plain", "ns_unit", "s_unit")}
+    assert len(units) == 3  # labels keep the index's own unit
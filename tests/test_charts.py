@@ -0,0 +1,32 @@
+# tests/test_charts.py
+import pytest
+
+pytest.importorskip("mplfinance")
+
+import cache
+import charts
+from engine import run_eod_analyzer
+from synthetic import make_ohlcv
+
+@pytest.fixture
+def eod():
+    cache.clear()
+    charts._PNG_CACHE.clear()
+    yield lambda d: run_eod_analyzer("SYN", data=d)
+    cache.clear()
+    charts._PNG_CACHE.clear()
+
+def test_png_cache_hits_on_same_bars(eod):
+    df = make_ohlcv(1500, seed=3)
+    png = charts.render_v296_png(eod(df), "SYN", dpi=20)
+    assert png.startswith(b"\x89PNG")
+    assert charts.render_v296_png(eod(df.copy()), "SYN", dpi=20) is png
+
+def test_png_cache_misses_on_revised_history(eod):
+    df = make_ohlcv(1500, seed=3)
+    png = charts.render_v296_png(eod(df), "SYN", dpi=20)
+    misses = charts._PNG_CACHE.stats()["misses"]
+    revised = df.copy()
+    revised.iloc[:1000, :4] *= 0.5  # e.g. a split adjustment: last bar unchanged
+    assert charts.render_v296_png(eod(revised), "SYN", dpi=20) is not png
+    assert charts._PNG_CACHE.stats()["misses"] == misses + 1
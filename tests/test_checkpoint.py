@@ -0,0 +1,85 @@
+# tests/test_checkpoint.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import data_fingerprint, run_smartstock_v296_engine
+from incremental import TrueSyncRefs
+from instrument import recording
+from synthetic import make_ohlcv
+
+FRAMES = {
+    "plain": dict(halt_prob=0.0),
+    "flat_runs": dict(flat_prob=0.25),
+    "empty_weeks": dict(halt_prob=0.01, halt_len=10),
+    "empty_months": dict(halt_prob=0.003, halt_len=50),
+}
+
+def _replay(d: pd.DataFrame, sync: str) -> TrueSyncRefs:
+    refs = TrueSyncRefs(sync)
+    cols = [d[c].to_numpy(dtype=np.float64).tolist() for c in ("Open", "High", "Low", "Close", "Volume")]
+    for ts, *bar in zip(d.index, *cols):
+        refs.update(ts, *bar)
+    return refs
+
+def _assert_state_equal(got, want, path="refs"):
+    if isinstance(want, dict):
+        assert got.keys() == want.keys(), path
+        for k in want:
+            _assert_state_equal(got[k], want[k], f"{path}.{k}")
+    elif isinstance(want, list):
+        assert len(got) == len(want), path
+        for i, (g, w) in enumerate(zip(got, want)):
+            _assert_state_equal(g, w, f"{path}[{i}]")
+    elif isinstance(want, float) and want != want:
+        assert got != got, path
+    else:
+        assert type(got) is type(want) and got == want, (path, got, want)
+
+def _assert_same(got, want):
+    assert got[0] == want[0]
+    pd.testing.assert_frame_equal(got[1], want[1])
+    pd.testing.assert_frame_equal(got[2], want[2])
+
+@pytest.mark.parametrize("sync", ["legacy", "dense"])
+@pytest.mark.parametrize("name", list(FRAMES))
+@pytest.mark.parametrize("n_bars", [1, 7, 60, 400, 1800])
+def test_seeded_refs_equal_bar_by_bar_replay(name, n_bars, sync):
+    df = make_ohlcv(n_bars, seed=n_bars, **FRAMES[name])
+    _assert_state_equal(TrueSyncRefs.from_history(df, sync).to_dict(), _replay(df, sync).to_dict())
+
+def test_seeded_refs_on_non_finite_and_repeated_bars():
+    df = make_ohlcv(600, seed=2)
+    df.iloc[100:104, df.columns.get_loc("Volume")] = np.nan
+    df.iloc[300, df.columns.get_loc("High")] = np.inf
+    df.iloc[590, df.columns.get_loc("Close")] = np.nan
+    _assert_state_equal(TrueSyncRefs.from_history(df).to_dict(), _replay(df, "legacy").to_dict())
+    repeated = pd.concat([df.iloc[:400], df.iloc[399:]])
+    _assert_state_equal(TrueSyncRefs.from_history(repeated).to_dict(), _replay(repeated, "legacy").to_dict())
+
+@pytest.mark.parametrize("sync", ["legacy", "dense"])
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_resume_equals_full_run(name, sync):
+    df = make_ohlcv(1800, seed=5, **FRAMES[name])
+    want = run_smartstock_v296_engine("SYN", None, None, data=df, sync=sync)
+    checkpoint = {}
+    run_smartstock_v296_engine("SYN", None, None, data=df.iloc[:1200], checkpoint=checkpoint, sync=sync)
+    for end in (1500, 1797, 1798, 1799, 1800):  # a long step, then one bar at a time
+        with recording("resume") as rec:
+            got = run_smartstock_v296_engine("SYN", None, None, data=df.iloc[:end], checkpoint=checkpoint, sync=sync)
+        assert rec.record()["counters"].get("checkpoint.hit") == 1
+        assert checkpoint["n_bars"] == end
+        assert checkpoint["fingerprint"] == data_fingerprint(df.iloc[:end])
+    _assert_same(got, want)
+
+def test_revised_history_starts_over():
+    df = make_ohlcv(1500, seed=6)
+    checkpoint = {}
+    run_smartstock_v296_engine("SYN", None, None, data=df.iloc[:1400], checkpoint=checkpoint)
+    revised = df.copy()
+    revised.iloc[:500, :4] *= 0.5  # e.g. a split adjustment of covered bars
+    with recording("revised") as rec:
+        got = run_smartstock_v296_engine("SYN", None, None, data=revised, checkpoint=checkpoint)
+    assert rec.record()["counters"].get("checkpoint.miss") == 1
+    _assert_same(got, run_smartstock_v296_engine("SYN", None, None, data=revised))
+    assert checkpoint["fingerprint"] == data_fingerprint(revised)
@@ -0,0 +1,76 @@
+# tests/test_cli.py
+import pandas as pd
+import pytest
+
+import cli
+import engine
+import store
+from audit import TraceBuffer
+from synthetic import SyntheticStore
+
+# ----------------------------
+# main([...]) smoke tests on synthetic bars
+# ----------------------------
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+@pytest.fixture
+def symbols_file(tmp_path):
+    path = tmp_path / "symbols.txt"
+    path.write_text("# universe\nAAA\nBBB\n\nCCC  # last\n")
+    return str(path)
+
+@pytest.fixture
+def synthetic(monkeypatch):
+    src = SyntheticStore(1500)
+    opened = []
+    monkeypatch.setattr(store, "open_store", lambda root=None, offline=None: opened.append((root, offline)) or src)
+    yield src, opened
+    engine.use_store(None)
+
+def test_eod(synthetic, symbols_file, tmp_path):
+    src, opened = synthetic
+    assert cli.main(["eod", symbols_file, "-o", str(tmp_path / "out"), "--store", "unused"]) == 0
+    assert opened == [("unused", None)]
+    out = pd.read_csv(tmp_path / "out" / "eod.csv")
+    assert out["symbol"].tolist() == SYMBOLS and not (out["Action"] == "ERROR").any()
+    engine.use_store(src)
+    for row in out.to_dict("records"):
+        want = engine.run_eod_analyzer(row["symbol"])
+        assert row["Action"] == want["Action"] and row["Reason"] == want["Reason"]
+
+def test_backtest(synthetic, symbols_file, tmp_path):
+    src, _ = synthetic
+    out = tmp_path / "out"
+    argv = ["backtest", symbols_file, "-o", str(out), "--start", "2000-01-01", "--end", "2010-01-01",
+            "-p", "plan_ttl=10", "--trace", str(out / "audit.npz")]
+    assert cli.main(argv) == 0
+    summary = pd.read_csv(out / "backtest.csv")
+    assert summary["symbol"].tolist() == SYMBOLS and (summary["status"] == "ok").all()
+    for sym in SYMBOLS:
+        stats, trades, equity = engine.run_smartstock_v296_engine(sym, "2000-01-01", "2010-01-01",
+                                                                  params={"plan_ttl": 10})
+        row = summary[summary["symbol"] == sym].iloc[0]
+        assert row["Final Equity"] == stats["Final Equity"] and row["Trades"] == len(trades)
+        assert len(pd.read_csv(out / "trades" / f"{sym}.csv")) == len(trades)
+        assert len(pd.read_csv(out / "equity" / f"{sym}.csv")) == len(equity)
+    trace = TraceBuffer.load(str(out / "audit.npz"))
+    assert trace.symbols == SYMBOLS and len(trace.query(kind="fill_buy")) == summary["Signals Triggered"].sum()
+
+def test_backtest_rejects_unknown_param(symbols_file, tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(["backtest", symbols_file, "-o", str(tmp_path), "-p", "nope=1"])
+
+def test_offline_store(symbols_file, tmp_path):
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    src = SyntheticStore(1500, start=str((pd.Timestamp.today() - pd.DateOffset(years=7)).date()))  # inside --period 10y
+    for sym in SYMBOLS[:2]:
+        src.get(sym).to_csv(csv_dir / f"{sym}.csv")
+    try:
+        assert cli.main(["eod", symbols_file, "-o", str(tmp_path / "out"), "--offline", str(csv_dir)]) == 1
+    finally:
+        engine.use_store(None)
+    out = pd.read_csv(tmp_path / "out" / "eod.csv")
+    assert out["Action"].eq("ERROR").tolist() == [False, False, True]  # no CCC.csv
+    assert (csv_dir / ".store" / "AAA" / "dates.npy").exists()
+    assert store.open_store() is None
@@ -0,0 +1,154 @@
+# tests/test_fetch.py
+import sys
+import threading
+import types
+
+import pandas as pd
+import pytest
+
+import fetch
+from fetch import FetchError, Fetcher, HTTPSource, RateLimited, RateLimiter, TransientError, stand_in_server
+from synthetic import SyntheticStore
+
+# ----------------------------
+# RateLimiter token bucket (fake clock)
+# ----------------------------
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(fetch.time, "monotonic", c)
+    return c
+
+def test_token_bucket_bursts_then_refills(clock):
+    lim = RateLimiter(rate=8, burst=2)
+    assert lim.try_acquire() == 0.0 and lim.try_acquire() == 0.0
+    assert lim.try_acquire() == 0.125
+    clock.now += 0.0625
+    assert lim.try_acquire() == 0.0625
+    clock.now += 0.0625
+    assert lim.try_acquire() == 0.0
+    clock.now += 10.0  # refill is capped at the burst
+    assert [lim.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.125]
+
+def test_pause_holds_every_caller(clock):
+    lim = RateLimiter(rate=None)
+    assert lim.try_acquire() == 0.0
+    lim.pause(2.0)
+    lim.pause(0.5)  # never shortens a pause
+    assert lim.try_acquire() == pytest.approx(2.0)
+    clock.now += 2.0
+    assert lim.try_acquire() == 0.0
+
+# ----------------------------
+# Fetcher retries / backoff
+# ----------------------------
+def _frame(n: int = 5) -> pd.DataFrame:
+    return SyntheticStore(n).get("AAA")
+
+class Flaky:
+    """Provider failing with `errors` (in order) before returning a frame."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, symbol, start=None, end=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return _frame()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    out = []
+    monkeypatch.setattr(fetch.time, "sleep", out.append)
+    monkeypatch.setattr(fetch.random, "random", lambda: 1.0)  # no jitter
+    return out
+
+def test_transient_errors_are_retried_with_exponential_backoff(sleeps):
+    provider = Flaky(TransientError("503"), TransientError("503"))
+    df, row = Fetcher(provider, retries=3, backoff=0.5).fetch("AAA")
+    assert row["status"] == "ok" and row["attempts"] == 3 and row["rows"] == len(df) == 5
+    assert sleeps == [0.5, 1.0]
+
+def test_backoff_is_capped_and_gives_up(sleeps):
+    provider = Flaky(*[TransientError("timeout")] * 5)
+    df, row = Fetcher(provider, retries=4, backoff=1.0, max_backoff=3.0).fetch("AAA")
+    assert df.empty and row["status"] == "error" and row["attempts"] == 5
+    assert "gave up after 5 attempts" in row["reason"]
+    assert sleeps == [1.0, 2.0, 3.0, 3.0]
+    with pytest.raises(FetchError):
+        Fetcher(Flaky(*[TransientError("timeout")] * 5), retries=1)("AAA")
+
+def test_permanent_errors_are_not_retried(sleeps):
+    provider = Flaky(FetchError("HTTP 403"))
+    df, row = Fetcher(provider, retries=3).fetch("AAA")
+    assert provider.calls == 1 and row["status"] == "error" and sleeps == []
+
+def test_retry_after_pauses_the_shared_limiter(sleeps):
+    fetcher = Fetcher(Flaky(RateLimited("HTTP 429", retry_after=7.0)), retries=2, backoff=0.5)
+    paused = []
+    fetcher.limiter.pause = paused.append
+    df, row = fetcher.fetch("AAA")
+    assert row["status"] == "ok" and row["attempts"] == 2
+    assert paused == [7.0] and sleeps == [7.0]
+
+def test_empty_frame_is_not_an_error():
+    df, row = Fetcher(lambda s, start=None, end=None: pd.DataFrame()).fetch("NONE")
+    assert df.empty and (row["status"], row["attempts"]) == ("empty", 1)
+
+# ----------------------------
+# HTTPSource against the stand-in server
+# ----------------------------
+def test_fetch_many_from_stand_in_server():
+    store = SyntheticStore(300)
+    symbols = [f"S{i}" for i in range(12)]
+    with stand_in_server(source=store, error_rate=0.2, seed=3) as url:
+        fetcher = Fetcher(HTTPSource(url, pool_size=4), workers=4, retries=6, backoff=0.001)
+        frames, report = fetcher.fetch_many(symbols, start="2000-03-01")
+    assert [r["symbol"] for r in report] == symbols
+    assert all(r["status"] == "ok" for r in report) and any(r["attempts"] > 1 for r in report)
+    for s in symbols:
+        pd.testing.assert_frame_equal(frames[s], store.get(s, start="2000-03-01"), check_freq=False,
+                                      check_names=False, check_dtype=False)
+
+def test_stand_in_server_status_codes():
+    with stand_in_server(source=SyntheticStore(50), rate=1) as url:
+        source = HTTPSource(url)
+        assert len(source("AAA")) == 50
+        with pytest.raises(RateLimited) as err:  # second request within the same second
+            source("AAA")
+        assert err.value.retry_after == 1.0
+    with stand_in_server(source=SyntheticStore(50), error_rate=1.0) as url:
+        with pytest.raises(TransientError):
+            HTTPSource(url)("AAA")
+
+# ----------------------------
+# yfinance provider: one Ticker per call (yf.download is not thread-safe)
+# ----------------------------
+def test_yfinance_provider_uses_one_ticker_per_call(monkeypatch):
+    created = []
+
+    class Ticker:
+        def __init__(self, symbol):
+            created.append((symbol, threading.get_ident()))
+
+        def history(self, start=None, end=None, period=None, interval="1d", auto_adjust=True):
+            df = _frame(4)
+            df.index = df.index.tz_localize("America/New_York")
+            df["Dividends"] = 0.0
+            return df
+
+    monkeypatch.setitem(sys.modules, "yfinance", types.SimpleNamespace(Ticker=Ticker))
+    frames, report = Fetcher(workers=4).fetch_many(["A", "B", "C", "D"], start="2000-01-01")
+    assert sorted(s for s, _ in created) == ["A", "B", "C", "D"]
+    want = _frame(4)
+    for df in frames.values():
+        assert df.index.tz is None and list(df.columns) == list(want.columns)
+        pd.testing.assert_frame_equal(df, want, check_freq=False)
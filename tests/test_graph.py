@@ -0,0 +1,40 @@
+# tests/test_graph.py
+import numpy as np
+import pytest
+
+from engine import IndicatorGraph
+from synthetic import make_ohlcv
+
+WINDOWS = [
+    ("D", 80, "max_ref", "High", 252),
+    ("D", 80, "min_ref", "Low", 20),
+    ("D", 80, "sma", "Close", 200),
+    ("W", 52, "max_ref", "High", 52),
+    ("W", 52, "sma", "Close", 50),
+    ("M", 40, "min_ref", "Low", 6),
+    ("M", 40, "sma", "Close", 20),
+]
+
+@pytest.mark.parametrize("tf, n, indicator, column, p", WINDOWS)
+def test_tail_of_rolling_nodes_is_exact(tf, n, indicator, column, p):
+    df = make_ohlcv(2500, seed=4)
+    got = IndicatorGraph(df).tail(tf, n, indicator, column, p)
+    want = IndicatorGraph(df).node(tf, indicator, column, p).tail(n)
+    assert got.index.equals(want.index)
+    np.testing.assert_allclose(got.to_numpy(), want.to_numpy(), rtol=1e-12, equal_nan=True)
+
+@pytest.mark.parametrize("tf, n", [("D", 80), ("W", 52), ("M", 40)])
+@pytest.mark.parametrize("params", [(5, 3), (20, 10)])
+def test_tail_of_recursive_nodes_after_warm_up(tf, n, params):
+    df = make_ohlcv(5000, seed=5)
+    got = IndicatorGraph(df).tail(tf, n, "rsi_ema", "Close", *params)
+    want = IndicatorGraph(df).node(tf, "rsi_ema", "Close", *params).tail(n)
+    assert got.index.equals(want.index)
+    np.testing.assert_allclose(got.to_numpy(), want.to_numpy(), atol=1e-6)
+
+def test_tail_reuses_built_nodes_and_stores_nothing():
+    g = IndicatorGraph(make_ohlcv(1500, seed=6))
+    g.tail("D", 80, "sma", "Close", 200)
+    assert len(g) == 0
+    node = g.node("D", "sma", "Close", 200)
+    assert g.tail("D", 80, "sma", "Close", 200).equals(node.tail(80))
@@ -0,0 +1,97 @@
+# tests/test_incremental.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import calculate_rsi_wilder, get_rsi_ema
+from incremental import (EWM, RollingMax, RollingMean, RollingMin, RsiEma, WilderRSI, seed,
+                         state_from_dict)
+
+# ----------------------------
+# Adversarial inputs: every state must match the pandas batch function bit for bit
+# ----------------------------
+def _walk(n: int = 400, seed_: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed_)
+    return 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+def _series() -> dict:
+    rng = np.random.default_rng(7)
+    walk = _walk()
+    gaps = walk.copy()
+    gaps[rng.random(len(gaps)) < 0.08] = np.nan
+    gaps[100:130] = np.nan                       # a gap longer than the windows
+    flat = walk.copy()
+    flat[50:120] = flat[50]                      # constant run (pandas' same-value guards)
+    mixed = walk - 50                            # sign changes around 0
+    mixed[::37] = np.nan
+    scale = walk.copy()
+    scale[200:210] = 1e12                        # Kahan compensation on a huge spike
+    infs = walk.copy()
+    infs[[30, 31, 250]] = [np.inf, -np.inf, np.inf]
+    volume = np.round(rng.lognormal(13, 0.5, len(walk))).astype(np.int64)
+    return {"walk": walk, "gaps": gaps, "flat": flat, "mixed": mixed, "scale": scale, "infs": infs,
+            "lead_nan": np.r_[[np.nan] * 12, walk[:200]], "int_volume": volume}
+
+SERIES = _series()
+
+def _stream(state, x) -> np.ndarray:
+    return np.array([state.update(v) for v in np.asarray(x, dtype=np.float64).tolist()])
+
+def _same(got, want) -> None:
+    np.testing.assert_array_equal(got, np.asarray(want, dtype=np.float64))
+
+@pytest.mark.parametrize("name", list(SERIES))
+@pytest.mark.parametrize("kw", [dict(span=3), dict(span=10), dict(alpha=0.5), dict(alpha=1 / 5), dict(alpha=1 / 20)])
+def test_ewm(name, kw):
+    # span=3 and alpha=0.5 are pandas' com == 1 branch (new weight re-derived after NaN gaps)
+    x = SERIES[name]
+    _same(_stream(EWM(**kw), x), pd.Series(x, dtype=np.float64).ewm(adjust=False, **kw).mean())
+
+@pytest.mark.parametrize("name", list(SERIES))
+@pytest.mark.parametrize("period", [5, 20])
+def test_wilder_rsi(name, period):
+    x = SERIES[name]
+    _same(_stream(WilderRSI(period), x), calculate_rsi_wilder(pd.Series(x, dtype=np.float64), period))
+
+@pytest.mark.parametrize("name", list(SERIES))
+@pytest.mark.parametrize("params", [(5, 3), (20, 10)])
+def test_rsi_ema(name, params):
+    x = SERIES[name]
+    _same(_stream(RsiEma(*params), x), get_rsi_ema(pd.Series(x, dtype=np.float64), *params))
+
+@pytest.mark.parametrize("name", list(SERIES))
+@pytest.mark.parametrize("window", [1, 3, 20, 252])
+def test_rolling_extremes(name, window):
+    s = pd.Series(SERIES[name], dtype=np.float64)
+    _same(_stream(RollingMax(window), s), s.rolling(window).max())
+    _same(_stream(RollingMin(window), s), s.rolling(window).min())
+
+@pytest.mark.parametrize("name", list(SERIES))
+@pytest.mark.parametrize("window", [1, 5, 20, 50])
+def test_rolling_mean(name, window):
+    s = pd.Series(SERIES[name])
+    _same(_stream(RollingMean(window), s), s.rolling(window).mean())
+
+@pytest.mark.parametrize("make", [lambda: EWM(span=3), lambda: WilderRSI(5), lambda: RsiEma(20, 10),
+                                  lambda: RollingMax(20), lambda: RollingMin(20), lambda: RollingMean(20)])
+@pytest.mark.parametrize("name", ["gaps", "flat", "scale"])
+def test_json_round_trip_resumes_exactly(make, name):
+    x = SERIES[name]
+    full = _stream(make(), x)
+    for cut in (0, 1, 25, 115, len(x) - 1):
+        state = seed(make(), x[:cut])
+        state = state_from_dict(json.loads(json.dumps(state.to_dict())))
+        _same(_stream(state, x[cut:]), full[cut:])
+
+@pytest.mark.parametrize("make", [lambda: EWM(span=3), lambda: WilderRSI(5), lambda: RsiEma(5, 3),
+                                  lambda: RollingMean(20)])
+def test_peek_does_not_consume(make):
+    x = SERIES["gaps"]
+    state, ref = make(), make()
+    for v in x.tolist():
+        peeked = state.peek(v)
+        assert json.dumps(state.to_dict()) == json.dumps(ref.to_dict())
+        _same([state.update(v)], [peeked])
+        ref.update(v)
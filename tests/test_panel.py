@@ -0,0 +1,136 @@
+# tests/test_panel.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental
+import panel
+from engine import calculate_rsi_wilder, get_rsi_ema
+from synthetic import make_ohlcv
+
+# ----------------------------
+# Every panel kernel, column by column, against the single-series pandas function
+# evaluated on that symbol's own bars (NaN rows = no bar)
+# ----------------------------
+def _frames() -> dict:
+    frames = {
+        "plain": make_ohlcv(700, seed=1),
+        "halts": make_ohlcv(700, seed=2, halt_prob=0.02, halt_len=8),
+        "flat": make_ohlcv(700, seed=3, flat_prob=0.3),
+        "late": make_ohlcv(400, seed=4, start="2001-03-01"),      # listed after the others start
+        "short": make_ohlcv(15, seed=5, start="2001-06-01"),      # fewer bars than most windows
+    }
+    frames["flat"].iloc[100:160] = frames["flat"].iloc[100].to_numpy()  # constant run
+    frames["plain"]["Volume"] = frames["plain"]["Volume"].astype(np.int64)
+    return frames
+
+FRAMES = _frames()
+
+@pytest.fixture(scope="module")
+def stacked():
+    return {c: panel.stack(FRAMES, c) for c in ("High", "Low", "Close", "Volume")}
+
+def _columns(X: np.ndarray, symbols: list[str]):
+    for j, sym in enumerate(symbols):
+        bars = ~np.isnan(X[:, j])
+        yield sym, j, bars, pd.Series(X[bars, j])
+
+def test_stack_places_every_bar(stacked):
+    index, symbols, X = stacked["Close"]
+    assert index.is_monotonic_increasing
+    for sym, j, bars, s in _columns(X, symbols):
+        assert (index[bars] == FRAMES[sym].index).all()
+        np.testing.assert_array_equal(s.to_numpy(), FRAMES[sym]["Close"].to_numpy())
+
+@pytest.mark.parametrize("period", [5, 20])
+def test_rsi_wilder(stacked, period):
+    _, symbols, X = stacked["Close"]
+    out = panel.rsi_wilder(X, period)
+    for sym, j, bars, s in _columns(X, symbols):
+        np.testing.assert_array_equal(out[bars, j], calculate_rsi_wilder(s, period).to_numpy())
+        assert np.isnan(out[~bars, j]).all()
+
+@pytest.mark.parametrize("params", [(5, 3), (20, 10)])
+def test_rsi_ema(stacked, params):
+    _, symbols, X = stacked["Close"]
+    out = panel.rsi_ema(X, *params)
+    for sym, j, bars, s in _columns(X, symbols):
+        np.testing.assert_array_equal(out[bars, j], get_rsi_ema(s, *params).to_numpy())
+        assert np.isnan(out[~bars, j]).all()
+
+@pytest.mark.parametrize("how,column,window,shift", [
+    ("max", "High", 252, 1), ("min", "Low", 20, 1), ("mean", "Close", 50, 0), ("mean", "Volume", 20, 0),
+    ("max", "Close", 3, 0), ("mean", "Close", 1, 2),
+])
+def test_rolling(stacked, how, column, window, shift):
+    _, symbols, X = stacked[column]
+    out = getattr(panel, f"rolling_{how}")(X, window, shift)
+    for sym, j, bars, s in _columns(X, symbols):
+        want = getattr(s.rolling(window), how)().shift(shift).to_numpy()
+        np.testing.assert_array_equal(out[bars, j], want)
+        assert np.isnan(out[~bars, j]).all()
+
+def test_volume_ratio(stacked):
+    _, symbols, V = stacked["Volume"]
+    out = panel.volume_ratio(V, 20)
+    for sym, j, bars, s in _columns(V, symbols):
+        vma = s.rolling(20).mean()
+        want = np.where(vma > 0, s / vma, 0.0)
+        np.testing.assert_array_equal(out[bars, j], want)
+        assert np.isnan(out[~bars, j]).all()
+
+def test_gap_free_panel_skips_compaction():
+    X = np.column_stack([FRAMES["plain"]["Close"].to_numpy(), FRAMES["halts"]["Close"].to_numpy()])
+    out = panel.rsi_ema(X, 5, 3)
+    for j in range(2):
+        np.testing.assert_array_equal(out[:, j], get_rsi_ema(pd.Series(X[:, j]), 5, 3).to_numpy())
+
+# ----------------------------
+# Column states: each column steps like its own incremental state, over random subsets
+# of the columns per tick (symbols missing a date), and dumps / loads exactly
+# ----------------------------
+def _ticks(n: int = 300, k: int = 6) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    X = 50 + np.cumsum(rng.normal(0, 1, (n, k)), axis=0)
+    X[rng.random((n, k)) < 0.05] = np.nan
+    X[rng.random((n, k)) < 0.01] = np.inf
+    X[rng.random((n, k)) < 0.01] = -np.inf
+    X[:, 0] = 3.0                   # constant column
+    X[::7, 1] = -0.0                # signed zeros
+    X[:, 2] = np.round(X[:, 2])     # ties
+    return X
+
+def _same(got, want) -> None:
+    np.testing.assert_array_equal(np.asarray(got, dtype=np.float64), np.asarray(want, dtype=np.float64))
+
+@pytest.mark.parametrize("make_scalar,make_col", [
+    (lambda: incremental.EWM(span=3), lambda: panel.ColEWM(span=3)),
+    (lambda: incremental.EWM(span=10), lambda: panel.ColEWM(span=10)),
+    (lambda: incremental.EWM(alpha=0.5), lambda: panel.ColEWM(alpha=0.5)),
+    (lambda: incremental.RsiEma(5, 3), lambda: panel.ColRsiEma(5, 3)),
+    (lambda: incremental.RsiEma(20, 10), lambda: panel.ColRsiEma(20, 10)),
+    *[(lambda w=w: incremental.RollingMean(w), lambda w=w: panel.ColRollingMean(w)) for w in (1, 3, 20)],
+    *[(lambda w=w: incremental.RollingMax(w), lambda w=w: panel.ColRollingExtreme(w, True)) for w in (1, 3, 20)],
+    *[(lambda w=w: incremental.RollingMin(w), lambda w=w: panel.ColRollingExtreme(w, False)) for w in (1, 3, 20)],
+])
+def test_column_states(make_scalar, make_col):
+    X = _ticks()
+    k = X.shape[1]
+    rng = np.random.default_rng(1)
+    ref = [make_scalar() for _ in range(k)]
+    col = make_col()
+    col.grow(k)
+    for t in range(len(X)):
+        j = np.flatnonzero(rng.random(k) < 0.8)
+        if hasattr(ref[0], "peek") and hasattr(col, "peek"):
+            _same(col.peek(j, X[t, j]), [ref[i].peek(X[t, i]) for i in j])
+        _same(col.update(j, X[t, j]), [ref[i].update(X[t, i]) for i in j])
+        if t == 150:  # continue on states loaded from the scalar objects
+            for i in range(k):
+                assert str(col.dump(i).to_dict()) == str(ref[i].to_dict())
+            col = make_col()
+            col.grow(k)
+            for i in range(k):
+                col.load(i, ref[i])
+    for i in range(k):
+        assert str(col.dump(i).to_dict()) == str(ref[i].to_dict())
@@ -0,0 +1,63 @@
+# tests/test_portfolio.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio
+from engine import run_smartstock_v296_engine
+from portfolio import run_portfolio_backtest
+from synthetic import make_ohlcv
+
+# ----------------------------
+# Shared-cash portfolio backtest: single-symbol parity, slot limit, cash limit
+# ----------------------------
+def _nan_bars() -> pd.DataFrame:
+    df = make_ohlcv(1500, seed=5)
+    df.iloc[[400, 401, 900], [0, 3]] = np.nan  # per-symbol pandas prep instead of the panel kernels
+    return df
+
+FRAMES = {
+    "plain": make_ohlcv(1500, seed=1),
+    "halts": make_ohlcv(1500, seed=7, halt_prob=0.01, halt_len=8),   # empty weeks
+    "flat": make_ohlcv(1500, seed=3, flat_prob=0.3),
+    "nan_bars": _nan_bars(),
+}
+STAT_KEYS = ("Total Return", "Max Drawdown", "Macro Vetoes", "Signals Issued", "Signals Triggered",
+             "Breakout Trades", "Reversal Trades", "Final Equity")
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_one_symbol_one_slot_is_the_single_engine(name):
+    df = FRAMES[name]
+    stats, trades, equity = run_smartstock_v296_engine(name, None, None, data=df)
+    p_stats, p_trades, p_equity = run_portfolio_backtest([name], None, None, max_positions=1, data={name: df})
+    assert len(trades) > 0
+    assert {k: p_stats[k] for k in STAT_KEYS} == {k: stats[k] for k in STAT_KEYS}
+    pd.testing.assert_frame_equal(p_trades.drop(columns="Symbol"), trades)
+    np.testing.assert_array_equal(p_equity["Equity"].to_numpy()[252:], equity["Equity"].to_numpy())
+    assert (p_equity["Equity"].to_numpy()[:252] == 100000.0).all()
+
+def test_slot_limit():
+    data = {f"S{i}": make_ohlcv(1500, seed=10 + i) for i in range(12)}
+    stats, trades, equity = run_portfolio_backtest(list(data), None, None, max_positions=2, data=data)
+    assert equity["Positions"].max() == 2
+    assert stats["Skipped (no slot / cash)"] > 0
+    held = (trades["Type"] == "BUY").astype(int) - (trades["Type"] == "SELL").astype(int)
+    assert held.cumsum().max() <= 2
+    assert stats["Signals Triggered"] == (trades["Type"] == "BUY").sum()
+
+def test_budget_exhaustion_books_no_phantom_buys():
+    data = {f"S{i}": make_ohlcv(1500, seed=10 + i) for i in range(6)}
+    stats, trades, equity = run_portfolio_backtest(list(data), None, None, data=data, init_cash=20.0)
+    # ~$50 shares, at most $1.40 per entry: every pending buy is skipped
+    assert trades.empty
+    assert stats["Signals Triggered"] == 0 and stats["Skipped (no slot / cash)"] > 0
+    assert (equity["Equity"] == 20.0).all() and (equity["Positions"] == 0).all()
+
+def test_panel_prep_matches_per_symbol_prep(monkeypatch):
+    data = {name: FRAMES[name] for name in ("plain", "halts", "flat")}
+    want = run_portfolio_backtest(list(data), None, None, max_positions=2, data=data)
+    monkeypatch.setattr(portfolio, "_clean", lambda df: False)  # force the pandas prep everywhere
+    got = run_portfolio_backtest(list(data), None, None, max_positions=2, data=data)
+    assert got[0] == want[0]
+    pd.testing.assert_frame_equal(got[1], want[1])
+    pd.testing.assert_frame_equal(got[2], want[2])
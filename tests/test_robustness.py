@@ -0,0 +1,58 @@
+# tests/test_robustness.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import robustness
+from synthetic import make_ohlcv
+
+def _naive(log_ret: np.ndarray, starts: np.ndarray, n: int, block: int) -> dict:
+    """Expand every block step and take the generic path metrics."""
+    idx = (starts[..., None] + np.arange(block)).reshape(len(starts), -1)[:, :n]
+    return robustness._path_metrics(np.cumsum(log_ret[idx], axis=1))
+
+@pytest.mark.parametrize("n, block", [(1000, 20), (1001, 20), (997, 7), (50, 50), (300, 1)])
+def test_block_metrics_match_expanded_paths(n, block):
+    rng = np.random.default_rng(n + block)
+    rets = rng.normal(0.0005, 0.02, n)
+    rets[rng.random(n) < 0.05] = 0.0  # flat days: ties with the running peak
+    log_ret = np.log1p(rets)
+    log_ret = np.concatenate((log_ret, log_ret[:block]))
+    starts = rng.integers(0, n, size=(200, -(-n // block)))
+    got = robustness._block_metrics(robustness._block_tables(log_ret, n, block), starts, n)
+    want = _naive(log_ret, starts, n, block)
+    for k in ("total_return", "max_drawdown"):
+        np.testing.assert_allclose(got[k], want[k], rtol=1e-9, atol=1e-12)
+    for k in ("max_underwater", "underwater_frac"):
+        np.testing.assert_array_equal(got[k], want[k])
+
+@pytest.mark.parametrize("n, steps", [(1000, 256), (257, 256), (40, 7)])
+def test_iid_metrics_match_expanded_paths(n, steps):
+    rng = np.random.default_rng(n)
+    rets = rng.normal(0.0005, 0.02, n)
+    rets[rng.random(n) < 0.05] = 0.0
+    log_ret = np.log1p(rets)
+    idx = rng.integers(0, n, size=(n, 300))  # steps x paths
+    got = robustness._iid_metrics(log_ret, (idx[lo:lo + steps] for lo in range(0, n, steps)), 300)
+    want = robustness._path_metrics(np.cumsum(log_ret[idx.T], axis=1))
+    for k in want:
+        np.testing.assert_array_equal(got[k], want[k])
+
+def test_observed_metrics_match_pandas():
+    eq = pd.DataFrame({"Equity": make_ohlcv(2000, seed=3)["Close"].to_numpy()})
+    got = robustness.observed_metrics(eq)
+    s = eq["Equity"]
+    peak = s.cummax()
+    assert got["total_return"] == pytest.approx(s.iloc[-1] / s.iloc[0] - 1)
+    assert got["max_drawdown"] == pytest.approx((s / peak - 1).min())
+
+def test_bootstrap_is_seeded_and_rejects_unknown_method():
+    eq = pd.DataFrame({"Equity": make_ohlcv(500, seed=1)["Close"].to_numpy()})
+    a = robustness.equity_bootstrap(eq, n_paths=300, seed=7, chunk=128)
+    b = robustness.equity_bootstrap(eq, n_paths=300, seed=7, chunk=128)
+    assert all(np.array_equal(a[k], b[k]) for k in a) and len(a["max_drawdown"]) == 300
+    c = robustness.equity_bootstrap(eq, n_paths=300, method="iid", seed=7, chunk=128)
+    d = robustness.equity_bootstrap(eq, n_paths=300, method="iid", seed=7, chunk=128)
+    assert all(np.array_equal(c[k], d[k]) for k in c) and len(c["total_return"]) == 300
+    with pytest.raises(ValueError):
+        robustness.equity_bootstrap(eq, n_paths=10, method="stationary")
@@ -0,0 +1,67 @@
+# tests/test_screener.py
+import pytest
+
+import engine
+import screener
+from engine import run_eod_analyzer
+from screener import iter_screen, screen_symbol
+from synthetic import make_ohlcv
+
+# ----------------------------
+# screen_symbol / iter_screen against run_eod_analyzer on the same bars
+# ----------------------------
+class FrameStore:
+    def __init__(self, frames: dict):
+        self.frames = frames
+
+    def get(self, symbol, start=None, end=None, period=None):
+        return self.frames[symbol].copy()
+
+def _frames() -> dict:
+    frames = {f"S{i}": make_ohlcv(1500, seed=i) for i in range(6)}
+    sell = make_ohlcv(1500, seed=99)
+    sell.iloc[-1, :4] = sell["Low"].iloc[-21:-1].min() * 0.9  # close under the 20D support
+    frames["SELL"] = sell
+    frames["SHORT"] = make_ohlcv(100, seed=7)
+    return frames
+
+FRAMES = _frames()
+
+@pytest.fixture
+def store():
+    s = FrameStore(FRAMES)
+    engine.use_store(s)
+    yield s
+    engine.use_store(None)
+
+def _without_pools(res: dict) -> dict:
+    return {k: res[k] for k in screener.SCREEN_COLUMNS if k in res}
+
+@pytest.mark.parametrize("symbol", [s for s in FRAMES if s != "SHORT"])
+def test_screen_symbol_matches_run_eod_analyzer(store, symbol):
+    row = screen_symbol(symbol)
+    want = _without_pools(run_eod_analyzer(symbol))
+    assert row["Date"] == str(FRAMES[symbol].index[-1].date())
+    if row["Macro"] == "SKIP":
+        assert want["Macro"] in ("PASS", "FAIL")
+        row = {**row, "Macro": want["Macro"]}
+    assert {k: v for k, v in row.items() if k != "Date"} == want
+
+def test_daily_gate_skips_macro(store, monkeypatch):
+    calls = []
+    monkeypatch.setattr(screener, "_eod_macro", lambda g: calls.append(g) or engine._eod_macro(g))
+    row = screen_symbol("SELL")
+    assert row["Action"].startswith("SELL") and row["Macro"] == "SKIP"
+    assert calls == []
+    row = screen_symbol("S0")
+    assert row["Macro"] in ("PASS", "FAIL") and len(calls) == 1
+
+def test_short_history_is_an_error_row(store):
+    row = screen_symbol("SHORT")
+    assert row["Action"] == "ERROR" and "100 bars" in row["Reason"]
+
+def test_iter_screen_keeps_input_order(store):
+    symbols = ["S3", "SELL", "S0", "SHORT", "S5"]
+    rows = list(iter_screen(symbols, workers=2, batch_size=2, store=store))
+    assert [r["symbol"] for r in rows] == symbols
+    assert rows == [screen_symbol(s) for s in symbols]
@@ -0,0 +1,51 @@
+# tests/test_store.py
+import pandas as pd
+import pytest
+
+from store import LocalFileSource, OHLCVStore, _period_start
+from synthetic import make_ohlcv
+
+def _same_bars(got, want) -> None:
+    assert (got.index == want.index).all()
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), want.reset_index(drop=True), check_dtype=False,
+                                  check_exact=False, rtol=1e-12)
+
+def _csv_source(tmp_path, frames: dict) -> LocalFileSource:
+    src = tmp_path / "src"
+    src.mkdir()
+    for symbol, df in frames.items():
+        df.to_csv(src / f"{symbol}.csv")
+    return LocalFileSource(str(src))
+
+def test_empty_pull_is_not_persisted(tmp_path):
+    store = OHLCVStore(str(tmp_path / "store"), source=_csv_source(tmp_path, {}))
+    assert store.get("NOPE", start="2020-01-01").empty
+    assert store.symbols() == []
+    assert not (tmp_path / "store" / "NOPE").exists()
+
+def test_empty_pull_keeps_stored_bars(tmp_path):
+    df = make_ohlcv(300, seed=1)
+    store = OHLCVStore(str(tmp_path / "store"), source=None)
+    store.append("A", df)
+    assert store.append("A", pd.DataFrame()) == len(df)
+    _same_bars(store.read("A"), df)
+    assert store.symbols() == ["A"]
+
+def test_sync_fetches_and_serves(tmp_path):
+    df = make_ohlcv(300, seed=2)
+    store = OHLCVStore(str(tmp_path / "store"), source=_csv_source(tmp_path, {"A": df}))
+    got = store.get("A", start="2000-01-01")
+    _same_bars(got, df)
+    assert store.symbols() == ["A"]
+
+@pytest.mark.parametrize("period,want", [
+    ("10y", "2014-06-18"), ("6mo", "2023-12-18"), ("30d", "2024-05-19"), ("2wk", "2024-06-04"),
+    ("ytd", "2024-01-01"), ("max", None),
+])
+def test_period_start(period, want):
+    got = _period_start(period, now=pd.Timestamp("2024-06-18 15:30"))
+    assert got == (None if want is None else pd.Timestamp(want))
+
+def test_unknown_period_raises():
+    with pytest.raises(ValueError):
+        _period_start("1q")
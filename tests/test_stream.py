@@ -0,0 +1,99 @@
+# tests/test_stream.py
+import json
+
+import numpy as np
+import pytest
+
+from engine import run_eod_analyzer
+from stream import MIN_BARS, StreamEngine, SymbolStream, replay
+from synthetic import make_ohlcv
+
+# ----------------------------
+# Batched StreamEngine ticks against one SymbolStream per symbol (the scalar reference)
+# ----------------------------
+def _frames() -> dict:
+    frames = {
+        "plain": make_ohlcv(700, seed=11),
+        "halts": make_ohlcv(700, seed=12, halt_prob=0.03, halt_len=10),   # own calendar
+        "flat": make_ohlcv(700, seed=13, flat_prob=0.3),
+        "late": make_ohlcv(600, seed=14, start="2000-04-03"),            # warms up mid-replay
+    }
+    frames["flat"].iloc[100:160] = frames["flat"].iloc[100].to_numpy()
+    frames["plain"].iloc[[40, 41, 300], 3] = [np.nan, np.inf, np.nan]
+    return frames
+
+FRAMES = _frames()
+
+def _reference(frames: dict, start=None) -> tuple[list, dict]:
+    streams = {s: SymbolStream(s) for s in frames}
+    events = []
+    for ts, bars in replay(frames, start=start):
+        for sym, bar in bars.items():
+            e = streams[sym].update(ts, *bar)
+            if e is not None:
+                events.append(e)
+    return events, streams
+
+def _dumps(x) -> str:
+    return json.dumps(x, default=str, sort_keys=True)
+
+def _run(engine: StreamEngine, frames: dict, start=None) -> list:
+    return [e for ts, bars in replay(frames, start=start) for e in engine.on_tick(ts, bars)]
+
+def test_batched_ticks_match_per_symbol_streams():
+    want, streams = _reference(FRAMES)
+    engine = StreamEngine()
+    got = _run(engine, FRAMES)
+    assert len(got) > 0
+    assert _dumps(got) == _dumps(want)
+    assert _dumps(engine.snapshot()) == _dumps({s: st.to_dict() for s, st in streams.items()})
+
+@pytest.mark.parametrize("cut", ["2000-06-01", "2001-09-14"])
+def test_seed_and_snapshot_resume_exactly(cut):
+    want, _ = _reference(FRAMES)
+    split = np.datetime64(cut)
+    engine = StreamEngine()
+    for sym, df in FRAMES.items():
+        engine.seed(sym, df[df.index < split])
+    restored = StreamEngine()
+    restored.restore(json.loads(json.dumps(engine.snapshot())))
+    tail = [e for e in want if np.datetime64(e["Date"]) >= split]
+    assert _dumps(_run(restored, FRAMES, start=cut)) == _dumps(tail)
+
+def test_on_bar_is_a_one_bar_tick():
+    engine, ref = StreamEngine(), SymbolStream("halts")
+    for ts, row in FRAMES["halts"].iterrows():
+        bar = row[["Open", "High", "Low", "Close", "Volume"]].to_numpy(dtype=np.float64).tolist()
+        assert _dumps(engine.on_bar("halts", ts, *bar)) == _dumps(ref.update(ts, *bar))
+    lat = engine.latency()
+    assert lat["ticks"] == lat["bars"] == len(FRAMES["halts"])
+    assert lat["p50_us"] <= lat["p99_us"] <= lat["max_us"] and lat["bar_mean_us"] > 0
+
+def test_latency_samples_whole_ticks():
+    engine = StreamEngine(latency_window=4)
+    ticks = list(replay(FRAMES))[:10]
+    for ts, bars in ticks:
+        engine.on_tick(ts, bars)
+    lat = engine.latency()
+    assert (lat["ticks"], lat["bars"]) == (10, sum(len(b) for _, b in ticks))
+    engine.reset_latency()
+    assert engine.latency()["ticks"] == 0 and engine.latency()["p50_us"] is None
+
+# ----------------------------
+# Streams against run_eod_analyzer on the history up to each bar
+# ----------------------------
+@pytest.mark.parametrize("name", ["plain", "halts", "flat", "late"])
+def test_stream_matches_eod_analyzer_on_truncated_histories(name):
+    df = FRAMES[name]
+    events, _ = _reference({name: df})
+    got = {e["Date"]: e for e in _run(StreamEngine(), {name: df})}
+    assert len(events) == len(got) == len(df) - MIN_BARS + 1
+    for i in range(MIN_BARS - 1, len(df), 37):
+        res = run_eod_analyzer(name, data=df.iloc[:i + 1])
+        for e in (events[i - MIN_BARS + 1], got[df.index[i]]):
+            assert e["Date"] == df.index[i]
+            row = {k: v for k, v in e.items() if k != "Date"}
+            if row["Macro"] == "SKIP":
+                assert res["Macro"] in ("PASS", "FAIL")
+                row["Macro"] = res["Macro"]
+            assert row == {k: res[k] for k in row}
@@ -0,0 +1,47 @@
+# tests/test_sweep.py
+import engine
+from engine import V296_PARAMS, run_smartstock_v296_engine
+from sweep import _sweep_row, iter_param_sweep
+from synthetic import SyntheticStore
+
+class CountingStore(SyntheticStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def get(self, symbol, start=None, end=None, period=None):
+        self.calls.append(symbol)
+        return super().get(symbol, start, end, period)
+
+def test_sweep_streams_before_all_symbols_are_prepared():
+    store = CountingStore(600)
+    symbols = [f"S{i}" for i in range(8)]
+    engine.use_store(store)
+    try:
+        rows = iter_param_sweep(symbols, {"cooldown": [5, 10]}, None, None, workers=1, chunk_size=2)
+        first = next(rows)
+        assert len(store.calls) < len(symbols)
+        rows = [first, *rows]
+    finally:
+        engine.use_store(None)
+    assert sorted((r["symbol"], r["cooldown"]) for r in rows) == sorted((s, c) for s in symbols for c in (5, 10))
+
+def test_sweep_rows_match_the_engine():
+    store = SyntheticStore(600)
+    engine.use_store(store)
+    try:
+        rows = list(iter_param_sweep(["A", "B"], {"plan_ttl": [10, 15]}, None, None, workers=2, chunk_size=1))
+        for r in rows:
+            stats, trades_df, _ = run_smartstock_v296_engine(r["symbol"], None, None,
+                                                             params={**V296_PARAMS, "plan_ttl": r["plan_ttl"]})
+            assert r["veto"] == stats["Macro Vetoes"] and r["issued"] == stats["Signals Issued"]
+            assert r["trades"] == len(trades_df)
+            assert f"${r['final_equity']:,.0f}" == stats["Final Equity"]
+    finally:
+        engine.use_store(None)
+    assert len(rows) == 4
+
+def test_sweep_row_drawdown_skips_nan_equity():
+    row = _sweep_row("A", {}, 100.0, {}, [], [100.0, float("nan"), 120.0, 90.0, 110.0])
+    assert row["max_drawdown"] == 90.0 / 120.0 - 1
+    assert row["final_equity"] == 110.0
@@ -0,0 +1,197 @@
+# tests/test_true_sync_parity.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import calculate_rsi_wilder, run_smartstock_v296_engine
+from synthetic import make_ohlcv
+
+# ----------------------------
+# Frozen copy of the original pandas True-Sync loop (engine.py before the array
+# kernel), taking the daily frame instead of downloading it. Do not edit: the
+# engine must keep reproducing it bar for bar.
+# ----------------------------
+def legacy_true_sync(df: pd.DataFrame):
+    df = df.copy()
+    # ---- build weekly/monthly sync pools from daily (Colab)
+    df_w = df["Close"].resample("W").last().to_frame()
+    df_w["MA50_w"] = df_w["Close"].rolling(50).mean()
+    rsi_20_w = calculate_rsi_wilder(df_w["Close"], 20)
+    df_w["bx_l"] = (rsi_20_w - 50).ewm(span=10, adjust=False).mean()
+    df_w["w_bullish"] = (df_w["Close"] > df_w["MA50_w"]) & (df_w["bx_l"] > -5)
+    df_w_sync = df_w.reindex(df.index, method="ffill")
+
+    df_m = df["Close"].resample("ME").last().to_frame()
+    df_m["m_bullish"] = df_m["Close"] > df_m["Close"].rolling(20).mean()
+    df_m_sync = df_m.reindex(df.index, method="ffill")
+
+    # ---- daily refs (Colab)
+    df["Upper_ref"] = df["High"].rolling(252).max().shift(1)
+    df["Lower_ref"] = df["Low"].rolling(20).min().shift(1)
+    df["MA50"] = df["Close"].rolling(50).mean()
+    df["Vol_MA20"] = df["Volume"].rolling(20).mean()
+    df["bx_s"] = (calculate_rsi_wilder(df["Close"], 5) - 50).ewm(span=3, adjust=False).mean()
+
+    # ---- state machine (Colab)
+    cash = 100000.0
+    init_cash = 100000.0
+    pos = 0
+    PLAN_TTL, COOLDOWN, MAX_POS = 15, 10, 0.7
+    pending_buy = {"active": False, "type": None}
+    pending_sell = False
+    plan = {"active": False, "age": 0}
+    cooldown_timer = 0
+
+    stats = {"issued": 0, "veto": 0, "triggered": 0, "ch_break": 0, "ch_rev": 0}
+    trades = []
+    equity_curve = []
+
+    entry_p = None
+    entry_type = None
+
+    for i in range(252, len(df)):
+        dt = df.index[i]
+        o_t = float(df["Open"].iloc[i])
+        h_t = float(df["High"].iloc[i])
+        l_t = float(df["Low"].iloc[i])
+        c_t = float(df["Close"].iloc[i])
+        v_t = float(df["Volume"].iloc[i])
+
+        # A) execute at next-day open
+        if pending_sell and pos > 0:
+            p_sell = o_t * (1 - 0.0005)
+            cash += pos * p_sell * (1 - 0.001)
+            trades.append({
+                "Date": dt,
+                "Type": "SELL",
+                "EntryType": entry_type,
+                "Price": p_sell,
+                "Ret": (p_sell / entry_p) - 1 if entry_p else np.nan
+            })
+            pos = 0
+            pending_sell = False
+            cooldown_timer = COOLDOWN
+
+        if pending_buy["active"] and pos == 0:
+            p_buy = o_t * (1 + 0.0005)
+            pos = int((cash * MAX_POS) / (p_buy * 1.001))
+            cash -= pos * p_buy * 1.001
+            entry_p = p_buy
+            entry_type = pending_buy["type"]
+
+            pending_buy["active"] = False
+            stats["triggered"] += 1
+
+            trades.append({
+                "Date": dt,
+                "Type": "BUY",
+                "EntryType": entry_type,
+                "Price": p_buy,
+                "Ret": np.nan
+            })
+
+        equity_curve.append(cash + pos * c_t)
+        if cooldown_timer > 0:
+            cooldown_timer -= 1
+
+        # B) decision at close
+        if pos > 0 and (not pending_sell) and c_t < float(df["Lower_ref"].iloc[i]):
+            pending_sell = True
+
+        if pos == 0 and (not pending_buy["active"]) and cooldown_timer == 0:
+            m_bull = bool(df_m_sync["m_bullish"].iloc[i])
+            w_bull = bool(df_w_sync["w_bullish"].iloc[i])
+            macro_pass = m_bull and w_bull
+
+            upper = float(df["Upper_ref"].iloc[i])
+
+            # Channel 1: plan & breakout
+            if (not plan["active"]) and (c_t > upper * 0.97):
+                plan["active"] = True
+                plan["age"] = 0
+                stats["issued"] += 1
+
+            if plan["active"]:
+                plan["age"] += 1
+                close_pos = (c_t - l_t) / (h_t - l_t) if h_t != l_t else 0.0
+                vol_ma20 = float(df["Vol_MA20"].iloc[i])
+                vol_ratio = v_t / vol_ma20 if vol_ma20 > 0 else 0.0
+
+                if (c_t > upper) and (close_pos > 0.7) and (vol_ratio > 1.2):
+                    if macro_pass:
+                        pending_buy = {"active": True, "type": "BREAKOUT"}
+                        stats["ch_break"] += 1
+                        plan["active"] = False
+                    else:
+                        stats["veto"] += 1
+                        plan["active"] = False
+                elif (plan["age"] > PLAN_TTL) or (c_t < float(df["MA50"].iloc[i])):
+                    plan["active"] = False
+
+            # Channel 2: reversal
+            bx_s_now = float(df["bx_s"].iloc[i])
+            bx_s_prev = float(df["bx_s"].iloc[i - 1])
+            if (not pending_buy["active"]) and macro_pass and (c_t > float(df["MA50"].iloc[i])):
+                if bx_s_prev <= 0 and bx_s_now > 0:
+                    pending_buy = {"active": True, "type": "REVERSAL"}
+                    stats["ch_rev"] += 1
+
+    eq = pd.Series(equity_curve, index=df.index[252:252 + len(equity_curve)], name="Equity")
+    equity_df = eq.reset_index().rename(columns={"index": "Date"})
+
+    # stats
+    total_ret = (eq.iloc[-1] / init_cash) - 1 if len(eq) else 0.0
+    dd = (eq / eq.cummax() - 1).min() if len(eq) else 0.0
+
+    trades_df = pd.DataFrame(trades)
+
+    out_stats = {
+        "Total Return": f"{total_ret:.2%}",
+        "Max Drawdown": f"{dd:.2%}",
+        "Macro Vetoes": int(stats["veto"]),
+        "Signals Issued": int(stats["issued"]),
+        "Signals Triggered": int(stats["triggered"]),
+        "Breakout Trades": int(stats["ch_break"]),
+        "Reversal Trades": int(stats["ch_rev"]),
+        "Final Equity": f"${eq.iloc[-1]:,.0f}" if len(eq) else "$100,000",
+    }
+    return out_stats, trades_df, equity_df
+
+# ----------------------------
+# Synthetic frames: plain, overnight gaps, flat bars, empty weeks / months (halts)
+# ----------------------------
+FRAMES = {
+    "plain": dict(halt_prob=0.0),
+    "gaps": dict(gap_prob=0.08, gap_size=0.12),
+    "flat_runs": dict(flat_prob=0.25),
+    "empty_weeks": dict(halt_prob=0.01, halt_len=10),
+    "empty_months": dict(halt_prob=0.003, halt_len=50),
+}
+
+def _frame(name: str, seed: int) -> pd.DataFrame:
+    return make_ohlcv(1800, seed=seed, **FRAMES[name])
+
+def _assert_same(got, want):
+    assert got[0] == want[0]
+    pd.testing.assert_frame_equal(got[1], want[1])
+    pd.testing.assert_frame_equal(got[2], want[2])
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_engine_matches_legacy_loop(name, seed):
+    df = _frame(name, seed)
+    want = legacy_true_sync(df)
+    assert want[0]["Signals Issued"] > 0
+    _assert_same(run_smartstock_v296_engine("SYN", None, None, data=df), want)
+
+def test_frames_have_empty_periods():
+    weeks = _frame("empty_weeks", 0)["Close"].resample("W").last()
+    months = _frame("empty_months", 0)["Close"].resample("ME").last()
+    assert weeks.isna().any() and months.isna().any()
+
+@pytest.mark.parametrize("name", ["plain", "gaps", "flat_runs"])
+def test_dense_sync_matches_without_empty_periods(name):
+    df = _frame(name, 1)
+    if df["Close"].resample("W").last().isna().any():
+        pytest.skip("frame has an empty week")
+    _assert_same(run_smartstock_v296_engine("SYN", None, None, data=df, sync="dense"), legacy_true_sync(df))